@@ -0,0 +1,101 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+# Add the project root to sys.path so the script can be run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.benchmarks.generator import write_match_files
+from src.database.models import Base
+from src.parsers.archive import ArchiveReader, export_archive, load_archive
+from src.parsers.json_parser import read_match_file
+from src.parsers.manifest import reload_data_dir
+
+
+def _session_for(db_path: str):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def _timed_rebuild(db_path: str, load) -> float:
+    engine, db = _session_for(db_path)
+    try:
+        start = time.perf_counter()
+        load(db)
+        return time.perf_counter() - start
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def run_benchmark(matches: int = 1000, teams: Optional[int] = None, seed: int = 1,
+                  workers: Optional[int] = None) -> Dict:
+    """
+    Rebuild a database from a generated data directory and from its archive,
+    and time decoding alone for both formats
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"Generating {matches} matches...")
+        data_dir = os.path.join(tmp_dir, 'data')
+        file_paths = write_match_files(data_dir, matches, teams, seed)
+        archive_path = os.path.join(tmp_dir, 'matches.archive')
+
+        start = time.perf_counter()
+        exported = export_archive(data_dir, archive_path, workers)
+        export_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for file_path in file_paths:
+            read_match_file(file_path)
+        decode_json = time.perf_counter() - start
+        start = time.perf_counter()
+        with ArchiveReader(archive_path) as reader:
+            for table_name in reader.tables:
+                for _ in reader.rows(table_name):
+                    pass
+        decode_archive = time.perf_counter() - start
+
+        rebuild_json = _timed_rebuild(os.path.join(tmp_dir, 'json.db'),
+                                      lambda db: reload_data_dir(db, data_dir, workers=workers))
+        rebuild_archive = _timed_rebuild(os.path.join(tmp_dir, 'archive.db'),
+                                         lambda db: load_archive(db, archive_path))
+
+        return {
+            'matches': matches,
+            'json_bytes': sum(os.path.getsize(file_path) for file_path in file_paths),
+            'archive_bytes': exported['bytes'],
+            'export_seconds': export_seconds,
+            'decode_json_seconds': decode_json,
+            'decode_archive_seconds': decode_archive,
+            'rebuild_json_seconds': rebuild_json,
+            'rebuild_archive_seconds': rebuild_archive
+        }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare cold rebuilds from JSON files and from an archive")
+    arg_parser.add_argument('--matches', type=int, default=1000)
+    arg_parser.add_argument('--teams', type=int, default=None)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--workers', type=int, default=None, help="JSON decoding processes")
+    args = arg_parser.parse_args()
+
+    results = run_benchmark(args.matches, args.teams, args.seed, args.workers)
+    print(f"\nMatches:             {results['matches']:>12}")
+    print(f"JSON size:           {results['json_bytes']:>12} bytes")
+    print(f"Archive size:        {results['archive_bytes']:>12} bytes")
+    print(f"Export:              {results['export_seconds']:>12.3f} s")
+    print(f"Decode JSON:         {results['decode_json_seconds']:>12.3f} s")
+    print(f"Decode archive:      {results['decode_archive_seconds']:>12.3f} s")
+    print(f"Rebuild from JSON:   {results['rebuild_json_seconds']:>12.3f} s")
+    print(f"Rebuild from archive:{results['rebuild_archive_seconds']:>12.3f} s")
+
+
+if __name__ == "__main__":
+    main()
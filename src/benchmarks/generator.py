@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+# Add the project root to sys.path so the script can be run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+FIRST_NAMES = ['Janis', 'Peteris', 'Andris', 'Martins', 'Karlis', 'Juris', 'Edgars', 'Raimonds',
+               'Valdis', 'Aivars', 'Gints', 'Kristaps', 'Davis', 'Roberts', 'Arturs', 'Oskars']
+LAST_NAMES = ['Berzins', 'Ozols', 'Kalnins', 'Liepa', 'Egle', 'Priede', 'Krumins', 'Vitols',
+              'Jansons', 'Zarins', 'Abols', 'Lapsa', 'Sils', 'Strods', 'Balodis', 'Kurmis']
+TOWNS = ['Riga', 'Daugavpils', 'Liepaja', 'Jelgava', 'Jurmala', 'Ventspils', 'Rezekne', 'Valmiera',
+         'Jekabpils', 'Ogre', 'Tukums', 'Cesis', 'Salaspils', 'Kuldiga', 'Olaine', 'Saldus']
+
+ROSTER_SIZE = 16
+STARTERS = 11
+REFEREES = 30
+REGULAR_TIME_SECONDS = 3600
+OVERTIME_SECONDS = 300
+
+
+def default_team_count(matches: int) -> int:
+    """Enough teams that a season is a sizeable share of the requested matches"""
+    return max(4, min(40, int(matches ** 0.5) + 1))
+
+
+def _as_block(items: List[Dict]):
+    """The feed writes a single event as an object and several as a list"""
+    return items[0] if len(items) == 1 else items
+
+
+def _time(seconds: int) -> str:
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class TournamentGenerator:
+    """
+    Deterministic source of 'Spele' match documents.
+    Seasons are double round robins between fixed rosters; tied games are
+    decided by a goal in overtime, so every season contains overtime results.
+    """
+
+    def __init__(self, teams: int, seed: int = 1):
+        if teams < 2:
+            raise ValueError("At least two teams are needed")
+        self.rng = random.Random(seed)
+        self.teams = [self._team(index) for index in range(teams)]
+        self.referees = [
+            {'Vards': self.rng.choice(FIRST_NAMES), 'Uzvards': f"{self.rng.choice(LAST_NAMES)}{index}"}
+            for index in range(REFEREES)
+        ]
+
+    def _team(self, index: int) -> Dict:
+        town = TOWNS[index % len(TOWNS)]
+        suffix = f" {index // len(TOWNS) + 1}" if index >= len(TOWNS) else ''
+        numbers = sorted(self.rng.sample(range(1, 100), ROSTER_SIZE))
+        players = []
+        for position, number in enumerate(numbers):
+            role = 'V' if position == 0 else ('A' if position < 6 else 'U')
+            players.append({'Nr': number, 'Vards': self.rng.choice(FIRST_NAMES),
+                            'Uzvards': f"{self.rng.choice(LAST_NAMES)}{index}", 'Loma': role})
+        return {'name': f"FK {town}{suffix}", 'venue': f"{town}{suffix} stadions", 'players': players}
+
+    def matches(self, count: int, start: datetime = datetime(2000, 4, 1)) -> Iterator[Dict]:
+        """Yield count match documents in schedule order"""
+        team_count = len(self.teams)
+        per_round = max(1, team_count // 2)
+        fixtures = [(home, away) for home in range(team_count) for away in range(team_count) if home != away]
+        produced = 0
+        season = 0
+        while produced < count:
+            season_start = start.replace(year=start.year + season)
+            order = fixtures[:]
+            self.rng.shuffle(order)
+            for index, (home, away) in enumerate(order):
+                if produced >= count:
+                    return
+                yield self._match(season_start + timedelta(days=index // per_round),
+                                  self.teams[home], self.teams[away])
+                produced += 1
+            season += 1
+
+    def _match(self, date: datetime, home: Dict, away: Dict) -> Dict:
+        rng = self.rng
+        goal_counts = [min(rng.randint(0, 3) + rng.randint(0, 2), 6) for _ in range(2)]
+        goal_times = [sorted(rng.sample(range(30, REGULAR_TIME_SECONDS), count)) for count in goal_counts]
+        if goal_counts[0] == goal_counts[1]:
+            # Decided in overtime
+            goal_times[rng.randint(0, 1)].append(REGULAR_TIME_SECONDS + rng.randint(1, OVERTIME_SECONDS))
+
+        main_referee, *assistants = rng.sample(self.referees, 3)
+        return {'Spele': {
+            'Laiks': date.strftime('%Y/%m/%d'),
+            'Vieta': home['venue'],
+            'Skatitaji': rng.randint(50, 250) * 50 if rng.random() < 0.9 else rng.randint(10000, 30000),
+            'Komanda': [self._team_block(home, goal_times[0]), self._team_block(away, goal_times[1])],
+            'VT': main_referee,
+            'T': assistants
+        }}
+
+    def _team_block(self, team: Dict, goal_times: List[int]) -> Dict:
+        rng = self.rng
+        numbers = [player['Nr'] for player in team['players']]
+        starters, bench = numbers[:STARTERS], numbers[STARTERS:]
+
+        goals = []
+        for seconds in goal_times:
+            scorer, *helpers = rng.sample(numbers[1:], 3)
+            goal = {'Nr': scorer, 'Laiks': _time(seconds), 'Sitiens': 'J' if rng.random() < 0.08 else 'N'}
+            assists = [{'Nr': number} for number in helpers[:rng.choice((0, 1, 1, 2, 2))]]
+            if assists:
+                goal['P'] = _as_block(assists)
+            goals.append(goal)
+
+        cards = [{'Nr': rng.choice(numbers), 'Laiks': _time(rng.randint(60, REGULAR_TIME_SECONDS))}
+                 for _ in range(rng.choice((0, 0, 1, 1, 2, 3)))]
+        if cards and rng.random() < 0.1:
+            # Second booking of the same player
+            cards.append({'Nr': cards[0]['Nr'], 'Laiks': _time(REGULAR_TIME_SECONDS - rng.randint(1, 600))})
+        cards.sort(key=lambda card: card['Laiks'])
+
+        subs = [{'Nr1': player_out, 'Nr2': player_in, 'Laiks': _time(rng.randint(1800, REGULAR_TIME_SECONDS))}
+                for player_out, player_in in zip(rng.sample(starters[1:], 3), rng.sample(bench, 3))]
+        subs = sorted(subs[:rng.randint(0, 3)], key=lambda sub: sub['Laiks'])
+
+        return {
+            'Nosaukums': team['name'],
+            'Speletaji': {'Speletajs': team['players']},
+            'Varti': {'VG': _as_block(goals)} if goals else '',
+            'Sodi': {'Sods': _as_block(cards)} if cards else '',
+            'Mainas': {'Maina': _as_block(subs)} if subs else ''
+        }
+
+
+def generate_matches(count: int, teams: Optional[int] = None, seed: int = 1) -> Iterator[Dict]:
+    """Yield count deterministic match documents"""
+    generator = TournamentGenerator(teams or default_team_count(count), seed)
+    return generator.matches(count)
+
+
+def write_match_files(output_dir: str, count: int, teams: Optional[int] = None, seed: int = 1) -> List[str]:
+    """Write count match files named like the federation feed and return their paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    width = max(1, len(str(count - 1)))
+    file_paths = []
+    for index, match in enumerate(generate_matches(count, teams, seed)):
+        file_path = os.path.join(output_dir, f"futbols{index:0{width}d}.json")
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(match, file, ensure_ascii=False)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def write_season_dump(file_path: str, count: int, teams: Optional[int] = None, seed: int = 1) -> str:
+    """Write count matches into one file, NDJSON for .ndjson/.jsonl paths and a JSON array otherwise"""
+    ndjson = file_path.endswith(('.ndjson', '.jsonl'))
+    with open(file_path, 'w', encoding='utf-8') as file:
+        if not ndjson:
+            file.write('[\n')
+        for index, match in enumerate(generate_matches(count, teams, seed)):
+            if index and not ndjson:
+                file.write(',\n')
+            json.dump(match, file, ensure_ascii=False)
+            if ndjson:
+                file.write('\n')
+        if not ndjson:
+            file.write('\n]\n')
+    return file_path
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Write a synthetic tournament as match JSON files")
+    arg_parser.add_argument('output_dir', help="directory for match files, or a season dump file with --dump")
+    arg_parser.add_argument('--matches', type=int, default=100)
+    arg_parser.add_argument('--teams', type=int, default=None, help="default grows with --matches")
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--dump', action='store_true', help="write a single JSON array or NDJSON file")
+    args = arg_parser.parse_args()
+
+    if args.dump:
+        write_season_dump(args.output_dir, args.matches, args.teams, args.seed)
+        print(f"Wrote {args.matches} matches to {args.output_dir}")
+        return
+
+    file_paths = write_match_files(args.output_dir, args.matches, args.teams, args.seed)
+    print(f"Wrote {len(file_paths)} match files to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to sys.path so the script can be run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, event, func, select, text, and_
+from sqlalchemy.orm import sessionmaker
+from src.database.models import Base, Team, Player, Match, Goal, Referee
+from src.benchmarks.generator import generate_matches
+from src.parsers.bulk_parser import BulkMatchParser
+from src.parsers.json_parser import normalize_match
+from src.statistics.popular_goals_calculator import PopularGoalsCalculator
+from src.statistics.scorers_calculator import TopScorersCalculator
+from src.statistics.substitutions_calculator import SubstitutionCalculator
+
+
+QUERIES = {
+    'player by number': lambda db, v: db.query(Player).filter_by(team_id=v['team_id'], number=v['number']).first(),
+    'referee by name': lambda db, v: db.query(Referee).filter_by(first_name=v['referee_first_name'],
+                                                                  last_name=v['referee_last_name']).first(),
+    'duplicate match check': lambda db, v: db.query(Match).filter(and_(
+        Match.date == v['date'], Match.venue == v['venue'],
+        Match.home_team.has(Team.name == v['home_team']), Match.away_team.has(Team.name == v['away_team']))).first(),
+    'goals of a match': lambda db, v: db.execute(select(Goal).where(Goal.match_id == v['match_id'])).all(),
+    'goals of a scorer': lambda db, v: db.execute(select(Goal).where(Goal.scorer_id == v['scorer_id'])).all(),
+    'goals after 60:00': lambda db, v: db.execute(select(Goal).where(Goal.seconds > 3600)).all(),
+    'popular goals (live)': lambda db, v: PopularGoalsCalculator(db).calculate_popular_goals(),
+    'substitution stats (live)': lambda db, v: SubstitutionCalculator(db).calculate_substitution_stats(),
+    'top scorers (live)': lambda db, v: TopScorersCalculator(db).calculate_top_scorers(),
+}
+
+
+def _lookup_values(db) -> dict:
+    """Keys of rows from the middle of the database to look up"""
+    match = db.get(Match, (db.query(func.max(Match.id)).scalar() + 1) // 2)
+    goal = db.query(Goal).filter(Goal.match_id >= match.id).first()
+    referee = db.get(Referee, (db.query(func.max(Referee.id)).scalar() + 1) // 2)
+    return {
+        'match_id': match.id, 'date': match.date, 'venue': match.venue,
+        'home_team': match.home_team.name, 'away_team': match.away_team.name,
+        'team_id': goal.scorer.team_id, 'number': goal.scorer.number, 'scorer_id': goal.scorer_id,
+        'referee_first_name': referee.first_name, 'referee_last_name': referee.last_name
+    }
+
+
+def build_database(db_path: str, matches: int, teams: int) -> None:
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        parser = BulkMatchParser(db, batch_size=500)
+        for count, match in enumerate(generate_matches(matches, teams), 1):
+            parser.add_match(normalize_match(match['Spele']))
+            if count % 500 == 0:
+                parser.flush()
+        parser.flush()
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def drop_secondary_indexes(db_path: str) -> None:
+    """Turn a database into the pre-tuning schema"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    engine.dispose()
+
+
+def measure(db_path: str, repeat: int) -> dict:
+    """Query plan of the first statement and mean time of each query"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    captured = []
+    event.listen(engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, parameters, context, executemany:
+                 captured.append((statement, parameters)))
+    db = sessionmaker(bind=engine)()
+    results = {}
+    try:
+        values = _lookup_values(db)
+        db.expunge_all()
+        for name, query in QUERIES.items():
+            captured.clear()
+            query(db, values)
+            statement, parameters = captured[0]
+            plan = [row[-1] for row in db.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                db.expunge_all()
+                query(db, values)
+            results[name] = {'ms': (time.perf_counter() - start) / repeat * 1000, 'plan': plan}
+    finally:
+        db.close()
+        engine.dispose()
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Query plans and timings with and without secondary indexes")
+    arg_parser.add_argument('--seasons', type=int, default=5)
+    arg_parser.add_argument('--teams', type=int, default=20)
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    matches = args.seasons * args.teams * (args.teams - 1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        indexed = os.path.join(tmp_dir, 'indexed.db')
+        plain = os.path.join(tmp_dir, 'plain.db')
+        build_database(indexed, matches, args.teams)
+        with open(indexed, 'rb') as src, open(plain, 'wb') as dst:
+            dst.write(src.read())
+        drop_secondary_indexes(plain)
+
+        before = measure(plain, args.repeat)
+        after = measure(indexed, args.repeat)
+
+    print(f"Synthetic database: {args.seasons} seasons, {args.teams} teams, {matches} matches\n")
+    for name in QUERIES:
+        print(f"{name}: {before[name]['ms']:.3f} ms -> {after[name]['ms']:.3f} ms")
+        print(f"  without indexes: {' | '.join(before[name]['plan'])}")
+        print(f"  with indexes:    {' | '.join(after[name]['plan'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the project root to sys.path so the script can be run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.database import SRC_DIR
+from src.database.models import Base
+from src.parsers.json_parser import MatchParser
+from src.parsers.bulk_parser import BulkMatchParser
+
+
+def _session_for(db_path: str):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def _ingest_per_file(db, file_paths):
+    parser = MatchParser(db)
+    for file_path in file_paths:
+        try:
+            parser.parse_file(file_path)
+            db.commit()
+        except Exception as e:
+            print(f"Error processing {file_path}: {e}")
+            db.rollback()
+
+
+def _ingest_bulk(db, file_paths, batch_size):
+    BulkMatchParser(db, batch_size).parse_files(file_paths)
+
+
+def run_benchmark(data_dir: str, batch_size: int = 100) -> dict:
+    """Ingest the same files with both modes into fresh databases and time them"""
+    file_paths = sorted(
+        os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.endswith('.json')
+    )
+    if not file_paths:
+        raise ValueError(f"No JSON files found in {data_dir}")
+
+    results = {'files': len(file_paths)}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in ('per_file', 'bulk'):
+            engine, db = _session_for(os.path.join(tmp_dir, f"{mode}.db"))
+            try:
+                start = time.perf_counter()
+                if mode == 'bulk':
+                    _ingest_bulk(db, file_paths, batch_size)
+                else:
+                    _ingest_per_file(db, file_paths)
+                elapsed = time.perf_counter() - start
+            finally:
+                db.close()
+                engine.dispose()
+            results[mode] = {'seconds': elapsed, 'files_per_second': len(file_paths) / elapsed}
+
+    results['speedup'] = results['per_file']['seconds'] / results['bulk']['seconds']
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare per-file and bulk match ingestion")
+    arg_parser.add_argument('data_dir', nargs='?', default=os.path.join(SRC_DIR, 'data'))
+    arg_parser.add_argument('--batch-size', type=int, default=100)
+    args = arg_parser.parse_args()
+
+    results = run_benchmark(args.data_dir, args.batch_size)
+    print(f"Files: {results['files']}")
+    print(f"Per-file ingestion: {results['per_file']['files_per_second']:>10.1f} files/s")
+    print(f"Bulk ingestion:     {results['bulk']['files_per_second']:>10.1f} files/s")
+    print(f"Speedup:            {results['speedup']:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+# Add the project root to sys.path so the script can be run directly
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT_DIR)
+
+from src.benchmarks.generator import write_match_files
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * (len(ordered) - 1) + 0.5))]
+
+
+def _wait_until_up(port: int, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during start-up, see its log")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/cache')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start within {timeout} seconds")
+
+
+def _client(port: int, stop: threading.Event, latencies: List[float], errors: List[int]) -> None:
+    """Request / over one keep-alive connection until stopped"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            connection.request('GET', '/')
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException):
+            errors.append(0)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def _reloader(port: int, stop: threading.Event, batches: List[List[str]], data_dir: str,
+              durations: List[float]) -> None:
+    """Drop the next batch of files into the data directory and run a reload job, back to back"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+    for batch in batches:
+        if stop.is_set():
+            break
+        for file_path in batch:
+            shutil.move(file_path, data_dir)
+        start = time.perf_counter()
+        connection.request('POST', '/api/reload')
+        job = json.loads(connection.getresponse().read())['job']
+        while job['state'] not in ('succeeded', 'failed', 'cancelled'):
+            time.sleep(0.05)
+            connection.request('GET', f"/api/jobs/{job['id']}")
+            job = json.loads(connection.getresponse().read())
+        durations.append(time.perf_counter() - start)
+    connection.close()
+
+
+def _run_phase(port: int, clients: int, seconds: float, reload_args=None) -> Dict:
+    stop = threading.Event()
+    latencies, errors, reloads = [], [], []
+    threads = [threading.Thread(target=_client, args=(port, stop, latencies, errors)) for _ in range(clients)]
+    if reload_args is not None:
+        threads.append(threading.Thread(target=_reloader, args=(port, stop, *reload_args, reloads)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': len(latencies) / seconds,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+        'reloads': len(reloads),
+        'reload_seconds': sum(reloads) / len(reloads) if reloads else 0.0
+    }
+
+
+def run_load_test(matches: int = 2000, reload_matches: int = 200, batches: int = 20, clients: int = 16,
+                  seconds: float = 10.0, threads: int = 8) -> Dict[str, Dict]:
+    """
+    Start the production server on a generated database and measure / with
+    and without reloads running at the same time.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = os.path.join(tmp_dir, 'data')
+        pending_dir = os.path.join(tmp_dir, 'pending')
+        print(f"Generating {matches} + {reload_matches * batches} matches...")
+        all_files = write_match_files(pending_dir, matches + reload_matches * batches)
+        os.makedirs(data_dir)
+        for file_path in all_files[:matches]:
+            shutil.move(file_path, data_dir)
+        pending = all_files[matches:]
+        reload_batches = [pending[start:start + reload_matches] for start in range(0, len(pending), reload_matches)]
+
+        port = _free_port()
+        env = dict(os.environ, FOOTBALL_STATS_DB=os.path.join(tmp_dir, 'load_test.db'),
+                   FOOTBALL_STATS_DATA_DIR=data_dir)
+        with open(os.path.join(tmp_dir, 'server.log'), 'w') as log:
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'src.main', '--production', '--port', str(port), '--threads', str(threads)],
+                cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+            )
+            try:
+                print("Loading the initial data and starting the server...")
+                _wait_until_up(port, process, timeout=600)
+                _run_phase(port, clients, 1.0)  # warm up
+                print(f"Measuring / for {seconds:.0f}s...")
+                idle = _run_phase(port, clients, seconds)
+                print(f"Measuring / for {seconds:.0f}s while reloading...")
+                reloading = _run_phase(port, clients, seconds, (reload_batches, data_dir))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    return {'idle': idle, 'reloading': reloading}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Load test / with and without a concurrent /api/reload")
+    arg_parser.add_argument('--matches', type=int, default=2000, help="matches loaded before the test")
+    arg_parser.add_argument('--reload-matches', type=int, default=200, help="new matches per reload")
+    arg_parser.add_argument('--batches', type=int, default=20, help="reloads available to the test")
+    arg_parser.add_argument('--clients', type=int, default=16)
+    arg_parser.add_argument('--seconds', type=float, default=10.0)
+    arg_parser.add_argument('--threads', type=int, default=8, help="server threads")
+    args = arg_parser.parse_args()
+
+    results = run_load_test(args.matches, args.reload_matches, args.batches, args.clients, args.seconds,
+                            args.threads)
+
+    print(f"\n{'Phase':<10} {'Requests':>9} {'Errors':>7} {'Req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'Reloads':>8}")
+    for phase, row in results.items():
+        print(f"{phase:<10} {row['requests']:>9} {row['errors']:>7} {row['requests_per_second']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['reloads']:>8}")
+    if results['reloading']['reloads']:
+        print(f"\nAverage reload: {results['reloading']['reload_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+# Add the project root to sys.path so the script can be run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy.orm import sessionmaker
+from src.benchmarks.generator import write_match_files
+from src.database.database import PRAGMA_PROFILES, create_db_engine
+from src.database.models import Base
+from src.parsers.json_parser import MatchParser
+from src.parsers.pipeline import load_match_files
+from src.statistics.popular_goals_calculator import PopularGoalsCalculator
+from src.statistics.scorers_calculator import TopScorersCalculator
+from src.statistics.standings_calculator import StandingsCalculator
+from src.statistics.substitutions_calculator import SubstitutionCalculator
+
+QUERIES = {
+    'standings': lambda db, m: StandingsCalculator(db, m).calculate_standings(),
+    'top_scorers': lambda db, m: TopScorersCalculator(db, m).calculate_top_scorers(),
+    'substitutions': lambda db, m: SubstitutionCalculator(db, m).calculate_substitution_stats(),
+    'popular_goals': lambda db, m: PopularGoalsCalculator(db, m).calculate_popular_goals(),
+}
+
+
+def _fresh_database(url: str, profile: str):
+    """Engine over an empty schema; a server database is cleared first"""
+    engine = create_db_engine(url, profile)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def _time_ingest(url: str, profile: str, file_paths: List[str], per_file: bool) -> float:
+    engine = _fresh_database(url, profile)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        start = time.perf_counter()
+        if per_file:
+            # One transaction per match, so every commit pays for the sync mode
+            MatchParser(db).parse_files(file_paths)
+        else:
+            load_match_files(db, file_paths, workers=1)
+        return time.perf_counter() - start
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def _time_queries(url: str, profile: str, repeat: int) -> Dict[str, float]:
+    """Calculations per second of each calculator, live and materialized, on a read-only engine"""
+    engine = create_db_engine(url, profile, read_only=True)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    rates = {}
+    try:
+        for name, query in QUERIES.items():
+            for materialized in (False, True):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    query(db, materialized)
+                    db.expunge_all()
+                rates[f"{name}_{'materialized' if materialized else 'live'}"] = \
+                    repeat / (time.perf_counter() - start)
+    finally:
+        db.close()
+        engine.dispose()
+    return rates
+
+
+def run_benchmark(matches: int = 500, teams: Optional[int] = None, seed: int = 1, repeat: int = 20,
+                  profiles: List[str] = None, server_url: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Ingest a generated tournament into a fresh database per pragma profile and
+    time per-file ingest, batched ingest and the statistics queries.
+    With server_url the same runs are made against that database as 'server';
+    its tables are dropped first.
+    """
+    profiles = list(profiles or PRAGMA_PROFILES)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"Generating {matches} matches...")
+        file_paths = write_match_files(os.path.join(tmp_dir, 'data'), matches, teams, seed)
+
+        targets = [(profile, f"sqlite:///{os.path.join(tmp_dir, f'{profile}.db')}", profile) for profile in profiles]
+        if server_url:
+            targets.append(('server', server_url, profiles[0]))
+
+        for name, url, profile in targets:
+            print(f"Profile {name}...")
+            per_file = _time_ingest(url, profile, file_paths, per_file=True)
+            bulk = _time_ingest(url, profile, file_paths, per_file=False)
+            results[name] = {
+                'ingest_per_file_matches_per_second': matches / per_file,
+                'ingest_bulk_matches_per_second': matches / bulk,
+                'queries_per_second': _time_queries(url, profile, repeat)
+            }
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare ingest and query throughput across database profiles")
+    arg_parser.add_argument('--matches', type=int, default=500)
+    arg_parser.add_argument('--teams', type=int, default=None)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--profile', action='append', choices=list(PRAGMA_PROFILES),
+                            help="SQLite profile to run, repeatable; all profiles by default")
+    arg_parser.add_argument('--server-url', help="also run against this database URL, its tables are dropped")
+    args = arg_parser.parse_args()
+
+    results = run_benchmark(args.matches, args.teams, args.seed, args.repeat, args.profile, args.server_url)
+
+    names = list(results)
+    print(f"\n{'Matches per second':<28}" + ''.join(f"{name:>12}" for name in names))
+    for key, label in (('ingest_per_file_matches_per_second', 'ingest per file'),
+                       ('ingest_bulk_matches_per_second', 'ingest bulk')):
+        print(f"{label:<28}" + ''.join(f"{results[name][key]:>12.1f}" for name in names))
+    print(f"\n{'Queries per second':<28}" + ''.join(f"{name:>12}" for name in names))
+    for query in results[names[0]]['queries_per_second']:
+        print(f"{query:<28}" + ''.join(f"{results[name]['queries_per_second'][query]:>12.1f}" for name in names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+# Add the project root to sys.path so the script can be run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.benchmarks.generator import write_season_dump
+from src.database.models import Base
+from src.parsers.stream_parser import load_match_stream
+
+
+def _ingest(dump_path: str, db_path: str, results) -> None:
+    """Child process entry point, so every run starts from a fresh heap"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            summary = load_match_stream(db, dump_path)
+        finally:
+            sys.stdout = stdout
+            db.close()
+            engine.dispose()
+    # ru_maxrss is reported in kilobytes on Linux
+    results.put({'stored': summary['stored'], 'seconds': time.perf_counter() - start,
+                 'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024})
+
+
+def run_benchmark(sizes, ndjson: bool = True) -> list:
+    """Stream season dumps of the given match counts and record time and peak memory"""
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for matches in sizes:
+            dump_path = os.path.join(tmp_dir, f"season_{matches}.{'ndjson' if ndjson else 'json'}")
+            write_season_dump(dump_path, matches)
+            results = context.Queue()
+            process = context.Process(target=_ingest,
+                                      args=(dump_path, os.path.join(tmp_dir, f"{matches}.db"), results))
+            process.start()
+            row = results.get()
+            process.join()
+            row.update({'matches': matches, 'file_mb': os.path.getsize(dump_path) / (1 << 20)})
+            rows.append(row)
+            os.remove(dump_path)
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Peak memory of streaming season dumps of growing size")
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    arg_parser.add_argument('--array', action='store_true', help="write JSON arrays instead of NDJSON")
+    args = arg_parser.parse_args()
+
+    print(f"{'Matches':>8} {'File MB':>8} {'Stored':>8} {'Matches/s':>10} {'Peak RSS MB':>12}")
+    for row in run_benchmark(args.sizes, ndjson=not args.array):
+        print(f"{row['matches']:>8} {row['file_mb']:>8.1f} {row['stored']:>8} "
+              f"{row['stored'] / row['seconds']:>10.0f} {row['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
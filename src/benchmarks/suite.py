@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# Add the project root to sys.path so the script can be run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.benchmarks.generator import write_match_files
+from src.database.models import Base
+from src.parsers.json_parser import MatchParser
+from src.parsers.pipeline import load_match_files
+from src.statistics.popular_goals_calculator import PopularGoalsCalculator
+from src.statistics.scorers_calculator import TopScorersCalculator
+from src.statistics.standings_calculator import StandingsCalculator
+from src.statistics.substitutions_calculator import SubstitutionCalculator
+
+# A timing this much slower than the baseline is reported as a regression
+DEFAULT_TOLERANCE = 0.25
+
+CALCULATIONS = {
+    'standings': lambda db, m: StandingsCalculator(db, m).calculate_standings(),
+    'top_scorers': lambda db, m: TopScorersCalculator(db, m).calculate_top_scorers(),
+    'substitutions': lambda db, m: SubstitutionCalculator(db, m).calculate_substitution_stats(),
+    'popular_goals': lambda db, m: PopularGoalsCalculator(db, m).calculate_popular_goals(),
+}
+
+def _session_factory(db_path: str):
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _time_call(function: Callable, repeat: int) -> Dict[str, float]:
+    """Best and mean wall time over repeat calls"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {'seconds': min(timings), 'mean_seconds': sum(timings) / len(timings)}
+
+
+def _ingest_per_file(Session, file_paths: List[str]) -> None:
+    db = Session()
+    try:
+        parser = MatchParser(db)
+        for file_path in file_paths:
+            parser.parse_file(file_path)
+    finally:
+        db.close()
+
+
+def _ingest_bulk(Session, file_paths: List[str]) -> None:
+    db = Session()
+    try:
+        load_match_files(db, file_paths, workers=1)
+    finally:
+        db.close()
+
+
+def _time_index_route(Session, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Render / against the benchmark database, with and without warm caches"""
+    from src.interface import app as app_module
+    original = app_module.ReadSessionLocal
+    app_module.ReadSessionLocal = Session
+    try:
+        client = app_module.app.test_client()
+
+        def cold():
+            app_module.statistics_cache.clear()
+            assert client.get('/').status_code == 200
+
+        def warm():
+            assert client.get('/').status_code == 200
+
+        return {'index_route_cold': _time_call(cold, repeat), 'index_route_warm': _time_call(warm, repeat)}
+    finally:
+        app_module.ReadSessionLocal = original
+        app_module.statistics_cache.clear()
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run_suite(matches: int = 1000, teams: int = None, seed: int = 1, repeat: int = 5,
+              per_file: bool = True) -> Dict:
+    """
+    Generate a tournament and time ingestion, every calculator and the / route.
+    All timings are in seconds; the per-file MatchParser run can be skipped
+    for very large tournaments.
+    """
+    results = {
+        'commit': _git_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'parameters': {'matches': matches, 'teams': teams, 'seed': seed, 'repeat': repeat},
+        'timings': {}
+    }
+    timings = results['timings']
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"Generating {matches} matches...")
+        file_paths = write_match_files(os.path.join(tmp_dir, 'data'), matches, teams, seed)
+
+        if per_file:
+            engine, Session = _session_factory(os.path.join(tmp_dir, 'per_file.db'))
+            start = time.perf_counter()
+            _ingest_per_file(Session, file_paths)
+            timings['ingest_per_file'] = {'seconds': time.perf_counter() - start}
+            engine.dispose()
+
+        engine, Session = _session_factory(os.path.join(tmp_dir, 'bulk.db'))
+        start = time.perf_counter()
+        _ingest_bulk(Session, file_paths)
+        timings['ingest_bulk'] = {'seconds': time.perf_counter() - start}
+
+        db = Session()
+        try:
+            for name, calculation in CALCULATIONS.items():
+                for materialized in (False, True):
+                    key = f"{name}_{'materialized' if materialized else 'live'}"
+                    timings[key] = _time_call(lambda: calculation(db, materialized), repeat)
+                    db.expunge_all()
+        finally:
+            db.close()
+
+        timings.update(_time_index_route(Session, repeat))
+        engine.dispose()
+
+    for name, timing in timings.items():
+        if name.startswith('ingest_'):
+            timing['matches_per_second'] = matches / timing['seconds']
+    return results
+
+
+def compare_results(baseline: Dict, current: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """Timings present in both runs that got slower than the tolerance allows"""
+    regressions = []
+    for name, timing in current['timings'].items():
+        before = baseline['timings'].get(name)
+        if before is None or not before['seconds']:
+            continue
+        ratio = timing['seconds'] / before['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append({'name': name, 'baseline': before['seconds'], 'current': timing['seconds'],
+                                'ratio': ratio})
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Time ingestion, statistics and the web front page")
+    arg_parser.add_argument('--matches', type=int, default=1000)
+    arg_parser.add_argument('--teams', type=int, default=None)
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--skip-per-file', action='store_true', help="skip the slow MatchParser run")
+    arg_parser.add_argument('--output', help="write the results to this JSON file")
+    arg_parser.add_argument('--compare', help="baseline JSON file from an earlier run")
+    arg_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = arg_parser.parse_args()
+
+    results = run_suite(args.matches, args.teams, args.seed, args.repeat, per_file=not args.skip_per_file)
+
+    print(f"\n{'Benchmark':<28} {'Seconds':>10}")
+    for name, timing in results['timings'].items():
+        print(f"{name:<28} {timing['seconds']:>10.4f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare_results(baseline, results, args.tolerance)
+        print(f"\nCompared with {baseline.get('commit') or args.compare}:")
+        for regression in regressions:
+            print(f"  {regression['name']}: {regression['baseline']:.4f}s -> {regression['current']:.4f}s "
+                  f"({regression['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("  no regressions")
+
+
+if __name__ == "__main__":
+    main()
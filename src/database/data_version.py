@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .models import DataVersion
+
+VERSION_ROW_ID = 1
+
+
+def get_data_version(db: Session) -> int:
+    """Current data version, 0 for an empty database"""
+    return db.execute(
+        select(DataVersion.version).where(DataVersion.id == VERSION_ROW_ID)
+    ).scalar() or 0
+
+
+def get_data_updated_at(db: Session) -> Optional[datetime]:
+    """Time of the last change to the match data"""
+    return db.execute(
+        select(DataVersion.updated_at).where(DataVersion.id == VERSION_ROW_ID)
+    ).scalar()
+
+
+def get_data_state(db: Session) -> Tuple[int, Optional[datetime]]:
+    """Data version and last change time in one read"""
+    row = db.execute(
+        select(DataVersion.version, DataVersion.updated_at).where(DataVersion.id == VERSION_ROW_ID)
+    ).first()
+    return (row.version or 0, row.updated_at) if row is not None else (0, None)
+
+
+def bump_data_version(db: Session, minimum: int = 0) -> int:
+    """
+    Increase the data version inside the caller's transaction.
+    Anything cached under an older version is never served again.
+    """
+    row = db.get(DataVersion, VERSION_ROW_ID)
+    if row is None:
+        row = DataVersion(id=VERSION_ROW_ID, version=0)
+        db.add(row)
+    row.version = max(row.version or 0, minimum) + 1
+    row.updated_at = datetime.now()
+    db.flush()
+    return row.version
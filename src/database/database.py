@@ -1,21 +1,128 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, false, inspect, text, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import Session
+import logging
 import os
+from datetime import datetime
+from .instrumentation import install_query_instrumentation
+
+logger = logging.getLogger(__name__)
 
 # Get absolute path to src directory
 SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-# Define database file location relative to src directory
-DATABASE_PATH = os.path.join(SRC_DIR, "football_stats.db")
-DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+# Define database file location relative to src directory, FOOTBALL_STATS_DB overrides it
+DEFAULT_DATABASE_PATH = os.environ.get('FOOTBALL_STATS_DB') or os.path.join(SRC_DIR, "football_stats.db")
+# Any SQLAlchemy URL, e.g. postgresql+psycopg2://user@host/football_stats, replaces the file
+DATABASE_URL = os.environ.get('FOOTBALL_STATS_DATABASE_URL') or f"sqlite:///{DEFAULT_DATABASE_PATH}"
+# File behind a SQLite URL; None for a server database
+DATABASE_PATH = make_url(DATABASE_URL).database if make_url(DATABASE_URL).get_backend_name() == 'sqlite' else None
+
+# How long a connection waits for a lock before failing with "database is locked"
+BUSY_TIMEOUT_SECONDS = 10
+# Connections kept per engine, sized for the threads of the production server
+POOL_SIZE = int(os.environ.get('FOOTBALL_STATS_POOL_SIZE') or 8)
+MAX_OVERFLOW = int(os.environ.get('FOOTBALL_STATS_MAX_OVERFLOW') or 8)
+
+# Pragmas set on every new SQLite connection, by profile name
+PRAGMA_PROFILES = {
+    # Every commit is synced, nothing committed is lost on a power cut
+    'durable': {'journal_mode': 'WAL', 'synchronous': 'FULL'},
+    # Durable at checkpoints; a power cut can only lose the last commits
+    'wal': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+    # As wal, with a 64 MiB page cache, 256 MiB of the file memory-mapped and
+    # temporary tables and sort buffers kept in memory
+    'tuned': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -65536,
+              'mmap_size': 268435456, 'temp_store': 'MEMORY'},
+}
+DATABASE_PROFILE = os.environ.get('FOOTBALL_STATS_DB_PROFILE') or 'tuned'
+
+
+def create_db_engine(url: str = DATABASE_URL, profile: str = DATABASE_PROFILE, read_only: bool = False,
+                     pool_size: int = POOL_SIZE, max_overflow: int = MAX_OVERFLOW) -> Engine:
+    """
+    Engine for a SQLite file or a server database.
+    SQLite connections may be used from any server thread and get the
+    pragmas of `profile`; server connections are checked before use, since
+    the server may have closed them. With read_only=True writes are refused.
+    """
+    if make_url(url).get_backend_name() != 'sqlite':
+        new_engine = create_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
+        if read_only and new_engine.dialect.name == 'postgresql':
+            @event.listens_for(new_engine, 'connect')
+            def _read_only_session(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+                cursor.close()
+                dbapi_connection.commit()
+        install_query_instrumentation(new_engine)
+        return new_engine
+
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Unknown database profile {profile!r}, expected one of {', '.join(PRAGMA_PROFILES)}")
+    pragmas = PRAGMA_PROFILES[profile]
+    new_engine = create_engine(
+        url,
+        connect_args={'check_same_thread': False, 'timeout': BUSY_TIMEOUT_SECONDS},
+        pool_size=pool_size,
+        max_overflow=max_overflow
+    )
+
+    @event.listens_for(new_engine, 'connect')
+    def _configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_SECONDS * 1000}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    # Statement counting and N+1 detection, see track_queries()
+    install_query_instrumentation(new_engine)
+    return new_engine
+
 
-# Create engine
-engine = create_engine(DATABASE_URL)
+def sync_id_sequences(db: Session, models) -> None:
+    """
+    Move id sequences of a server database past rows inserted with explicit
+    ids, so later inserts do not reuse them. SQLite needs nothing.
+    """
+    if db.get_bind().dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__tablename__
+        db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"))
+
+
+def lock_for_write(db: Session, models) -> None:
+    """
+    Take the write lock for the rest of the transaction, so that values read
+    after it, such as the largest ids, stay valid until the commit
+    """
+    from .models import DataVersion
+
+    if db.get_bind().dialect.name == 'sqlite':
+        # Any write statement takes SQLite's single write lock, even one that changes nothing
+        db.execute(update(DataVersion).where(false()).values(version=DataVersion.version))
+    elif db.get_bind().dialect.name == 'postgresql':
+        tables = ', '.join(model.__tablename__ for model in models)
+        db.execute(text(f"LOCK TABLE {tables} IN EXCLUSIVE MODE"))
+
+
+# Create engines: writes go through engine, statistics routes read through read_engine
+engine = create_db_engine(DATABASE_URL)
+read_engine = create_db_engine(DATABASE_URL, read_only=True)
 
 # SessionLocal factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions for request handlers that only read
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 def get_db() -> Session:
     """Get database session"""
     db = SessionLocal()
@@ -24,12 +131,190 @@ def get_db() -> Session:
     finally:
         db.close()
 
-def init_db():
-    """Initialize database tables"""
+def init_db() -> dict:
+    """Initialize database tables, returns what had to be created or migrated"""
     from .models import Base
+    inspector = inspect(engine)
+    missing = [table.name for table in Base.metadata.sorted_tables if not inspector.has_table(table.name)]
     Base.metadata.create_all(bind=engine)
+    return dict(migrate_db(new_tables=missing), tables_created=missing)
+
+def reset_db():
+    """Drop and recreate all tables, the data version keeps increasing across resets"""
+    from .models import Base
+    from .data_version import get_data_version, bump_data_version
+    db = SessionLocal()
+    try:
+        try:
+            version = get_data_version(db)
+        except Exception:
+            version = 0  # No version table yet
+        db.rollback()
+        Base.metadata.drop_all(bind=engine)
+        init_db()
+        bump_data_version(db, minimum=version)
+        db.commit()
+    finally:
+        db.close()
+
+# Materialized statistics tables, rebuilt from the matches when their layout changes
+DERIVED_TABLES = ('team_standings', 'team_totals', 'player_stats', 'player_totals', 'popular_goals')
+# Indexes existing databases may still have; ux_matches_fingerprint enforces the same natural key
+DROPPED_INDEXES = {'matches': ('ux_matches_natural_key',)}
+
+def migrate_db(bind=None, new_tables=()) -> dict:
+    """
+    Add columns and indexes that were introduced after an existing database
+    file was created. new_tables names tables just created next to existing
+    matches; new statistics tables among them are filled by a rebuild.
+    Returns the columns and indexes added, the indexes that could not be
+    built, the obsolete indexes dropped and whether the statistics tables
+    had to be rebuilt; an up-to-date database is left as is.
+    """
+    from .models import Base
+    bind = bind if bind is not None else engine
+    inspector = inspect(bind)
+    stale_statistics = 'matches' not in new_tables and any(name in DERIVED_TABLES for name in new_tables)
+    changes = {'columns_added': [], 'indexes_created': [], 'indexes_skipped': [], 'indexes_dropped': [],
+               'statistics_rebuilt': False}
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            if table.name in DERIVED_TABLES and _primary_key_changed(inspector, table):
+                # Counters are now kept per season; the rows are rebuilt below
+                table.drop(bind=conn)
+                table.create(bind=conn)
+                stale_statistics = True
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    changes['columns_added'].append(f"{table.name}.{column.name}")
+                    stale_statistics = stale_statistics or table.name in DERIVED_TABLES
+            if 'seconds' in table.columns and 'time' in table.columns:
+                _backfill_seconds(conn, table.name)
+            if table.name == 'matches' and inspector.has_table('teams'):
+                _backfill_fingerprints(conn)
+            if table.name == 'matches' and inspector.has_table('seasons'):
+                _backfill_seasons(conn)
+            if table.name == 'match_players' and inspector.has_table('matches') and inspector.has_table('players'):
+                _backfill_match_players(conn)
+            if table.name == 'match_timelines' and _has_legacy_timelines(conn):
+                # Timelines used to store the full state after every event
+                stale_statistics = True
+
+    inspector = inspect(bind)  # Tables may have been recreated above
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                index.create(bind=bind)
+                changes['indexes_created'].append(index.name)
+            except (IntegrityError, OperationalError) as e:
+                # A unique index cannot be built over existing duplicates
+                logger.warning("Could not create index %s: %s", index.name, e.orig)
+                changes['indexes_skipped'].append(index.name)
+        for name in DROPPED_INDEXES.get(table.name, ()):
+            if name in existing:
+                with bind.begin() as conn:
+                    conn.execute(text(f"DROP INDEX {name}"))
+                changes['indexes_dropped'].append(name)
+
+    if stale_statistics:
+        from src.statistics.materialized import rebuild_statistics
+        db = Session(bind=bind)
+        try:
+            rebuild_statistics(db)
+        finally:
+            db.close()
+        changes['statistics_rebuilt'] = True
+    return changes
+
+def _primary_key_changed(inspector, table) -> bool:
+    stored = inspector.get_pk_constraint(table.name)['constrained_columns']
+    return sorted(stored) != sorted(column.name for column in table.primary_key.columns)
+
+def _backfill_seconds(conn, table_name: str):
+    """Derive the integer seconds column from "mm:ss" times stored before it existed"""
+    from src.parsers.json_parser import time_to_seconds
+    rows = conn.execute(text(
+        f"SELECT id, time FROM {table_name} WHERE seconds IS NULL AND time IS NOT NULL"
+    )).all()
+    if rows:
+        conn.execute(text(f"UPDATE {table_name} SET seconds = :seconds WHERE id = :id"),
+                     [{'id': row_id, 'seconds': time_to_seconds(time)} for row_id, time in rows])
+
+def _backfill_fingerprints(conn):
+    """Fingerprint matches stored before the fingerprint column existed"""
+    from .models import match_fingerprint
+    rows = conn.execute(text(
+        "SELECT m.id, m.date, m.venue, home.name, away.name FROM matches m "
+        "JOIN teams home ON home.id = m.home_team_id JOIN teams away ON away.id = m.away_team_id "
+        "WHERE m.fingerprint IS NULL"
+    )).all()
+    if rows:
+        conn.execute(text("UPDATE matches SET fingerprint = :fingerprint WHERE id = :id"), [
+            # Stored dates read back as "YYYY-MM-DD hh:mm:ss" text
+            {'id': match_id, 'fingerprint': match_fingerprint(str(date)[:10], venue, home, away)}
+            for match_id, date, venue, home, away in rows
+        ])
+
+def _backfill_seasons(conn):
+    """Assign matches stored before seasons existed to the default competition"""
+    from .models import DEFAULT_COMPETITION, season_name
+    rows = conn.execute(text("SELECT id, date FROM matches WHERE season_id IS NULL AND date IS NOT NULL")).all()
+    if not rows:
+        return
+    competition_id = _get_or_insert(conn, "SELECT id FROM competitions WHERE name = :name",
+                                    "INSERT INTO competitions (name) VALUES (:name)", {'name': DEFAULT_COMPETITION})
+    seasons = {}
+    for match_id, date in rows:
+        # Stored dates read back as "YYYY-MM-DD hh:mm:ss" text
+        name = season_name(datetime.fromisoformat(str(date)))
+        seasons.setdefault(name, []).append(match_id)
+    for name, match_ids in seasons.items():
+        season_id = _get_or_insert(conn, "SELECT id FROM seasons WHERE competition_id = :competition AND name = :name",
+                                   "INSERT INTO seasons (competition_id, name) VALUES (:competition, :name)",
+                                   {'competition': competition_id, 'name': name})
+        conn.execute(text("UPDATE matches SET season_id = :season WHERE id = :id"),
+                     [{'season': season_id, 'id': match_id} for match_id in match_ids])
+
+def _get_or_insert(conn, select_sql: str, insert_sql: str, parameters: dict) -> int:
+    """Id of the row selected by select_sql, inserted first if missing"""
+    row_id = conn.execute(text(select_sql), parameters).scalar()
+    if row_id is None:
+        conn.execute(text(insert_sql), parameters)
+        row_id = conn.execute(text(select_sql), parameters).scalar()
+    return row_id
+
+def _has_legacy_timelines(conn) -> bool:
+    return conn.execute(text(
+        "SELECT 1 FROM match_timelines WHERE payload NOT LIKE '%\"checkpoints\":%' LIMIT 1"
+    )).first() is not None
+
+def _backfill_match_players(conn):
+    """
+    Rosters of matches stored before they were recorded. Players used to be
+    created only with their team, so a team's players were its roster.
+    """
+    conn.execute(text(
+        "INSERT INTO match_players (match_id, team_id, player_id) "
+        "SELECT m.id, p.team_id, p.id FROM matches m "
+        "JOIN players p ON p.team_id IN (m.home_team_id, m.away_team_id) "
+        "WHERE NOT EXISTS (SELECT 1 FROM match_players mp WHERE mp.match_id = m.id) "
+        "ORDER BY m.id, p.team_id = m.away_team_id, p.id"
+    ))
 
 # Optional: Add function to check database existence
 def database_exists():
-    """Check if database file exists"""
+    """Check if database file exists, or for a server database whether its tables do"""
+    if DATABASE_PATH is None:
+        return inspect(engine).has_table('matches')
     return os.path.exists(DATABASE_PATH)
\ No newline at end of file
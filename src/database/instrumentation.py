@@ -0,0 +1,123 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# A statement repeated this many times within one operation is reported as N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+# Trackers active in the current thread or task, innermost last
+_active_trackers = contextvars.ContextVar('active_query_trackers', default=())
+
+_totals_lock = threading.Lock()
+_operation_totals = {}
+
+
+class QueryStats:
+    """Statements issued during one logical operation"""
+
+    def __init__(self, operation: str, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.operation = operation
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.statements = Counter()
+        self.statement_time = 0.0
+        self.elapsed = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.statements.values())
+
+    def repeated_statements(self) -> List[str]:
+        """Identical statements issued often enough to look like an N+1 pattern"""
+        return [
+            statement for statement, count in self.statements.items()
+            if count >= self.n_plus_one_threshold
+        ]
+
+    def as_dict(self) -> Dict:
+        return {
+            'operation': self.operation,
+            'statements': self.count,
+            'statement_seconds': self.statement_time,
+            'elapsed_seconds': self.elapsed,
+            'n_plus_one': self.repeated_statements()
+        }
+
+
+def install_query_instrumentation(engine: Engine) -> None:
+    """Attach the statement listeners to an engine, safe to call more than once"""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_trackers.get():
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trackers = _active_trackers.get()
+    if not trackers:
+        return
+    start_times = conn.info.get('query_start_time')
+    duration = time.perf_counter() - start_times.pop() if start_times else 0.0
+    for stats in trackers:
+        stats.statements[statement] += 1
+        stats.statement_time += duration
+
+
+@contextmanager
+def track_queries(operation: str, engine: Optional[Engine] = None,
+                  n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD):
+    """
+    Count and time the statements issued inside the block.
+    Repeated identical statements are logged as a likely N+1 pattern and the
+    totals are added to the per-operation registry.
+    """
+    if engine is None:
+        from .database import engine
+    install_query_instrumentation(engine)
+
+    stats = QueryStats(operation, n_plus_one_threshold)
+    token = _active_trackers.set(_active_trackers.get() + (stats,))
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.elapsed = time.perf_counter() - start
+        _active_trackers.reset(token)
+        _record(stats)
+        for statement in stats.repeated_statements():
+            logger.warning("Possible N+1 in %s: %d x %s", operation, stats.statements[statement],
+                           statement.splitlines()[0])
+
+
+def _record(stats: QueryStats) -> None:
+    with _totals_lock:
+        totals = _operation_totals.setdefault(stats.operation, {
+            'calls': 0, 'statements': 0, 'statement_seconds': 0.0, 'elapsed_seconds': 0.0, 'n_plus_one': 0
+        })
+        totals['calls'] += 1
+        totals['statements'] += stats.count
+        totals['statement_seconds'] += stats.statement_time
+        totals['elapsed_seconds'] += stats.elapsed
+        totals['n_plus_one'] += len(stats.repeated_statements())
+
+
+def operation_stats() -> Dict[str, Dict]:
+    """Accumulated statement counts and timings per operation"""
+    with _totals_lock:
+        return {operation: dict(totals) for operation, totals in _operation_totals.items()}
+
+
+def reset_operation_stats() -> None:
+    with _totals_lock:
+        _operation_totals.clear()
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+import hashlib
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -22,6 +24,10 @@ class Team(Base):
 
 class Player(Base):
     __tablename__ = 'players'
+    __table_args__ = (
+        # Roster lookups by shirt number, not unique as rosters may repeat numbers
+        Index('ix_players_team_number', 'team_id', 'number'),
+    )
 
     id = Column(Integer, primary_key=True)
     team_id = Column(Integer, ForeignKey('teams.id'))
@@ -49,8 +55,8 @@ class MatchReferee(Base):
     __tablename__ = 'match_referees'
 
     id = Column(Integer, primary_key=True)
-    match_id = Column(Integer, ForeignKey('matches.id'))
-    referee_id = Column(Integer, ForeignKey('referees.id'))
+    match_id = Column(Integer, ForeignKey('matches.id'), index=True)
+    referee_id = Column(Integer, ForeignKey('referees.id'), index=True)
     is_main = Column(Boolean, default=False)
 
     # Relationships
@@ -58,36 +64,108 @@ class MatchReferee(Base):
     referee = relationship("Referee", back_populates="match_referees")
 
 
+# Competition of matches whose file does not name one
+DEFAULT_COMPETITION = 'Virslīga'
+# Month a season starts in; 1 gives calendar-year seasons named "2024",
+# later months give seasons spanning two years named "2024/25"
+SEASON_START_MONTH = 1
+
+
+def season_name(date: datetime, start_month: int = SEASON_START_MONTH) -> str:
+    """Name of the season a match played on `date` belongs to"""
+    if start_month == 1:
+        return str(date.year)
+    start_year = date.year if date.month >= start_month else date.year - 1
+    return f"{start_year}/{(start_year + 1) % 100:02d}"
+
+
+class Competition(Base):
+    __tablename__ = 'competitions'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)
+
+    # Relationships
+    seasons = relationship("Season", back_populates="competition")
+
+
+class Season(Base):
+    """One season of a competition, the partition key of matches and statistics"""
+    __tablename__ = 'seasons'
+    __table_args__ = (
+        Index('ux_seasons_competition_name', 'competition_id', 'name', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    competition_id = Column(Integer, ForeignKey('competitions.id'))
+    name = Column(String)
+
+    # Relationships
+    competition = relationship("Competition", back_populates="seasons")
+    matches = relationship("Match", back_populates="season")
+
+
+class MatchPlayer(Base):
+    """A player on the roster of one match"""
+    __tablename__ = 'match_players'
+
+    id = Column(Integer, primary_key=True)
+    match_id = Column(Integer, ForeignKey('matches.id'), index=True)
+    team_id = Column(Integer, ForeignKey('teams.id'))
+    player_id = Column(Integer, ForeignKey('players.id'), index=True)
+
+    # Relationships
+    match = relationship("Match")
+    player = relationship("Player")
+
+
+def match_fingerprint(day: str, venue: str, home_team: str, away_team: str) -> str:
+    """Natural key of a match ("YYYY-MM-DD" date, venue and team names) as a fixed-size digest"""
+    return hashlib.sha1('\x1f'.join((day, venue, home_team, away_team)).encode('utf-8')).hexdigest()
+
+
 # noinspection PyTypeChecker
 class Match(Base):
     __tablename__ = 'matches'
+    __table_args__ = (
+        # Natural key used to detect re-delivered matches, as match_fingerprint()
+        Index('ux_matches_fingerprint', 'fingerprint', unique=True),
+        Index('ix_matches_season_date', 'season_id', 'date'),
+    )
 
     id = Column(Integer, primary_key=True)
     date = Column(DateTime)
     venue = Column(String)
-    spectators = Column(Integer)
-    home_team_id = Column(Integer, ForeignKey('teams.id'))
-    away_team_id = Column(Integer, ForeignKey('teams.id'))
+    spectators = Column(Integer, index=True)
+    home_team_id = Column(Integer, ForeignKey('teams.id'), index=True)
+    away_team_id = Column(Integer, ForeignKey('teams.id'), index=True)
+    source_file_id = Column(Integer, ForeignKey('ingested_files.id'), nullable=True, index=True)
+    # match_fingerprint() of the natural key, checked before a file's teams and events are read
+    fingerprint = Column(String, nullable=True)
+    season_id = Column(Integer, ForeignKey('seasons.id'), nullable=True)
 
     # Relationships
+    season = relationship("Season", back_populates="matches")
     home_team = relationship("Team", foreign_keys=[home_team_id], back_populates="home_matches")
     away_team = relationship("Team", foreign_keys=[away_team_id], back_populates="away_matches")
     goals = relationship("Goal", back_populates="match")
     cards = relationship("Card", back_populates="match")
     substitutions = relationship("Substitution", back_populates="match")
     match_referees = relationship("MatchReferee", back_populates="match")
+    source_file = relationship("IngestedFile", back_populates="matches")
 
 
 class Goal(Base):
     __tablename__ = 'goals'
 
     id = Column(Integer, primary_key=True)
-    match_id = Column(Integer, ForeignKey('matches.id'))
+    match_id = Column(Integer, ForeignKey('matches.id'), index=True)
     team_id = Column(Integer, ForeignKey('teams.id'))
-    scorer_id = Column(Integer, ForeignKey('players.id'))
-    assist1_id = Column(Integer, ForeignKey('players.id'), nullable=True)
-    assist2_id = Column(Integer, ForeignKey('players.id'), nullable=True)
+    scorer_id = Column(Integer, ForeignKey('players.id'), index=True)
+    assist1_id = Column(Integer, ForeignKey('players.id'), nullable=True, index=True)
+    assist2_id = Column(Integer, ForeignKey('players.id'), nullable=True, index=True)
     time = Column(String)  # Format: "mm:ss"
+    seconds = Column(Integer, index=True)  # time as seconds from kick-off
     is_penalty = Column(Boolean, default=False)
 
     # Relationships
@@ -103,10 +181,11 @@ class Card(Base):
     __tablename__ = 'cards'
 
     id = Column(Integer, primary_key=True)
-    match_id = Column(Integer, ForeignKey('matches.id'))
+    match_id = Column(Integer, ForeignKey('matches.id'), index=True)
     team_id = Column(Integer, ForeignKey('teams.id'))
     player_id = Column(Integer, ForeignKey('players.id'))
     time = Column(String)  # Format: "mm:ss"
+    seconds = Column(Integer, index=True)  # time as seconds from kick-off
     is_red = Column(Boolean, default=False)
 
     # Relationships
@@ -119,11 +198,12 @@ class Substitution(Base):
     __tablename__ = 'substitutions'
 
     id = Column(Integer, primary_key=True)
-    match_id = Column(Integer, ForeignKey('matches.id'))
+    match_id = Column(Integer, ForeignKey('matches.id'), index=True)
     team_id = Column(Integer, ForeignKey('teams.id'))
-    player_out_id = Column(Integer, ForeignKey('players.id'))
+    player_out_id = Column(Integer, ForeignKey('players.id'), index=True)
     player_in_id = Column(Integer, ForeignKey('players.id'))
     time = Column(String)  # Format: "mm:ss"
+    seconds = Column(Integer, index=True)  # time as seconds from kick-off
 
     # Relationships
     match = relationship("Match", back_populates="substitutions")
@@ -134,6 +214,9 @@ class Substitution(Base):
 
 class Referee(Base):
     __tablename__ = 'referees'
+    __table_args__ = (
+        Index('ux_referees_name', 'first_name', 'last_name', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     first_name = Column(String)
@@ -143,4 +226,117 @@ class Referee(Base):
     match_referees = relationship("MatchReferee", back_populates="referee")
 
     def full_name(self):
-        return f"{self.first_name} {self.last_name}"
\ No newline at end of file
+        return f"{self.first_name} {self.last_name}"
+
+
+class IngestedFile(Base):
+    """Ingestion manifest entry for a file in the data directory"""
+    __tablename__ = 'ingested_files'
+
+    id = Column(Integer, primary_key=True)
+    path = Column(String, unique=True)  # Relative to the data directory
+    size = Column(Integer)
+    mtime = Column(Float)
+    content_hash = Column(String)  # SHA-256 hex digest
+    ingested_at = Column(DateTime)
+
+    # Relationships
+    matches = relationship("Match", back_populates="source_file")
+
+
+
+class DataVersion(Base):
+    """Single-row counter bumped by every change to the match data"""
+    __tablename__ = 'data_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0)
+    updated_at = Column(DateTime)
+
+# Materialized statistics, maintained by the parsers on every ingest
+
+class TeamStanding(Base):
+    __tablename__ = 'team_standings'
+
+    season_id = Column(Integer, ForeignKey('seasons.id'), primary_key=True)
+    team_id = Column(Integer, ForeignKey('teams.id'), primary_key=True)
+    matches_played = Column(Integer, default=0)
+    wins_regular = Column(Integer, default=0)
+    wins_overtime = Column(Integer, default=0)
+    losses_regular = Column(Integer, default=0)
+    losses_overtime = Column(Integer, default=0)
+    goals_for = Column(Integer, default=0)
+    goals_against = Column(Integer, default=0)
+
+    # Relationships
+    team = relationship("Team")
+
+
+class PlayerStat(Base):
+    __tablename__ = 'player_stats'
+
+    season_id = Column(Integer, ForeignKey('seasons.id'), primary_key=True)
+    player_id = Column(Integer, ForeignKey('players.id'), primary_key=True)
+    goals = Column(Integer, default=0)
+    assists = Column(Integer, default=0)
+    times_subbed_out = Column(Integer, default=0)
+
+    # Relationships
+    player = relationship("Player")
+
+
+class TeamTotal(Base):
+    """TeamStanding summed over every season"""
+    __tablename__ = 'team_totals'
+
+    team_id = Column(Integer, ForeignKey('teams.id'), primary_key=True)
+    matches_played = Column(Integer, default=0)
+    wins_regular = Column(Integer, default=0)
+    wins_overtime = Column(Integer, default=0)
+    losses_regular = Column(Integer, default=0)
+    losses_overtime = Column(Integer, default=0)
+    goals_for = Column(Integer, default=0)
+    goals_against = Column(Integer, default=0)
+
+
+class PlayerTotal(Base):
+    """PlayerStat summed over every season"""
+    __tablename__ = 'player_totals'
+
+    player_id = Column(Integer, ForeignKey('players.id'), primary_key=True)
+    goals = Column(Integer, default=0)
+    assists = Column(Integer, default=0)
+    times_subbed_out = Column(Integer, default=0)
+
+
+class PopularGoal(Base):
+    __tablename__ = 'popular_goals'
+
+    goal_id = Column(Integer, ForeignKey('goals.id'), primary_key=True)
+    match_id = Column(Integer, ForeignKey('matches.id'), index=True)
+    season_id = Column(Integer, ForeignKey('seasons.id'))
+    spectators = Column(Integer)
+
+    # Relationships
+    goal = relationship("Goal")
+
+
+class MatchTimeline(Base):
+    """Ordered events of a match with the game state after each one, see statistics/timeline.py"""
+    __tablename__ = 'match_timelines'
+
+    match_id = Column(Integer, ForeignKey('matches.id'), primary_key=True)
+    payload = Column(Text)  # Compact JSON
+
+
+# Rankings lead with the season so a per-season page reads only that partition
+Index('ix_player_stats_season_scoring', PlayerStat.season_id, PlayerStat.goals.desc(), PlayerStat.assists.desc(),
+      PlayerStat.player_id)
+Index('ix_player_stats_season_subbed_out', PlayerStat.season_id, PlayerStat.times_subbed_out.desc(),
+      PlayerStat.player_id)
+Index('ix_player_stats_player', PlayerStat.player_id)
+Index('ix_player_totals_scoring', PlayerTotal.goals.desc(), PlayerTotal.assists.desc(), PlayerTotal.player_id)
+Index('ix_player_totals_subbed_out', PlayerTotal.times_subbed_out.desc(), PlayerTotal.player_id)
+Index('ix_popular_goals_spectators', PopularGoal.spectators.desc(), PopularGoal.goal_id)
+Index('ix_popular_goals_season_spectators', PopularGoal.season_id, PopularGoal.spectators.desc(),
+      PopularGoal.goal_id)
@@ -0,0 +1,168 @@
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import quote
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from .database import BUSY_TIMEOUT_SECONDS, DATABASE_PATH, POOL_SIZE, MAX_OVERFLOW, SRC_DIR
+from .instrumentation import install_query_instrumentation
+
+# Published snapshots, FOOTBALL_STATS_SNAPSHOT_DIR overrides it; None when the data lives on a server
+SNAPSHOT_DIR = os.environ.get('FOOTBALL_STATS_SNAPSHOT_DIR') or \
+    (os.path.join(SRC_DIR, 'snapshots') if DATABASE_PATH else None)
+# Holds the file name of the newest snapshot, replaced atomically on publish
+CURRENT_FILE = 'CURRENT'
+SNAPSHOT_PREFIX = 'football_stats.'
+SNAPSHOT_SUFFIX = '.snapshot.db'
+# Older snapshots are kept for requests that are still reading them
+KEEP_SNAPSHOTS = 3
+# Snapshots are small and never written, map all of it
+SNAPSHOT_MMAP_SIZE = 1 << 30
+
+
+def publish_snapshot(database_path: str, snapshot_dir: str, keep: int = KEEP_SNAPSHOTS) -> str:
+    """
+    Write a compacted copy of the database with VACUUM INTO and make it the
+    current snapshot. The copy is complete before CURRENT is replaced, so
+    readers switch from one whole snapshot to the next. Returns its path.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with closing(sqlite3.connect(database_path, timeout=BUSY_TIMEOUT_SECONDS)) as source:
+        try:
+            version = source.execute("SELECT version FROM data_version WHERE id = 1").fetchone()
+        except sqlite3.OperationalError:
+            version = None  # Not initialized yet
+        name = f"{SNAPSHOT_PREFIX}{version[0] if version else 0}.{uuid.uuid4().hex[:8]}{SNAPSHOT_SUFFIX}"
+        path = os.path.join(snapshot_dir, name)
+        source.execute("VACUUM INTO ?", (f"{path}.tmp",))
+    os.replace(f"{path}.tmp", path)
+    os.chmod(path, 0o444)
+
+    pointer = os.path.join(snapshot_dir, CURRENT_FILE)
+    with open(f"{pointer}.tmp", 'w', encoding='utf-8') as file:
+        file.write(name)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(f"{pointer}.tmp", pointer)
+
+    _remove_old_snapshots(snapshot_dir, name, keep)
+    return path
+
+
+def current_snapshot(snapshot_dir: str) -> Optional[str]:
+    """Path of the current snapshot, None before the first publish"""
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILE), encoding='utf-8') as file:
+            return os.path.join(snapshot_dir, file.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def _remove_old_snapshots(snapshot_dir: str, current: str, keep: int) -> None:
+    names = [name for name in os.listdir(snapshot_dir)
+             if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX) and name != current]
+    names.sort(key=lambda name: os.path.getmtime(os.path.join(snapshot_dir, name)), reverse=True)
+    # Readers that still have a removed file open keep reading it until they close
+    for name in names[max(0, keep - 1):]:
+        try:
+            os.remove(os.path.join(snapshot_dir, name))
+        except OSError:
+            pass
+
+
+def create_snapshot_engine(path: str) -> Engine:
+    """
+    Engine over a snapshot file. immutable=1 tells SQLite the file never
+    changes, so it takes no locks and never checks for other writers, and
+    the whole file is memory-mapped.
+    """
+    new_engine = create_engine(
+        f"sqlite:///file:{quote(path)}?mode=ro&immutable=1&uri=true",
+        connect_args={'check_same_thread': False},
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW
+    )
+
+    @event.listens_for(new_engine, 'connect')
+    def _configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA mmap_size={SNAPSHOT_MMAP_SIZE}")
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    install_query_instrumentation(new_engine)
+    return new_engine
+
+
+class SnapshotReader:
+    """
+    Session factory over the newest published snapshot.
+    Each call checks CURRENT and switches to a newer snapshot before opening
+    the session; sessions already open stay on the snapshot they started on.
+    Until the first snapshot is published sessions come from `fallback`.
+    """
+
+    def __init__(self, snapshot_dir: Optional[str], fallback: sessionmaker):
+        self.snapshot_dir = snapshot_dir
+        self.fallback = fallback
+        self.switches = 0
+        self._lock = threading.Lock()
+        self._pointer_state = None
+        self._path = None
+        self._engine = None
+        self._sessions = None
+        self._switched_at = None
+
+    def __call__(self) -> Session:
+        sessions = self.refresh()
+        return sessions() if sessions is not None else self.fallback()
+
+    def refresh(self) -> Optional[sessionmaker]:
+        """Session factory of the current snapshot, None if there is none"""
+        if self.snapshot_dir is None:
+            return None
+        try:
+            stat = os.stat(os.path.join(self.snapshot_dir, CURRENT_FILE))
+            # CURRENT is replaced, never rewritten, so a new inode means a new snapshot
+            pointer_state = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            pointer_state = None
+        if pointer_state == self._pointer_state:
+            return self._sessions
+
+        with self._lock:
+            if pointer_state != self._pointer_state:
+                path = current_snapshot(self.snapshot_dir) if pointer_state else None
+                if path != self._path:
+                    self._switch(path)
+                self._pointer_state = pointer_state
+            return self._sessions
+
+    def _switch(self, path: Optional[str]) -> None:
+        previous = self._engine
+        self._engine = create_snapshot_engine(path) if path else None
+        self._sessions = sessionmaker(autocommit=False, autoflush=False, bind=self._engine) if path else None
+        self._path = path
+        self.switches += 1
+        self._switched_at = datetime.now()
+        if previous is not None:
+            # Connections still checked out are closed when their session ends
+            previous.dispose()
+
+    def stats(self) -> Dict:
+        return {
+            'snapshot': os.path.basename(self._path) if self._path else None,
+            'switches': self.switches,
+            'switched_at': self._switched_at.isoformat(timespec='seconds') if self._switched_at else None
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+            self._engine = self._sessions = self._path = self._pointer_state = None
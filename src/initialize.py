@@ -1,61 +1,115 @@
+import argparse
 import os
-from database.database import SessionLocal, engine
-from database.models import Base
-from parsers.json_parser import MatchParser
+import sys
+from typing import Dict, Optional
+
+# Add the project root to sys.path so the script can be run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.database import SessionLocal, init_db, reset_db, SRC_DIR, DATABASE_PATH
+from src.database.snapshots import current_snapshot, publish_snapshot, SNAPSHOT_DIR
+from src.parsers.archive import export_archive, load_archive
+from src.parsers.manifest import reload_data_dir, scan_data_dir
+from src.parsers.pipeline import DEFAULT_QUEUE_DEPTH
+from src.statistics.materialized import rebuild_statistics
+
+# Directory watched for match JSON files, FOOTBALL_STATS_DATA_DIR overrides it
+DATA_DIR = os.environ.get('FOOTBALL_STATS_DATA_DIR') or os.path.join(SRC_DIR, 'data')
 
 
 def reset_database():
     """Drop all tables and recreate them"""
     print("Resetting database...")
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    reset_db()
     print("Database reset complete")
 
 
-def initialize_database():
-    """Initialize the database and load match data"""
+def initialize_database(data_dir: str = DATA_DIR, workers: Optional[int] = None,
+                        queue_depth: int = DEFAULT_QUEUE_DEPTH, archive_path: Optional[str] = None):
+    """
+    Initialize the database and load match data.
+    Files are decoded by `workers` processes (defaults to the CPU count) with
+    at most `queue_depth` files decoded ahead of the database writer. With
+    archive_path the matches come from an archive written by export_archive
+    instead, without decoding any JSON.
+    """
     print("Checking database...")
 
     # Reset database to ensure clean state
     reset_database()
 
+    if archive_path:
+        return load_database_archive(archive_path)
+    return reload_database(data_dir, workers, queue_depth)
+
+
+def load_database_archive(archive_path: str):
+    """Load the matches of an archive into the freshly reset database"""
+    init_db()
+    db = SessionLocal()
+    try:
+        summary = load_archive(db, archive_path)
+        print(f"Stored {summary['stored']} matches from {summary['files']} archived files")
+        publish_read_snapshot()
+        return True
+    except Exception as e:
+        print(f"An error occurred while loading {archive_path}: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def export_database_archive(archive_path: str, data_dir: str = DATA_DIR, workers: Optional[int] = None):
+    """Write the match files of the data directory to an archive"""
+    summary = export_archive(data_dir, archive_path, workers)
+    print(f"Archived {summary['matches']} matches from {summary['files']} files "
+          f"into {summary['bytes']} bytes, {len(summary['failed_files'])} files left out")
+    print_failures(summary, "Not archived")
+    return summary
+
+
+def print_failures(summary: Dict, action: str):
+    """One line per file or season dump match an ingest summary lists as failed"""
+    for failure in summary['failures']:
+        source = f"match {failure['index']} of {failure['file']}" if 'index' in failure else failure['file']
+        print(f"{action} {source}: {failure['error']}")
+
+
+def reload_database(data_dir: str = DATA_DIR, workers: Optional[int] = None,
+                    queue_depth: int = DEFAULT_QUEUE_DEPTH):
+    """
+    Incrementally load match data.
+    Only files that are new or changed since the last load are parsed, and
+    matches of changed or deleted files are removed.
+    """
+    init_db()
+
     # Create database session
     db = SessionLocal()
 
     try:
-        # Get path to data directory
-        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-
         if not os.path.exists(data_dir):
             print(f"Data directory not found at {data_dir}")
             return False
 
-        # Create parser instance
-        parser = MatchParser(db)
-
-        # Get all JSON files sorted by name
-        json_files = sorted([f for f in os.listdir(data_dir) if f.endswith('.json')])
+        # Get all JSON and NDJSON files sorted by name
+        json_files = list(scan_data_dir(data_dir))
 
-        if not json_files:
+        if json_files:
+            print(f"Found {len(json_files)} match files")
+        else:
             print("No JSON files found in data directory")
-            return False
 
-        print(f"Found {len(json_files)} match files to process")
-
-        # Parse each file
-        for filename in json_files:
-            try:
-                file_path = os.path.join(data_dir, filename)
-                print(f"Processing {filename}...")
-                parser.parse_file(file_path)
-                db.commit()  # Commit after each successful file
-                print(f"Successfully processed {filename}")
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-                db.rollback()  # Rollback on error
-                continue  # Continue with next file
+        # Decode changed files in parallel and persist them in order
+        summary = reload_data_dir(db, data_dir, workers=workers, queue_depth=queue_depth)
+        print(f"{summary['new']} new, {summary['changed']} changed, {summary['deleted']} deleted, "
+              f"{summary['unchanged']} unchanged files")
+        print(f"Stored {summary['stored']} matches, "
+              f"skipped {summary['duplicates']} duplicates, {summary['errors']} errors")
+        print_failures(summary, "Could not store")
 
         print("\nData loading complete!")
+        publish_read_snapshot()
         return True
 
     except Exception as e:
@@ -65,8 +119,59 @@ def initialize_database():
         db.close()
 
 
+def upgrade_database():
+    """
+    Bring an existing database up to the current schema.
+    The statistics tables are only rebuilt when their layout changed, and a
+    snapshot is only published when there is none yet or the schema changed.
+    """
+    changes = init_db()
+    for name in changes['indexes_skipped']:
+        print(f"Index {name} could not be built, remove the duplicate rows and restart")
+    schema_changed = any(changes[key] for key in ('tables_created', 'columns_added', 'indexes_created',
+                                                  'indexes_dropped', 'statistics_rebuilt'))
+    if schema_changed or (SNAPSHOT_DIR is not None and current_snapshot(SNAPSHOT_DIR) is None):
+        publish_read_snapshot()
+    return changes
+
+
+def rebuild_materialized_statistics():
+    """Regenerate the statistics tables from the stored matches"""
+    init_db()
+    db = SessionLocal()
+    try:
+        rebuild_statistics(db)
+        print("Statistics tables rebuilt")
+    finally:
+        db.close()
+    publish_read_snapshot()
+
+
+def publish_read_snapshot():
+    """Publish the database as the snapshot the web app reads from"""
+    if SNAPSHOT_DIR is None:
+        return
+    path = publish_snapshot(DATABASE_PATH, SNAPSHOT_DIR)
+    print(f"Published read snapshot {os.path.basename(path)}")
+
+
 if __name__ == "__main__":
-    if initialize_database():
+    arg_parser = argparse.ArgumentParser(description="Load match files into the database")
+    arg_parser.add_argument('--rebuild-stats', action='store_true',
+                            help="only regenerate the materialized statistics tables")
+    arg_parser.add_argument('--workers', type=int, default=None)
+    arg_parser.add_argument('--queue-depth', type=int, default=DEFAULT_QUEUE_DEPTH)
+    arg_parser.add_argument('--export-archive', metavar='PATH',
+                            help="write the data directory to a binary archive instead of loading it")
+    arg_parser.add_argument('--from-archive', metavar='PATH',
+                            help="rebuild the database from a binary archive instead of the JSON files")
+    args = arg_parser.parse_args()
+
+    if args.rebuild_stats:
+        rebuild_materialized_statistics()
+    elif args.export_archive:
+        export_database_archive(args.export_archive, workers=args.workers)
+    elif initialize_database(workers=args.workers, queue_depth=args.queue_depth, archive_path=args.from_archive):
         print("Initialization completed successfully")
     else:
         print("Initialization failed")
\ No newline at end of file
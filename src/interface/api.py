@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from flask import Response, jsonify, request
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+class ApiError(Exception):
+    """Request error reported to the client as a JSON message"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_pagination() -> Tuple[int, int]:
+    """limit and offset query parameters, validated and capped"""
+    limit = _int_arg('limit', DEFAULT_LIMIT)
+    offset = _int_arg('offset', 0)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f"limit must be between 1 and {MAX_LIMIT}")
+    if offset < 0:
+        raise ApiError("offset must not be negative")
+    return limit, offset
+
+
+def parse_fields() -> Optional[List[str]]:
+    """Comma separated fields query parameter, None when absent"""
+    value = request.args.get('fields')
+    if value is None:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    if not fields:
+        raise ApiError("fields must name at least one field")
+    return fields
+
+
+def select_fields(rows: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    """Keep only the requested keys of every row"""
+    if fields is None or not rows:
+        return rows
+    unknown = [field for field in fields if field not in rows[0]]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}; available: {', '.join(rows[0])}")
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+def optional_int_arg(name: str) -> Optional[int]:
+    return _int_arg(name, None)
+
+
+def _int_arg(name: str, default):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f"{name} must be an integer")
+
+
+def version_etag(version: int) -> str:
+    return f"v{version}"
+
+
+def _http_time(updated_at: Optional[datetime]) -> Optional[datetime]:
+    """Stored change times are local; HTTP dates are UTC with second precision"""
+    if updated_at is None:
+        return None
+    return updated_at.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def not_modified(version: int, updated_at: Optional[datetime]) -> Optional[Response]:
+    """
+    A 304 response if the client already holds this data version, else None.
+    Checked before any statistics are computed, so revalidation costs one read.
+    If-None-Match takes precedence over If-Modified-Since.
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(version_etag(version))
+    elif request.if_modified_since and updated_at is not None:
+        fresh = _http_time(updated_at) <= request.if_modified_since
+    else:
+        fresh = False
+
+    if not fresh:
+        return None
+    response = Response(status=304)
+    _add_validators(response, version, updated_at)
+    return response
+
+
+def conditional_json(payload: Dict, version: int, updated_at: Optional[datetime]) -> Response:
+    """JSON response carrying validators derived from the data version"""
+    response = jsonify(payload)
+    _add_validators(response, version, updated_at)
+    return response
+
+
+def _add_validators(response: Response, version: int, updated_at: Optional[datetime]) -> None:
+    # Weak: the same version may be served with different encodings
+    response.set_etag(version_etag(version), weak=True)
+    if updated_at is not None:
+        response.last_modified = _http_time(updated_at)
+    # Shared caches may store responses but must revalidate every time
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
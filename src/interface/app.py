@@ -1,49 +1,282 @@
-from flask import Flask, render_template, jsonify
-from src.database.database import SessionLocal, init_db, engine
-from src.database.models import Base
+import time
+from flask import Flask, Response, g, render_template, jsonify, request
+from src.database.database import ReadSessionLocal as LiveReadSessionLocal, reset_db, DATABASE_PATH, DATABASE_URL
+from src.database.data_version import get_data_version, get_data_state
+from src.database.instrumentation import track_queries, operation_stats
+from src.database.snapshots import SnapshotReader, SNAPSHOT_DIR
+from src.statistics.cache import StatisticsCache
 from src.statistics.standings_calculator import StandingsCalculator
 from src.statistics.scorers_calculator import TopScorersCalculator
 from src.statistics.substitutions_calculator import SubstitutionCalculator
 from src.statistics.popular_goals_calculator import PopularGoalsCalculator
-from src.initialize import initialize_database
+from src.statistics.details_calculator import DetailsCalculator
+from src.statistics.timeline import TimelineCalculator
+from src.statistics.seasons import SeasonCalculator, resolve_seasons
+from src.statistics.formatting import format_event_time
+from src.interface.api import (ApiError, parse_pagination, parse_fields, select_fields, optional_int_arg,
+                               not_modified, conditional_json)
+from src.initialize import DATA_DIR, publish_read_snapshot
+from src.parsers.reload_job import ReloadJobManager, SUCCEEDED, FAILED
+from src.parsers.watcher import DataDirWatcher, LAG_BUCKETS, SETTLE_SECONDS
+from src.profiling import (metrics_enabled, observe, render_histogram, render_histograms, render_counters,
+                           start_profile, profile_report)
 
 app = Flask(__name__)
+app.add_template_filter(format_event_time, 'event_time')
+
+# Shared by all requests, entries are keyed by data version
+statistics_cache = StatisticsCache()
+
+# Requests read the newest published snapshot, never the database ingest writes to
+snapshot_reader = SnapshotReader(SNAPSHOT_DIR, fallback=LiveReadSessionLocal)
+ReadSessionLocal = snapshot_reader
+
+# Reloads run in the background and publish a new snapshot once complete
+reload_jobs = ReloadJobManager(DATABASE_PATH, DATA_DIR, settle_seconds=SETTLE_SECONDS, database_url=DATABASE_URL,
+                               snapshot_dir=SNAPSHOT_DIR)
+# Feeds new files into reload_jobs once started, see main.py --watch
+data_watcher = DataDirWatcher(reload_jobs, DATA_DIR)
+
+@app.before_request
+def start_request_timing():
+    if metrics_enabled():
+        g.request_started = time.perf_counter()
+    # ?profile=1 returns the cProfile report instead of the response, see main.py --profile
+    if app.config.get('PROFILE_REQUESTS') and request.args.get('profile') == '1':
+        g.profile = start_profile()
+
+@app.after_request
+def finish_request_timing(response):
+    started = g.pop('request_started', None)
+    if started is not None and request.endpoint is not None:
+        observe(f"route.{request.endpoint}", time.perf_counter() - started)
+    profile = g.pop('profile', None)
+    if profile is not None:
+        return Response(profile_report(profile), mimetype='text/plain')
+    return response
 
 @app.route('/')
 def index():
-    db = SessionLocal()
+    """Statistics page, scoped by ?season=<id> and ?competition=<id> like the /api/* routes"""
+    season_id, competition_id = optional_int_arg('season'), optional_int_arg('competition')
+    db = ReadSessionLocal()
     try:
-        standings_calc = StandingsCalculator(db)
-        scorers_calc = TopScorersCalculator(db)
-        substitutions_calc = SubstitutionCalculator(db)
-        popular_goals_calc = PopularGoalsCalculator(db)
-
-        data = {
-            'standings': standings_calc.calculate_standings(),
-            'scorers': scorers_calc.calculate_top_scorers(),
-            'substitutions': substitutions_calc.calculate_substitution_stats(),
-            'goals': popular_goals_calc.calculate_popular_goals()
-        }
-        return render_template('index.html', data=data)
+        with track_queries('index'):
+            version = get_data_version(db)
+            return statistics_cache.get_or_compute(
+                ('index', season_id, competition_id, version),
+                lambda: _render_index(db, _seasons(db, season_id, competition_id))
+            )
     finally:
         db.close()
 
+def _render_index(db, seasons):
+    # Read from the statistics tables maintained on ingest
+    standings_calc = StandingsCalculator(db, materialized=True, cache=statistics_cache, seasons=seasons)
+    scorers_calc = TopScorersCalculator(db, materialized=True, cache=statistics_cache, seasons=seasons)
+    substitutions_calc = SubstitutionCalculator(db, materialized=True, cache=statistics_cache, seasons=seasons)
+    popular_goals_calc = PopularGoalsCalculator(db, materialized=True, cache=statistics_cache, seasons=seasons)
+
+    data = {
+        'standings': standings_calc.calculate_standings(),
+        'scorers': scorers_calc.calculate_top_scorers(),
+        'substitutions': substitutions_calc.calculate_substitution_stats(),
+        'goals': popular_goals_calc.calculate_popular_goals()
+    }
+    return render_template('index.html', data=data)
+
+@app.errorhandler(ApiError)
+def api_error(error):
+    return jsonify({"status": "error", "message": error.message}), error.status
+
+def _statistics_response(compute, paginated=True):
+    """
+    Serve a statistics payload with ETag/Last-Modified validators.
+    A client holding the current data version gets a 304 before anything is computed.
+    ?season=<id> and ?competition=<id> scope the statistics, without them every season is rolled up.
+    """
+    limit, offset = parse_pagination() if paginated else (None, None)
+    fields = parse_fields()
+    season_id, competition_id = optional_int_arg('season'), optional_int_arg('competition')
+    db = ReadSessionLocal()
+    try:
+        with track_queries(f"api.{request.endpoint}"):
+            version, updated_at = get_data_state(db)
+            response = not_modified(version, updated_at)
+            if response is not None:
+                return response
+            # Field selection happens on the cached rows, so it is not part of the key
+            arguments = tuple(sorted((key, value) for key, value in request.args.items(multi=True)
+                                     if key != 'fields'))
+            data = statistics_cache.get_or_compute(('api', request.path, arguments, version),
+                                                   lambda: compute(db, limit, offset,
+                                                                   _seasons(db, season_id, competition_id)))
+    finally:
+        db.close()
+
+    if data is None:
+        raise ApiError("Not found", 404)
+    if paginated:
+        payload = {'limit': limit, 'offset': offset, 'data': select_fields(data, fields)}
+    else:
+        payload = {'data': select_fields([data], fields)[0]}
+    payload['version'] = version
+    return conditional_json(payload, version, updated_at)
+
+def _seasons(db, season_id, competition_id):
+    seasons = resolve_seasons(db, season_id, competition_id)
+    if seasons is not None and not seasons:
+        raise ApiError("Unknown season or competition", 404)
+    return seasons
+
+@app.route('/api/seasons', methods=['GET'])
+def api_seasons():
+    return _statistics_response(
+        lambda db, limit, offset, _scope: SeasonCalculator(db).list_seasons()[offset:offset + limit]
+    )
+
+@app.route('/api/standings', methods=['GET'])
+def api_standings():
+    return _statistics_response(
+        lambda db, limit, offset, seasons: StandingsCalculator(db, materialized=True, cache=statistics_cache,
+                                                               seasons=seasons)
+        .calculate_standings()[offset:offset + limit]
+    )
+
+@app.route('/api/scorers', methods=['GET'])
+def api_scorers():
+    return _statistics_response(
+        lambda db, limit, offset, seasons: TopScorersCalculator(db, materialized=True, cache=statistics_cache,
+                                                                seasons=seasons)
+        .calculate_top_scorers(limit=limit, offset=offset)
+    )
+
+@app.route('/api/substitutions', methods=['GET'])
+def api_substitutions():
+    return _statistics_response(
+        lambda db, limit, offset, seasons: SubstitutionCalculator(db, materialized=True, cache=statistics_cache,
+                                                                  seasons=seasons)
+        .calculate_substitution_stats(limit=limit, offset=offset)
+    )
+
+@app.route('/api/goals/popular', methods=['GET'])
+def api_popular_goals():
+    after_seconds = optional_int_arg('after_seconds')
+    return _statistics_response(
+        lambda db, limit, offset, seasons: PopularGoalsCalculator(db, materialized=True, cache=statistics_cache,
+                                                                  seasons=seasons)
+        .calculate_popular_goals(limit=limit, offset=offset, after_seconds=after_seconds)
+    )
+
+@app.route('/api/teams/<int:team_id>', methods=['GET'])
+def api_team(team_id):
+    return _statistics_response(
+        lambda db, limit, offset, seasons: DetailsCalculator(db, cache=statistics_cache, seasons=seasons)
+        .team_details(team_id),
+        paginated=False
+    )
+
+@app.route('/api/players/<int:player_id>', methods=['GET'])
+def api_player(player_id):
+    # limit and offset page through the player's goals
+    limit, offset = parse_pagination()
+    return _statistics_response(
+        lambda db, _limit, _offset, seasons: DetailsCalculator(db, cache=statistics_cache, seasons=seasons)
+        .player_details(player_id, limit=limit, offset=offset),
+        paginated=False
+    )
+
+@app.route('/api/matches/<int:match_id>/timeline', methods=['GET'])
+def api_match_timeline(match_id):
+    # With at_seconds, the state of the match at that moment instead of the full event list
+    at_seconds = optional_int_arg('at_seconds')
+    if at_seconds is None:
+        return _statistics_response(lambda db, _limit, _offset, _scope: TimelineCalculator(db).timeline(match_id),
+                                    paginated=False)
+    if at_seconds < 0:
+        raise ApiError("at_seconds must not be negative")
+    return _statistics_response(
+        lambda db, _limit, _offset, _scope: TimelineCalculator(db).state_at(match_id, at_seconds),
+        paginated=False
+    )
+
+@app.route('/api/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(statistics_cache.stats())
+
+@app.route('/api/queries', methods=['GET'])
+def query_stats():
+    return jsonify(operation_stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Operation timings, statement totals, cache counters and ingest lag for Prometheus"""
+    queries = operation_stats()
+    cache = statistics_cache.stats()
+    body = ''.join([
+        render_histograms(),
+        render_counters('query_statements_total', "SQL statements issued per operation",
+                        {operation: totals['statements'] for operation, totals in queries.items()}),
+        render_counters('query_seconds_total', "Time spent executing SQL statements per operation",
+                        {operation: totals['statement_seconds'] for operation, totals in queries.items()}),
+        render_counters('cache_requests_total', "Statistics cache lookups by result",
+                        {'hit': cache['hits'], 'miss': cache['misses']}, label='result'),
+        render_histogram('ingest_lag_seconds', "Time from a match file landing to its matches being served",
+                         LAG_BUCKETS, data_watcher.lag_histogram())
+    ])
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/watcher', methods=['GET'])
+def watcher_stats():
+    return jsonify(data_watcher.stats())
+
+@app.route('/api/snapshot', methods=['GET'])
+def snapshot_stats():
+    return jsonify(snapshot_reader.stats())
+
 @app.route('/api/flush', methods=['POST'])
 def flush_data():
+    # A reload publishing afterwards would bring the flushed data back
+    if not reload_jobs.write_lock.acquire(blocking=False):
+        raise ApiError("A reload is in progress, cancel it or try again later", 409)
     try:
-        Base.metadata.drop_all(bind=engine)
-        init_db()
+        reset_db()
+        # Requests in flight finish on the old snapshot, new ones see the empty database
+        publish_read_snapshot()
+        statistics_cache.clear()
         return jsonify({"status": "success", "message": "Database flushed successfully"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        reload_jobs.write_lock.release()
 
 @app.route('/api/reload', methods=['POST'])
 def reload_data():
-    try:
-        initialize_database()
-        return jsonify({"status": "success", "message": "Data reloaded successfully"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+    job = reload_jobs.submit()
+    response = jsonify({"status": "accepted", "job": job.as_dict()})
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify({"data": [job.as_dict() for job in reload_jobs.jobs()]})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = reload_jobs.get(job_id)
+    if job is None:
+        raise ApiError("Unknown job", 404)
+    return jsonify(job.as_dict())
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = reload_jobs.cancel(job_id)
+    if job is None:
+        raise ApiError("Unknown job", 404)
+    if job.state in (SUCCEEDED, FAILED):
+        raise ApiError(f"Job already {job.state}", 409)
+    return jsonify(job.as_dict()), 202
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,26 @@
+from flask import Flask
+from src.database.database import POOL_SIZE
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 5000
+# One thread per pooled read connection
+DEFAULT_THREADS = POOL_SIZE
+
+
+def serve_production(app: Flask, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                     threads: int = DEFAULT_THREADS) -> None:
+    """
+    Serve the app with a multi-threaded production WSGI server.
+    Uses waitress when installed and falls back to Werkzeug's threaded
+    server, which has no debugger or reloader in this mode.
+    """
+    try:
+        from waitress import serve
+    except ImportError:
+        print("waitress is not installed, falling back to the threaded Werkzeug server")
+        from werkzeug.serving import run_simple
+        run_simple(host, port, app, threaded=True)
+        return
+
+    print(f"Serving on http://{host}:{port} with {threads} threads")
+    serve(app, host=host, port=port, threads=threads)
@@ -1,16 +1,49 @@
-from database.database import database_exists
-from initialize import initialize_database
-from src.interface.app import app
+import argparse
+import os
+from src.database.database import database_exists
+from src.initialize import initialize_database, upgrade_database
+from src.interface.app import app, data_watcher
+from src.interface.server import serve_production, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_THREADS
+from src.profiling import enable_metrics
 
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Football statistics web application")
+    arg_parser.add_argument('--production', action='store_true',
+                            help="serve with a multi-threaded WSGI server instead of the debug server")
+    arg_parser.add_argument('--host', default=DEFAULT_HOST)
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    arg_parser.add_argument('--threads', type=int, default=DEFAULT_THREADS)
+    arg_parser.add_argument('--watch', action='store_true',
+                            help="ingest new files in the data directory as they arrive")
+    arg_parser.add_argument('--metrics', action='store_true',
+                            help="time parsers, calculators and routes and serve the histograms at /metrics")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="return a cProfile report for requests made with ?profile=1")
+    args = arg_parser.parse_args()
+
     # Initialize database only if it doesn't exist
     if not database_exists():
         initialize_database()
+    else:
+        # Bring an existing database file up to the current schema, the
+        # statistics tables are kept up to date by every ingest
+        upgrade_database()
+
+    if args.metrics:
+        enable_metrics()
+    app.config['PROFILE_REQUESTS'] = args.profile
+
+    # The debug server runs the app in a reloader child process, watch from there only
+    if args.watch and (args.production or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        data_watcher.start()
 
     # Start Flask app
-    app.run(debug=True)
+    if args.production:
+        serve_production(app, args.host, args.port, args.threads)
+    else:
+        app.run(host=args.host, port=args.port, debug=True)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
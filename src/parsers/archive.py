@@ -0,0 +1,344 @@
+import math
+import mmap
+import os
+import struct
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import Boolean, DateTime, Float, Integer, String, func, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+from src.database.database import DERIVED_TABLES, create_db_engine, sync_id_sequences
+from src.database.models import Base, DataVersion, MatchTimeline
+from src.parsers.manifest import reload_data_dir
+from src.profiling import timed
+from src.statistics.materialized import rebuild_statistics
+
+# Compact binary archive of the stored match tables, for cold rebuilds that
+# skip decoding the JSON feed and resolving identities.
+#
+# All integers are little-endian. The file is laid out as
+#
+#     header      magic, format version, counts and section offsets
+#     rows        the fixed-width rows of every table, in dependency order
+#     tables      name, column count, row count and rows offset per table,
+#                 each followed by the name and kind of its columns
+#     strings     u32 offsets, then the UTF-8 text of every interned string
+#
+# Integer columns are u8, u16 or u32, the narrowest that holds their largest
+# value, and an id column running 1..n is not stored at all. Event times are
+# stored as the seconds column next to the feed's own spelling. Names,
+# venues, times and fingerprints are stored once in the string table and
+# referenced by u32 id. Materialized statistics and timelines are not
+# archived, they are built once after the rows are loaded.
+MAGIC = b'FSTATARC'
+FORMAT_VERSION = 2
+
+HEADER = struct.Struct('<8sHxxIIQQ')  # magic, version, strings, tables, strings/tables offsets
+TABLE = struct.Struct('<IHxxIQ')      # name, columns, rows, rows offset
+COLUMN = struct.Struct('<IBcxx')      # name, kind, struct code of its values
+
+# Column kinds and the struct code of their values, SEQUENCE is an id column
+# holding 1..n that takes no space
+INTEGER, TEXT, BOOLEAN, REAL, TIMESTAMP, SEQUENCE = range(6)
+FORMATS = {TEXT: 'I', BOOLEAN: 'B', REAL: 'd', TIMESTAMP: 'q', SEQUENCE: '-'}
+INTEGER_FORMATS = ('B', 'H', 'I')
+
+# Stand-ins for missing values in fixed-width fields, an integer column uses
+# the largest value of its width
+NO_VALUE = 0xFFFFFFFF
+NO_FLAG = 0xFF
+NO_TIME = -2 ** 63
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# Tables whose rows are archived, in the order they can be inserted
+ARCHIVED_TABLES = [table for table in Base.metadata.sorted_tables
+                   if table.name not in DERIVED_TABLES + (MatchTimeline.__tablename__, DataVersion.__tablename__)]
+
+# Rows per INSERT statement while loading
+INSERT_CHUNK = 5000
+
+
+def _kind(column) -> int:
+    for column_type, kind in ((Boolean, BOOLEAN), (Integer, INTEGER), (Float, REAL), (DateTime, TIMESTAMP),
+                              (String, TEXT)):
+        if isinstance(column.type, column_type):
+            return kind
+    raise ValueError(f"column {column} has no archive encoding")
+
+
+class _StringTable:
+    """Interned strings of an archive being written"""
+
+    def __init__(self):
+        self.ids = {}
+
+    def __call__(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_VALUE
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.ids)
+        return string_id
+
+    def encode(self) -> bytes:
+        blobs = [value.encode('utf-8') for value in self.ids]
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        return struct.pack(f"<{len(offsets)}I", *offsets) + b''.join(blobs)
+
+
+def _missing(code: str) -> int:
+    """Stand-in for None in an integer field"""
+    return (1 << 8 * struct.calcsize(code)) - 1
+
+
+def _layout(db: Session, table) -> List[Tuple[int, str]]:
+    """(kind, struct code) of every column of a table, integers sized by their largest value"""
+    kinds = [_kind(column) for column in table.columns]
+    integers = [column for column, kind in zip(table.columns, kinds) if kind == INTEGER]
+    count, *largest = db.execute(select(func.count(), *[func.max(column) for column in integers])).one()
+    largest = dict(zip((column.name for column in integers), largest))
+    if 'id' in largest and largest['id'] == count and \
+            db.execute(select(func.min(table.c.id))).scalar() in (None, 1):
+        # Ids are unique, so 1..count without gaps
+        largest.pop('id')
+        kinds[list(table.columns.keys()).index('id')] = SEQUENCE
+    layout = []
+    for column, kind in zip(table.columns, kinds):
+        if kind != INTEGER:
+            layout.append((kind, FORMATS[kind]))
+            continue
+        code = next((code for code in INTEGER_FORMATS if (largest[column.name] or 0) < _missing(code)), None)
+        if code is None:
+            raise ValueError(f"{table.name}.{column.name} holds values that do not fit the archive")
+        layout.append((kind, code))
+    return layout
+
+
+def _encoders(layout: List[Tuple[int, str]], strings: _StringTable) -> List:
+    def integer(code: str):
+        missing = _missing(code)
+        return lambda value: missing if value is None else value
+
+    encoders = {
+        TEXT: lambda code: strings,
+        BOOLEAN: lambda code: lambda value: NO_FLAG if value is None else int(value),
+        REAL: lambda code: lambda value: math.nan if value is None else value,
+        TIMESTAMP: lambda code: lambda value: NO_TIME if value is None else (value - EPOCH) // MICROSECOND,
+        INTEGER: integer
+    }
+    return [encoders[kind](code) for kind, code in layout if kind != SEQUENCE]
+
+
+def _row_struct(layout: List[Tuple[int, str]]) -> struct.Struct:
+    return struct.Struct('<' + ''.join(code for kind, code in layout if kind != SEQUENCE))
+
+
+@timed
+def write_archive(db: Session, archive_path: str) -> Dict:
+    """Write the archived tables of a database to an archive, returns the row count per table"""
+    strings = _StringTable()
+    directory = []
+    tmp_path = f"{archive_path}.tmp"
+    with open(tmp_path, 'wb') as archive:
+        archive.write(bytes(HEADER.size))
+        for table in ARCHIVED_TABLES:
+            layout = _layout(db, table)
+            stored = [column.name for column, (kind, _) in zip(table.columns, layout) if kind != SEQUENCE]
+            row_struct = _row_struct(layout)
+            encoders = _encoders(layout, strings)
+            rows_offset = archive.tell()
+            count = 0
+            for row in db.execute(select(*[table.c[name] for name in stored])
+                                  .order_by(*table.primary_key.columns)):
+                try:
+                    archive.write(row_struct.pack(*[encode(value) for encode, value in zip(encoders, row)]))
+                except struct.error as e:
+                    raise ValueError(f"a row of {table.name} does not fit the archive: {e}") from e
+                count += 1
+            directory.append((table.name, list(table.columns.keys()), layout, count, rows_offset))
+
+        tables_offset = archive.tell()
+        for name, columns, layout, count, rows_offset in directory:
+            archive.write(TABLE.pack(strings(name), len(columns), count, rows_offset))
+            for column, (kind, code) in zip(columns, layout):
+                archive.write(COLUMN.pack(strings(column), kind, code.encode('ascii')))
+        strings_offset = archive.tell()
+        archive.write(strings.encode())
+
+        archive.seek(0)
+        archive.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(strings.ids), len(directory),
+                                  strings_offset, tables_offset))
+    os.replace(tmp_path, archive_path)
+    return {name: count for name, _, _, count, _ in directory}
+
+
+@timed
+def export_archive(data_dir: str, archive_path: str, workers: Optional[int] = None) -> Dict:
+    """
+    Load the data directory into a scratch database through the JSON loaders
+    and write its tables to an archive, so the archive holds exactly what a
+    reload stores. Files and season dump matches the loaders reject are
+    listed in failed_files and failures, as in their ingest summaries.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp_dir, 'export.db')}")
+        try:
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+            try:
+                summary = reload_data_dir(db, data_dir, workers=workers)
+                counts = write_archive(db, archive_path)
+            finally:
+                db.close()
+        finally:
+            engine.dispose()
+    return {'files': counts['ingested_files'], 'matches': counts['matches'],
+            'bytes': os.path.getsize(archive_path), 'failed_files': summary['failed_files'],
+            'failures': summary['failures']}
+
+
+class ArchiveReader:
+    """
+    Memory-mapped archive. The string and table directory are read on open,
+    rows are decoded as they are iterated or indexed.
+    """
+
+    def __init__(self, archive_path: str):
+        with open(archive_path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_tables(archive_path)
+        except Exception:
+            self._map.close()
+            raise
+
+    def _read_tables(self, archive_path: str) -> None:
+        data = self._map
+        if len(data) < HEADER.size:
+            raise ValueError(f"{archive_path} is not a match archive")
+        magic, version, string_count, table_count, strings_offset, tables_offset = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{archive_path} is not a match archive")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{archive_path} has archive format {version}, expected {FORMAT_VERSION}")
+
+        offsets = struct.unpack_from(f"<{string_count + 1}I", data, strings_offset)
+        text_offset = strings_offset + 4 * (string_count + 1)
+        self.strings = [bytes(data[text_offset + start:text_offset + end]).decode('utf-8')
+                        for start, end in zip(offsets, offsets[1:])]
+
+        # Table name -> (column names, layout, row struct, row count, rows offset), in insert order
+        self.tables = {}
+        offset = tables_offset
+        for _ in range(table_count):
+            name, column_count, count, rows_offset = TABLE.unpack_from(data, offset)
+            offset += TABLE.size
+            columns, layout = [], []
+            for _ in range(column_count):
+                column, kind, code = COLUMN.unpack_from(data, offset)
+                offset += COLUMN.size
+                columns.append(self.strings[column])
+                layout.append((kind, code.decode('ascii')))
+            self.tables[self.strings[name]] = (columns, layout, _row_struct(layout), count, rows_offset)
+
+    def __len__(self) -> int:
+        """Number of archived matches"""
+        return self.tables['matches'][3] if 'matches' in self.tables else 0
+
+    def _decoders(self, layout: List[Tuple[int, str]]) -> List:
+        def integer(code: str):
+            missing = _missing(code)
+            return lambda value: None if value == missing else value
+
+        strings = self.strings
+        decoders = {
+            TEXT: lambda code: lambda value: None if value == NO_VALUE else strings[value],
+            BOOLEAN: lambda code: lambda value: None if value == NO_FLAG else bool(value),
+            REAL: lambda code: lambda value: None if math.isnan(value) else value,
+            TIMESTAMP: lambda code: lambda value: None if value == NO_TIME else EPOCH + value * MICROSECOND,
+            INTEGER: integer
+        }
+        return [decoders[kind](code) for kind, code in layout if kind != SEQUENCE]
+
+    @staticmethod
+    def _decode(columns: List[str], sequence: Optional[int], decoders: List, index: int, values: Tuple) -> Dict:
+        values = [decode(value) for decode, value in zip(decoders, values)]
+        if sequence is not None:
+            values.insert(sequence, index + 1)
+        return dict(zip(columns, values))
+
+    @staticmethod
+    def _sequence(layout: List[Tuple[int, str]]) -> Optional[int]:
+        """Position of the id column left out of the rows, if any"""
+        return next((position for position, (kind, _) in enumerate(layout) if kind == SEQUENCE), None)
+
+    def rows(self, table_name: str) -> Iterator[Dict]:
+        """Rows of an archived table as column dicts, in primary key order"""
+        columns, layout, row_struct, count, rows_offset = self.tables[table_name]
+        decoders, sequence = self._decoders(layout), self._sequence(layout)
+        view = memoryview(self._map)[rows_offset:rows_offset + count * row_struct.size]
+        try:
+            if row_struct.size == 0:
+                # Every column is a sequence, iter_unpack needs a non-empty row
+                values = ((),) * count
+            else:
+                values = row_struct.iter_unpack(view)
+            for index, row in enumerate(values):
+                yield self._decode(columns, sequence, decoders, index, row)
+        finally:
+            view.release()
+
+    def row(self, table_name: str, index: int) -> Dict:
+        """One row of an archived table"""
+        columns, layout, row_struct, count, rows_offset = self.tables[table_name]
+        if not 0 <= index < count:
+            raise IndexError(index)
+        values = row_struct.unpack_from(self._map, rows_offset + index * row_struct.size)
+        return self._decode(columns, self._sequence(layout), self._decoders(layout), index, values)
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@timed
+def load_archive(db: Session, archive_path: str, chunk_size: int = INSERT_CHUNK) -> Dict:
+    """
+    Insert the rows of an archive with their archived ids, then build the
+    materialized statistics and timelines once. The ingestion manifest comes
+    along, so a later reload of the data directory only picks up files that
+    changed since the export. Meant for an empty database, as after reset_db().
+    """
+    tables = Base.metadata.tables
+    with ArchiveReader(archive_path) as reader:
+        for name, (columns, *_) in reader.tables.items():
+            if name not in tables or not set(columns) <= set(tables[name].columns.keys()):
+                raise ValueError(f"{archive_path} was written for another schema, table {name} does not match")
+        try:
+            counts = {}
+            for name in reader.tables:
+                rows = []
+                for row in reader.rows(name):
+                    rows.append(row)
+                    if len(rows) >= chunk_size:
+                        db.execute(insert(tables[name]), rows)
+                        rows = []
+                if rows:
+                    db.execute(insert(tables[name]), rows)
+                counts[name] = reader.tables[name][3]
+            # Rows carry their own ids, a server database's sequences must follow
+            sync_id_sequences(db, [mapper.class_ for mapper in Base.registry.mappers
+                                   if mapper.local_table.name in counts])
+            rebuild_statistics(db)
+        except Exception:
+            db.rollback()
+            raise
+    return {'files': counts.get('ingested_files', 0), 'stored': counts.get('matches', 0), 'rows': counts}
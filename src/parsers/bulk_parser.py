@@ -0,0 +1,336 @@
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from src.database.models import (Team, Player, Match, Goal, Card, Substitution, Referee, MatchReferee, MatchPlayer,
+                                 Competition, Season)
+from src.database.database import lock_for_write, sync_id_sequences
+from src.parsers.identity import IdentityResolver
+from src.parsers.json_parser import duplicate_entry, failure_entry, read_match_file
+from src.profiling import timed
+from src.statistics.materialized import apply_match_statistics
+
+logger = logging.getLogger(__name__)
+
+# Parents are written before the rows that reference them
+INSERT_ORDER = (Competition, Season, Team, Player, Referee, Match, MatchPlayer, Goal, Card, Substitution,
+                MatchReferee)
+
+
+class BulkMatchParser:
+    """
+    Bulk ingestion mode for MatchParser.
+
+    Team, season, player and referee lookups are loaded once, players are
+    resolved against each match's roster in memory by the IdentityResolver
+    and every entity type is written with a single executemany insert per
+    batch of files. Primary keys are assigned
+    here in the same order SQLite would assign them, so the resulting rows
+    are identical to those written by MatchParser.parse_file. If another
+    writer has stored rows since the lookups were loaded, flush notices it
+    under the write lock and stages the batch again against fresh lookups.
+    """
+
+    def __init__(self, db: Session, batch_size: int = 100, identities: Optional[IdentityResolver] = None):
+        self.db = db
+        self.batch_size = batch_size
+        # Player and referee maps, shared with other parsers of the same ingest if given
+        self.identities = identities or IdentityResolver(db)
+        self._loaded = False
+
+    def parse_files(self, file_paths: Iterable[str]) -> Dict:
+        """
+        Parse match files in batches. Returns an ingest summary with the
+        duplicates and failures per file, as MatchParser.parse_files does.
+        A batch whose flush fails is retried one file per transaction.
+        """
+        self.load_lookups()
+        summary = {'files': 0, 'stored': 0, 'duplicates': 0, 'errors': 0, 'failed_files': [], 'failures': [],
+                   'duplicate_matches': []}
+        batch = []
+
+        for file_path in file_paths:
+            summary['files'] += 1
+            try:
+                record = read_match_file(file_path)
+                added = self.add_match(record, source=os.path.basename(file_path))
+            except Exception as e:
+                self._file_failed(summary, file_path, e)
+                continue
+            if not added:
+                summary['duplicates'] += 1
+                summary['duplicate_matches'].append(duplicate_entry(
+                    file_path, record['date'], record['venue'], record['teams'][0]['name'],
+                    record['teams'][1]['name']))
+                continue
+
+            batch.append((file_path, record))
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch, summary)
+
+        self._write_batch(batch, summary)
+        summary.update(self.identities.take_report())
+        return summary
+
+    def _write_batch(self, batch: List[Tuple[str, Dict]], summary: Dict) -> None:
+        """Flush a batch, falling back to one transaction per file if it fails"""
+        try:
+            summary['stored'] += self.flush()
+        except Exception:
+            for file_path, record in batch:
+                try:
+                    self.add_match(record, source=os.path.basename(file_path))
+                    summary['stored'] += self.flush()
+                except Exception as e:
+                    self._file_failed(summary, file_path, e)
+        batch.clear()
+
+    @staticmethod
+    def _file_failed(summary: Dict, file_path: str, error: Exception) -> None:
+        logger.warning("Could not ingest %s: %s", os.path.basename(file_path), error)
+        summary['errors'] += 1
+        summary['failed_files'].append(file_path)
+        summary['failures'].append(failure_entry(file_path, error))
+
+    def load_lookups(self) -> None:
+        """Load existing teams, players, referees and match keys into memory"""
+        if self._loaded:
+            return
+
+        self._teams = {name: team_id for team_id, name in self.db.execute(select(Team.id, Team.name))}
+        self._flushed = self.identities.checkpoint()
+
+        self._competitions = {
+            name: competition_id for competition_id, name in self.db.execute(select(Competition.id, Competition.name))
+        }
+        self._seasons = {
+            (competition_id, name): season_id
+            for season_id, competition_id, name in self.db.execute(
+                select(Season.id, Season.competition_id, Season.name))
+        }
+
+        # One scan of the fingerprint index instead of joining every match to its teams
+        self._fingerprints = set(self.db.execute(
+            select(Match.fingerprint).where(Match.fingerprint.is_not(None))
+        ).scalars())
+
+        self._next_ids = {
+            model: (self.db.execute(select(func.max(model.id))).scalar() or 0) + 1
+            for model in INSERT_ORDER
+        }
+        self._pending = defaultdict(list)
+        self._journal = []
+        # Records behind the staged rows, staged again if another writer gets in first
+        self._staged = []
+        self._loaded = True
+
+    def add_match(self, record: Dict, source_file_id: Optional[int] = None, source: Optional[str] = None) -> bool:
+        """
+        Stage a normalized match record for the next flush.
+        Returns False if the match is already stored or staged.
+        source names the file in the identity report.
+        """
+        self.load_lookups()
+        if record['fingerprint'] in self._fingerprints:
+            return False
+
+        checkpoint = self._checkpoint(source)
+        try:
+            self._stage_match(record, source_file_id)
+        except Exception:
+            self._restore(checkpoint)
+            raise
+
+        self._fingerprints.add(record['fingerprint'])
+        self._staged.append((record, source_file_id, source))
+        return True
+
+    @timed
+    def flush(self) -> int:
+        """Write all staged rows in one transaction, returns the number of matches written"""
+        if not self._loaded:
+            return 0
+        try:
+            lock_for_write(self.db, INSERT_ORDER)
+            if self._ids_taken():
+                self._restage()
+            for model in INSERT_ORDER:
+                rows = self._pending[model]
+                if rows:
+                    self.db.execute(insert(model), rows)
+            # Rows carry their own ids, a server database's sequences must follow
+            sync_id_sequences(self.db, [model for model in INSERT_ORDER if self._pending[model]])
+            apply_match_statistics(self.db, [row['id'] for row in self._pending[Match]])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            # The staged state no longer matches the database, matches retried
+            # after this are reported again
+            self.identities.rollback(self._flushed)
+            self.identities.invalidate()
+            self._loaded = False
+            raise
+        written = len(self._pending[Match])
+        self._pending.clear()
+        self._journal.clear()
+        self._staged.clear()
+        self.identities.commit()
+        self._flushed = self.identities.checkpoint()
+        return written
+
+    def _ids_taken(self) -> bool:
+        """True if another writer has stored rows since the lookups were loaded"""
+        for model in INSERT_ORDER:
+            rows = self._pending[model]
+            # Staged ids are consecutive from the first row on
+            if rows and (self.db.execute(select(func.max(model.id))).scalar() or 0) >= rows[0]['id']:
+                return True
+        return False
+
+    def _restage(self) -> None:
+        """
+        Stage the batch again against lookups reloaded under the write lock,
+        so it resolves to the other writer's teams, players and matches
+        """
+        staged = self._staged
+        self._pending.clear()
+        self._journal.clear()
+        self._staged = []
+        self.identities.rollback(self._flushed)
+        self.identities.invalidate()
+        self._loaded = False
+        for record, source_file_id, source in staged:
+            self.add_match(record, source_file_id, source)
+
+    def _stage_match(self, record: Dict, source_file_id: Optional[int]) -> None:
+        team_ids = [self._resolve_team(team) for team in record['teams']]
+        rosters = [self._resolve_roster(team, team_id) for team, team_id in zip(record['teams'], team_ids)]
+        season_id = self._resolve_season(record['competition'], record['season'])
+        match_id = self._stage(
+            Match,
+            date=record['date'],
+            season_id=season_id,
+            venue=record['venue'],
+            spectators=record['spectators'],
+            home_team_id=team_ids[0],
+            away_team_id=team_ids[1],
+            source_file_id=source_file_id,
+            fingerprint=record['fingerprint']
+        )
+        for team_id, roster in zip(team_ids, rosters):
+            for player_id in dict.fromkeys(roster.values()):
+                self._stage(MatchPlayer, match_id=match_id, team_id=team_id, player_id=player_id)
+
+        for team, team_id, roster in zip(record['teams'], team_ids, rosters):
+            def player_id(number: int, event: str, time: str) -> Optional[int]:
+                return self.identities.player(roster, team['name'], number, event, time)
+
+            for goal in team['goals']:
+                assists = [player_id(number, 'assist', goal['time']) for number in goal['assists']]
+                self._stage(
+                    Goal,
+                    match_id=match_id,
+                    team_id=team_id,
+                    scorer_id=player_id(goal['number'], 'goal', goal['time']),
+                    assist1_id=assists[0] if len(assists) > 0 else None,
+                    assist2_id=assists[1] if len(assists) > 1 else None,
+                    time=goal['time'],
+                    seconds=goal['seconds'],
+                    is_penalty=goal['is_penalty']
+                )
+
+            booked_players = set()  # Players already carded in this match
+            for card in team['cards']:
+                carded_id = player_id(card['number'], 'card', card['time'])
+                self._stage(
+                    Card,
+                    match_id=match_id,
+                    team_id=team_id,
+                    player_id=carded_id,
+                    time=card['time'],
+                    seconds=card['seconds'],
+                    is_red=(carded_id is not None and carded_id in booked_players)
+                )
+                if carded_id is not None:
+                    booked_players.add(carded_id)
+
+            for sub in team['substitutions']:
+                self._stage(
+                    Substitution,
+                    match_id=match_id,
+                    team_id=team_id,
+                    player_out_id=player_id(sub['number_out'], 'substitution', sub['time']),
+                    player_in_id=player_id(sub['number_in'], 'substitution', sub['time']),
+                    time=sub['time'],
+                    seconds=sub['seconds']
+                )
+
+        self._stage(MatchReferee, match_id=match_id,
+                    referee_id=self._resolve_referee(record['main_referee']), is_main=True)
+        for referee in record['assistant_referees']:
+            self._stage(MatchReferee, match_id=match_id,
+                        referee_id=self._resolve_referee(referee), is_main=False)
+
+    def _resolve_team(self, team: Dict) -> int:
+        """Get existing team id, or stage the team"""
+        team_id = self._teams.get(team['name'])
+        if team_id is None:
+            team_id = self._stage(Team, name=team['name'])
+            self._remember(self._teams, team['name'], team_id)
+        return team_id
+
+    def _resolve_roster(self, team: Dict, team_id: int) -> Dict[int, int]:
+        """Shirt numbers of this match's roster, staging players not seen before"""
+        return self.identities.roster(team_id, team['name'], team['players'],
+                                      lambda player: self._stage(Player, team_id=team_id, **player))
+
+    def _resolve_season(self, competition_name: str, name: str) -> int:
+        competition_id = self._competitions.get(competition_name)
+        if competition_id is None:
+            competition_id = self._stage(Competition, name=competition_name)
+            self._remember(self._competitions, competition_name, competition_id)
+        season_id = self._seasons.get((competition_id, name))
+        if season_id is None:
+            season_id = self._stage(Season, competition_id=competition_id, name=name)
+            self._remember(self._seasons, (competition_id, name), season_id)
+        return season_id
+
+    def _resolve_referee(self, referee: Dict) -> int:
+        return self.identities.referee(
+            referee['first_name'], referee['last_name'],
+            lambda first_name, last_name: self._stage(Referee, first_name=first_name, last_name=last_name)
+        )
+
+    def _stage(self, model, **values) -> int:
+        """Queue a row for insertion and return its primary key"""
+        row_id = self._next_ids[model]
+        self._next_ids[model] += 1
+        self._pending[model].append({'id': row_id, **values})
+        return row_id
+
+    def _remember(self, lookup: Dict, key, value: int) -> None:
+        """Add a lookup entry that is dropped again if the file fails"""
+        lookup[key] = value
+        self._journal.append((lookup, key))
+
+    def _checkpoint(self, source: Optional[str] = None) -> Tuple[Dict, Dict, int, Tuple]:
+        return (
+            dict(self._next_ids),
+            {model: len(rows) for model, rows in self._pending.items()},
+            len(self._journal),
+            self.identities.begin(source)
+        )
+
+    def _restore(self, checkpoint: Tuple[Dict, Dict, int, Tuple]) -> None:
+        """Undo everything staged since the checkpoint"""
+        next_ids, pending_sizes, journal_size, identities = checkpoint
+        self.identities.rollback(identities)
+        self._next_ids = next_ids
+        for model, rows in self._pending.items():
+            del rows[pending_sizes.get(model, 0):]
+        while len(self._journal) > journal_size:
+            lookup, key = self._journal.pop()
+            del lookup[key]
+
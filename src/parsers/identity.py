@@ -0,0 +1,154 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from src.database.models import Player, Referee
+
+# Conflict kinds in the identity report
+DUPLICATE_NUMBER = 'duplicate_number'    # Two roster entries of one match share a shirt number
+NUMBER_REASSIGNED = 'number_reassigned'  # A shirt number now belongs to a different name
+
+_MISSING = object()
+
+
+class IdentityResolver:
+    """
+    In-memory identity maps shared by every match of an ingest.
+
+    Players are identified by (team id, shirt number, first name, last name)
+    and referees by (first name, last name). The maps are loaded from the
+    database once; every roster entry of every match is upserted, so players
+    joining a team after its first match are stored too, and event shirt
+    numbers are resolved against the roster of their own match. Lookups are
+    dictionary hits, no statements are issued for known identities.
+
+    Event numbers missing from the roster and shirt numbers claimed by more
+    than one name are collected for take_report().
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.source = None
+        self.unresolved = []
+        self.conflicts = []
+        self._loaded = False
+
+    def load(self) -> None:
+        if self._loaded:
+            return
+        # Keep the lowest id for duplicates, like query(...).first() would
+        self._players = {}
+        # Last known holder of every shirt number, for reassignment reports
+        self._holders = {}
+        for player_id, team_id, number, first_name, last_name in self.db.execute(
+                select(Player.id, Player.team_id, Player.number, Player.first_name, Player.last_name)
+                .order_by(Player.id)):
+            self._players.setdefault((team_id, number, first_name, last_name), player_id)
+            self._holders[team_id, number] = (first_name, last_name)
+
+        self._referees = {}
+        for referee_id, first_name, last_name in self.db.execute(
+                select(Referee.id, Referee.first_name, Referee.last_name).order_by(Referee.id)):
+            self._referees.setdefault((first_name, last_name), referee_id)
+
+        self._journal = []
+        self._loaded = True
+
+    def invalidate(self) -> None:
+        """Forget the maps after a rollback, they are reloaded on next use"""
+        self._loaded = False
+
+    def begin(self, source: Optional[str]) -> Tuple[int, int, int]:
+        """Start a match from `source`; the returned checkpoint undoes it with rollback()"""
+        self.source = source
+        return self.checkpoint()
+
+    def checkpoint(self) -> Tuple[int, int, int]:
+        self.load()
+        return len(self._journal), len(self.unresolved), len(self.conflicts)
+
+    def commit(self) -> None:
+        """The staged identities are stored, they can no longer be rolled back"""
+        if self._loaded:
+            self._journal.clear()
+
+    def rollback(self, checkpoint: Tuple[int, int, int]) -> None:
+        """Drop the identities and report entries added since the checkpoint"""
+        journal_size, unresolved_size, conflicts_size = checkpoint
+        del self.unresolved[unresolved_size:]
+        del self.conflicts[conflicts_size:]
+        if not self._loaded:
+            return
+        while len(self._journal) > journal_size:
+            lookup, key, previous = self._journal.pop()
+            if previous is _MISSING:
+                del lookup[key]
+            else:
+                lookup[key] = previous
+
+    def roster(self, team_id: int, team_name: str, players: List[Dict],
+               create: Callable[[Dict], int]) -> Dict[int, int]:
+        """
+        Shirt number to player id for one team in one match.
+        Roster entries not seen before are stored through create(player),
+        which returns the new player's id.
+        """
+        self.load()
+        numbers = {}
+        for player in players:
+            number, name = player['number'], (player['first_name'], player['last_name'])
+            key = (team_id, number, *name)
+            player_id = self._players.get(key)
+            if player_id is None:
+                previous = self._holders.get((team_id, number))
+                if previous is not None and previous != name:
+                    self._conflict(NUMBER_REASSIGNED, team_name, number, name, previous)
+                player_id = create(player)
+                self._remember(self._players, key, player_id)
+            if self._holders.get((team_id, number)) != name:
+                self._remember(self._holders, (team_id, number), name)
+
+            if number in numbers:
+                # Events cannot tell the two apart, they go to the first entry
+                self._conflict(DUPLICATE_NUMBER, team_name, number, name, None)
+            else:
+                numbers[number] = player_id
+        return numbers
+
+    def player(self, roster: Dict[int, int], team_name: str, number: Optional[int], event: str,
+               time: str) -> Optional[int]:
+        """Player id of a shirt number in an event, None (and reported) if it is not on the roster"""
+        player_id = roster.get(number)
+        if player_id is None and number is not None:
+            self.unresolved.append({'file': self.source, 'team': team_name, 'number': number,
+                                    'event': event, 'time': time})
+        return player_id
+
+    def referee(self, first_name: str, last_name: str, create: Callable[[str, str], int]) -> int:
+        self.load()
+        key = (first_name, last_name)
+        referee_id = self._referees.get(key)
+        if referee_id is None:
+            referee_id = create(first_name, last_name)
+            self._remember(self._referees, key, referee_id)
+        return referee_id
+
+    def take_report(self) -> Dict[str, List[Dict]]:
+        """Unresolved and conflicting identities collected so far, cleared once taken"""
+        report = {'unresolved_players': self.unresolved, 'identity_conflicts': self.conflicts}
+        self.unresolved, self.conflicts = [], []
+        return report
+
+    def _conflict(self, kind: str, team_name: str, number: int, name: Tuple[str, str],
+                  previous: Optional[Tuple[str, str]]) -> None:
+        self.conflicts.append({
+            'file': self.source,
+            'kind': kind,
+            'team': team_name,
+            'number': number,
+            'player': ' '.join(name),
+            'previous': ' '.join(previous) if previous else None
+        })
+
+    def _remember(self, lookup: Dict, key, value) -> None:
+        self._journal.append((lookup, key, lookup.get(key, _MISSING)))
+        lookup[key] = value
@@ -1,111 +1,322 @@
 import json
+import logging
+import os
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from src.database.models import Base, Team, Player, Match, Goal, Card, Substitution, Referee, MatchReferee
+from sqlalchemy import select
+from src.database.models import (Base, Team, Player, Match, Goal, Card, Substitution, Referee, MatchReferee,
+                                 MatchPlayer, Competition, Season, DEFAULT_COMPETITION, match_fingerprint,
+                                 season_name)
+from src.parsers.identity import IdentityResolver
+from src.profiling import timed
+from src.statistics.materialized import apply_match_statistics
+
+logger = logging.getLogger(__name__)
+
+
+def _as_list(value) -> List:
+    """Unwrap the single-dict versus list encoding used throughout the feed"""
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return [value]
+    return list(value)
+
+
+def time_to_seconds(value: str) -> int:
+    """Convert a "mm:ss" event time into seconds from kick-off"""
+    minutes, seconds = value.split(':')
+    return int(minutes) * 60 + int(seconds)
+
+
+# Optional 'Spele' field naming the competition, files without it go to DEFAULT_COMPETITION
+COMPETITION_FIELD = 'Turnirs'
+
+# Fingerprints per IN (...) query, well below SQLite's bound parameter limit
+FINGERPRINT_CHUNK = 500
+
+
+def match_header(match_data: Dict) -> Dict:
+    """Natural key of a raw 'Spele' object, read without touching its event lists"""
+    date = datetime.strptime(match_data['Laiks'], '%Y/%m/%d')
+    home_team, away_team = (team['Nosaukums'] for team in match_data['Komanda'][:2])
+    return {
+        'date': date,
+        'venue': match_data['Vieta'],
+        'home_team': home_team,
+        'away_team': away_team,
+        'fingerprint': match_fingerprint(date.strftime('%Y-%m-%d'), match_data['Vieta'], home_team, away_team),
+        'competition': match_data.get(COMPETITION_FIELD) or DEFAULT_COMPETITION,
+        'season': season_name(date)
+    }
+
+
+def existing_fingerprints(db: Session, fingerprints: Iterable[str]) -> Set[str]:
+    """The given fingerprints that belong to stored matches, one query per chunk"""
+    fingerprints = list(set(fingerprints))
+    found = set()
+    for start in range(0, len(fingerprints), FINGERPRINT_CHUNK):
+        found.update(db.execute(
+            select(Match.fingerprint).where(Match.fingerprint.in_(fingerprints[start:start + FINGERPRINT_CHUNK]))
+        ).scalars())
+    return found
+
+
+def duplicate_entry(file_path: str, date: datetime, venue: str, home_team: str, away_team: str) -> Dict:
+    """Ingest summary entry for a match that is already stored"""
+    return {
+        'file': os.path.basename(file_path),
+        'date': date.strftime('%Y-%m-%d'),
+        'venue': venue,
+        'home_team': home_team,
+        'away_team': away_team
+    }
+
+
+def failure_entry(file_path: str, error: Exception, index: Optional[int] = None) -> Dict:
+    """Ingest summary entry for a file, or a match of a season dump, that could not be stored"""
+    entry = {'file': os.path.basename(file_path)}
+    if index is not None:
+        entry['index'] = index
+    entry['error'] = str(error)
+    return entry
+
+
+def normalize_match(match_data: Dict) -> Dict:
+    """
+    Convert a raw 'Spele' object into a plain match record.
+    All single-dict versus list cases are unwrapped and keys are translated,
+    so the record can be persisted without touching the original structure.
+    """
+    teams = []
+    for team_data in match_data['Komanda']:
+        goals = []
+        for goal_data in _as_list((team_data.get('Varti') or {}).get('VG')):
+            goals.append({
+                'number': goal_data['Nr'],
+                'time': goal_data['Laiks'],
+                'seconds': time_to_seconds(goal_data['Laiks']),
+                'is_penalty': goal_data['Sitiens'] == 'J',
+                'assists': [assist['Nr'] for assist in _as_list(goal_data.get('P'))]
+            })
+
+        teams.append({
+            'name': team_data['Nosaukums'],
+            'players': [
+                {
+                    'number': player_data['Nr'],
+                    'first_name': player_data['Vards'],
+                    'last_name': player_data['Uzvards'],
+                    'role': player_data['Loma']
+                }
+                for player_data in _as_list(team_data['Speletaji']['Speletajs'])
+            ],
+            'goals': goals,
+            'cards': [
+                {'number': card_data['Nr'], 'time': card_data['Laiks'],
+                 'seconds': time_to_seconds(card_data['Laiks'])}
+                for card_data in _as_list((team_data.get('Sodi') or {}).get('Sods'))
+            ],
+            'substitutions': [
+                {'number_out': sub_data['Nr1'], 'number_in': sub_data['Nr2'], 'time': sub_data['Laiks'],
+                 'seconds': time_to_seconds(sub_data['Laiks'])}
+                for sub_data in _as_list((team_data.get('Mainas') or {}).get('Maina'))
+            ]
+        })
+
+    header = match_header(match_data)
+    return {
+        'date': header['date'],
+        'venue': header['venue'],
+        'fingerprint': header['fingerprint'],
+        'competition': header['competition'],
+        'season': header['season'],
+        'spectators': match_data['Skatitaji'],
+        'teams': teams,
+        'main_referee': {
+            'first_name': match_data['VT']['Vards'],
+            'last_name': match_data['VT']['Uzvards']
+        },
+        'assistant_referees': [
+            {'first_name': ref_data['Vards'], 'last_name': ref_data['Uzvards']}
+            for ref_data in _as_list(match_data['T'])
+        ]
+    }
+
+
+def read_match_file(file_path: str) -> Dict:
+    """Decode a match JSON file into a normalized match record"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return normalize_match(json.load(f)['Spele'])
 
 
 class MatchParser:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, identities: Optional[IdentityResolver] = None):
         self.db = db
+        # Player and referee maps, shared with other parsers of the same ingest if given
+        self.identities = identities or IdentityResolver(db)
 
-    def parse_file(self, file_path: str) -> None:
-        """Parse a single match JSON file and store it in the database"""
+    @timed
+    def parse_file(self, file_path: str) -> bool:
+        """Parse a single match JSON file and store it, False if the match is already stored"""
         with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            match_data = data['Spele']
-
-            # Check if match already exists (same date, teams and venue)
-            match_date = datetime.strptime(match_data['Laiks'], '%Y/%m/%d')
-            teams = [team['Nosaukums'] for team in match_data['Komanda']]
-            existing_match = self.db.query(Match).filter(
-                and_(
-                    Match.date == match_date,
-                    Match.venue == match_data['Vieta'],
-                    Match.home_team.has(Team.name == teams[0]),
-                    Match.away_team.has(Team.name == teams[1])
-                )
-            ).first()
-
-            if existing_match:
-                print(f"Match already exists: {teams[0]} vs {teams[1]} on {match_date}")
-                return
-
-            # Process teams first
-            processed_teams = []
-            for team_data in match_data['Komanda']:
-                team = self._process_team(team_data)
-                processed_teams.append(team)
-
-            # Commit to ensure teams have IDs
-            self.db.commit()
-
-            # Create match object
-            match = Match(
-                date=match_date,
-                venue=match_data['Vieta'],
-                spectators=match_data['Skatitaji'],
-                home_team=processed_teams[0],
-                away_team=processed_teams[1]
-            )
-            self.db.add(match)
-            self.db.commit()  # Commit to get match ID
-
-            # Process the rest of the data for each team
-            for i, team_data in enumerate(match_data['Komanda']):
-                team = processed_teams[i]
-
-                # Process goals
-                if 'Varti' in team_data and team_data['Varti']:
-                    goals = self._process_goals(team_data['Varti'], team, match)
-                    for goal in goals:
-                        self.db.add(goal)
-
-                # Process cards
-                if 'Sodi' in team_data and team_data['Sodi']:
-                    cards = self._process_cards(team_data['Sodi'], team, match)
-                    for card in cards:
-                        self.db.add(card)
-
-                # Process substitutions
-                if 'Mainas' in team_data and team_data['Mainas']:
-                    subs = self._process_substitutions(team_data['Mainas'], team, match)
-                    for sub in subs:
-                        self.db.add(sub)
-
-            # Process main referee
-            main_ref = self._get_or_create_referee(
-                first_name=match_data['VT']['Vards'],
-                last_name=match_data['VT']['Uzvards']
+            match_data = json.load(f)['Spele']
+        header = match_header(match_data)
+        if existing_fingerprints(self.db, [header['fingerprint']]):
+            return False
+        self._store(match_data, header, os.path.basename(file_path))
+        return True
+
+    @timed
+    def parse_files(self, file_paths: Iterable[str], batch_size: int = 100) -> Dict:
+        """
+        Parse match files, checking a batch of them against the stored matches
+        in one query before any teams or events are processed.
+        Returns an ingest summary with the duplicates and failures per file
+        and the player identities that could not be resolved cleanly.
+        """
+        summary = {'files': 0, 'stored': 0, 'duplicates': 0, 'errors': 0, 'failed_files': [], 'failures': [],
+                   'duplicate_matches': []}
+        file_paths = list(file_paths)
+        seen = set()
+        for start in range(0, len(file_paths), batch_size):
+            candidates = []
+            for file_path in file_paths[start:start + batch_size]:
+                summary['files'] += 1
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        match_data = json.load(f)['Spele']
+                    candidates.append((file_path, match_data, match_header(match_data)))
+                except Exception as e:
+                    self._file_failed(summary, file_path, e)
+
+            stored = existing_fingerprints(self.db, [header['fingerprint'] for _, _, header in candidates])
+            for file_path, match_data, header in candidates:
+                if header['fingerprint'] in stored or header['fingerprint'] in seen:
+                    summary['duplicates'] += 1
+                    summary['duplicate_matches'].append(duplicate_entry(
+                        file_path, header['date'], header['venue'], header['home_team'], header['away_team']))
+                    continue
+                try:
+                    self._store(match_data, header, os.path.basename(file_path))
+                except Exception as e:
+                    self.db.rollback()
+                    self._file_failed(summary, file_path, e)
+                    continue
+                seen.add(header['fingerprint'])
+                summary['stored'] += 1
+        summary.update(self.identities.take_report())
+        return summary
+
+    @staticmethod
+    def _file_failed(summary: Dict, file_path: str, error: Exception) -> None:
+        logger.warning("Could not ingest %s: %s", os.path.basename(file_path), error)
+        summary['errors'] += 1
+        summary['failed_files'].append(file_path)
+        summary['failures'].append(failure_entry(file_path, error))
+
+    @timed
+    def _store(self, match_data: Dict, header: Dict, source: str) -> None:
+        """Store a match whose natural key is not in the database yet"""
+        checkpoint = self.identities.begin(source)
+        try:
+            self._store_match(match_data, header)
+        except Exception:
+            self.db.rollback()
+            self.identities.rollback(checkpoint)
+            # Ids created by the rolled back transaction are gone, the maps are reloaded from the database
+            self.identities.invalidate()
+            raise
+        self.identities.commit()
+
+    def _store_match(self, match_data: Dict, header: Dict) -> None:
+        # Process teams and their rosters first
+        processed_teams = []
+        rosters = []
+        for team_data in match_data['Komanda']:
+            team, roster = self._process_team(team_data)
+            processed_teams.append(team)
+            rosters.append(roster)
+
+        season = self._get_or_create_season(header['competition'], header['season'])
+
+        # Create match object
+        match = Match(
+            date=header['date'],
+            season=season,
+            venue=header['venue'],
+            spectators=match_data['Skatitaji'],
+            home_team=processed_teams[0],
+            away_team=processed_teams[1],
+            fingerprint=header['fingerprint']
+        )
+        self.db.add(match)
+        self.db.flush()  # Flush to get match ID
+
+        # Record who was on each roster, timelines take their line-ups from it
+        for team, roster in zip(processed_teams, rosters):
+            for player_id in dict.fromkeys(roster.values()):
+                self.db.add(MatchPlayer(match=match, team_id=team.id, player_id=player_id))
+
+        # Process the rest of the data for each team
+        for i, team_data in enumerate(match_data['Komanda']):
+            team = processed_teams[i]
+            roster = rosters[i]
+
+            # Process goals
+            if 'Varti' in team_data and team_data['Varti']:
+                goals = self._process_goals(team_data['Varti'], team, match, roster)
+                for goal in goals:
+                    self.db.add(goal)
+
+            # Process cards
+            if 'Sodi' in team_data and team_data['Sodi']:
+                cards = self._process_cards(team_data['Sodi'], team, match, roster)
+                for card in cards:
+                    self.db.add(card)
+
+            # Process substitutions
+            if 'Mainas' in team_data and team_data['Mainas']:
+                subs = self._process_substitutions(team_data['Mainas'], team, match, roster)
+                for sub in subs:
+                    self.db.add(sub)
+
+        # Process main referee
+        main_ref_id = self._get_or_create_referee(
+            first_name=match_data['VT']['Vards'],
+            last_name=match_data['VT']['Uzvards']
+        )
+
+        match_ref = MatchReferee(
+            match=match,
+            referee_id=main_ref_id,
+            is_main=True
+        )
+        self.db.add(match_ref)
+
+        # Process assistant referees
+        for ref_data in match_data['T']:
+            ref_id = self._get_or_create_referee(
+                first_name=ref_data['Vards'],
+                last_name=ref_data['Uzvards']
             )
-            self.db.commit()  # Commit to get referee ID
-
             match_ref = MatchReferee(
                 match=match,
-                referee=main_ref,
-                is_main=True
+                referee_id=ref_id,
+                is_main=False
             )
             self.db.add(match_ref)
 
-            # Process assistant referees
-            for ref_data in match_data['T']:
-                ref = self._get_or_create_referee(
-                    first_name=ref_data['Vards'],
-                    last_name=ref_data['Uzvards']
-                )
-                match_ref = MatchReferee(
-                    match=match,
-                    referee=ref,
-                    is_main=False
-                )
-                self.db.add(match_ref)
-
-            # Final commit for all remaining changes
-            self.db.commit()
-
-    def _process_team(self, team_data: Dict) -> Team:
-        """Process team data and return Team object"""
+        # Update materialized statistics in the same transaction
+        apply_match_statistics(self.db, [match.id])
+
+        # The match, its events and its statistics are committed together
+        self.db.commit()
+
+    @timed
+    def _process_team(self, team_data: Dict) -> Tuple[Team, Dict[int, int]]:
+        """Process team data, returns the Team and its roster for this match by shirt number"""
         team = self.db.query(Team).filter_by(name=team_data['Nosaukums']).first()
 
         if not team:
@@ -113,44 +324,57 @@ class MatchParser:
             self.db.add(team)
             self.db.flush()  # Flush to get team ID
 
-            # Process players
-            for player_data in team_data['Speletaji']['Speletajs']:
-                player = Player(
-                    team=team,
-                    number=player_data['Nr'],
-                    first_name=player_data['Vards'],
-                    last_name=player_data['Uzvards'],
-                    role=player_data['Loma']
-                )
-                self.db.add(player)
-
-        return team
-
-    def _get_or_create_referee(self, first_name: str, last_name: str) -> Referee:
-        """Get existing referee or create new one"""
-        referee = self.db.query(Referee).filter_by(
-            first_name=first_name,
-            last_name=last_name
-        ).first()
-
-        if not referee:
-            referee = Referee(
-                first_name=first_name,
-                last_name=last_name
-            )
+        def create_player(player: Dict) -> int:
+            new_player = Player(team=team, **player)
+            self.db.add(new_player)
+            self.db.flush()  # Flush to get player ID
+            return new_player.id
+
+        # Players are upserted on every match, so later roster changes are kept
+        players = [
+            {
+                'number': player_data['Nr'],
+                'first_name': player_data['Vards'],
+                'last_name': player_data['Uzvards'],
+                'role': player_data['Loma']
+            }
+            for player_data in _as_list(team_data['Speletaji']['Speletajs'])
+        ]
+        return team, self.identities.roster(team.id, team.name, players, create_player)
+
+    def _get_or_create_season(self, competition_name: str, name: str) -> Season:
+        """Get the season of a competition, creating both as needed"""
+        competition = self.db.query(Competition).filter_by(name=competition_name).first()
+        if not competition:
+            competition = Competition(name=competition_name)
+            self.db.add(competition)
+            self.db.flush()  # Flush to get competition ID
+
+        season = self.db.query(Season).filter_by(competition_id=competition.id, name=name).first()
+        if not season:
+            season = Season(competition=competition, name=name)
+            self.db.add(season)
+            self.db.flush()  # Flush to get season ID
+
+        return season
+
+    def _get_or_create_referee(self, first_name: str, last_name: str) -> int:
+        """Id of an existing referee or of a newly created one"""
+        def create_referee(first: str, last: str) -> int:
+            referee = Referee(first_name=first, last_name=last)
             self.db.add(referee)
             self.db.flush()  # Flush to get referee ID
+            return referee.id
 
-        return referee
+        return self.identities.referee(first_name, last_name, create_referee)
 
-    def _get_player_by_number(self, number: int, team: Team) -> Optional[Player]:
-        """Helper to get player by their number in a team"""
-        return self.db.query(Player).filter_by(
-            team_id=team.id,
-            number=number
-        ).first()
+    def _player_id(self, roster: Dict[int, int], team: Team, number: int, event: str,
+                   time: str) -> Optional[int]:
+        """Player wearing a shirt number in this match"""
+        return self.identities.player(roster, team.name, number, event, time)
 
-    def _process_goals(self, goals_data: Dict, team: Team, match: Match) -> List[Goal]:
+    @timed
+    def _process_goals(self, goals_data: Dict, team: Team, match: Match, roster: Dict[int, int]) -> List[Goal]:
         """Process goals data and return list of Goal objects"""
         goals = []
         if not goals_data:  # Handle empty goals data
@@ -161,7 +385,7 @@ class MatchParser:
             vg_list = [vg_list]
 
         for goal_data in vg_list:
-            scorer = self._get_player_by_number(goal_data['Nr'], team)
+            scorer_id = self._player_id(roster, team, goal_data['Nr'], 'goal', goal_data['Laiks'])
 
             # Process assists
             assists = []
@@ -170,27 +394,29 @@ class MatchParser:
                 if isinstance(assist_data, dict):  # Single assist
                     assist_data = [assist_data]
                 for assist in assist_data:
-                    assists.append(self._get_player_by_number(assist['Nr'], team))
+                    assists.append(self._player_id(roster, team, assist['Nr'], 'assist', goal_data['Laiks']))
 
             goal = Goal(
                 match=match,
                 team=team,
-                scorer=scorer,
+                scorer_id=scorer_id,
                 time=goal_data['Laiks'],
+                seconds=time_to_seconds(goal_data['Laiks']),
                 is_penalty=(goal_data['Sitiens'] == 'J')
             )
 
             # Add assists if any
             if len(assists) > 0 and assists[0]:
-                goal.assist1 = assists[0]
+                goal.assist1_id = assists[0]
             if len(assists) > 1 and assists[1]:
-                goal.assist2 = assists[1]
+                goal.assist2_id = assists[1]
 
             goals.append(goal)
 
         return goals
 
-    def _process_cards(self, cards_data: Dict, team: Team, match: Match) -> List[Card]:
+    @timed
+    def _process_cards(self, cards_data: Dict, team: Team, match: Match, roster: Dict[int, int]) -> List[Card]:
         """Process cards data and return list of Card objects"""
         cards = []
         if not cards_data:  # Handle empty cards data
@@ -200,27 +426,27 @@ class MatchParser:
         if isinstance(sods_list, dict):  # Handle single card case
             sods_list = [sods_list]
 
+        booked_players = set()  # Players already carded in this match
         for card_data in sods_list:
-            player = self._get_player_by_number(card_data['Nr'], team)
-
-            # Check if player already has a yellow card in this match
-            existing_card = self.db.query(Card).filter_by(
-                match=match,
-                player=player
-            ).first()
+            player_id = self._player_id(roster, team, card_data['Nr'], 'card', card_data['Laiks'])
 
             card = Card(
                 match=match,
                 team=team,
-                player=player,
+                player_id=player_id,
                 time=card_data['Laiks'],
-                is_red=(existing_card is not None)  # Red if second card
+                seconds=time_to_seconds(card_data['Laiks']),
+                is_red=(player_id is not None and player_id in booked_players)  # Red if second card
             )
+            if player_id is not None:
+                booked_players.add(player_id)
             cards.append(card)
 
         return cards
 
-    def _process_substitutions(self, subs_data: Dict, team: Team, match: Match) -> List[Substitution]:
+    @timed
+    def _process_substitutions(self, subs_data: Dict, team: Team, match: Match,
+                               roster: Dict[int, int]) -> List[Substitution]:
         """Process substitutions data and return list of Substitution objects"""
         substitutions = []
         if not subs_data:  # Handle empty substitutions data
@@ -231,16 +457,17 @@ class MatchParser:
             maina_list = [maina_list]
 
         for sub_data in maina_list:
-            player_out = self._get_player_by_number(sub_data['Nr1'], team)
-            player_in = self._get_player_by_number(sub_data['Nr2'], team)
+            player_out_id = self._player_id(roster, team, sub_data['Nr1'], 'substitution', sub_data['Laiks'])
+            player_in_id = self._player_id(roster, team, sub_data['Nr2'], 'substitution', sub_data['Laiks'])
 
             sub = Substitution(
                 match=match,
                 team=team,
-                player_out=player_out,
-                player_in=player_in,
-                time=sub_data['Laiks']
+                player_out_id=player_out_id,
+                player_in_id=player_in_id,
+                time=sub_data['Laiks'],
+                seconds=time_to_seconds(sub_data['Laiks'])
             )
             substitutions.append(sub)
 
-        return substitutions
\ No newline at end of file
+        return substitutions
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import delete, select, or_
+from sqlalchemy.orm import Session
+from src.database.models import (Team, Player, Match, Goal, Card, Substitution, Referee, MatchReferee, MatchPlayer,
+                                 IngestedFile)
+from src.parsers.identity import IdentityResolver
+from src.parsers.pipeline import load_match_files, IngestProgress, DEFAULT_QUEUE_DEPTH
+from src.parsers.stream_parser import load_match_stream, is_stream_file, STREAM_EXTENSIONS
+from src.profiling import timed
+from src.statistics.materialized import apply_match_statistics
+
+
+def file_hash(file_path: str) -> str:
+    """SHA-256 of the file contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_data_dir(data_dir: str) -> Dict[str, os.stat_result]:
+    """Stat every JSON and NDJSON file in the data directory, keyed by relative path"""
+    return {
+        filename: os.stat(os.path.join(data_dir, filename))
+        for filename in sorted(os.listdir(data_dir))
+        if filename.endswith(('.json',) + STREAM_EXTENSIONS)
+    }
+
+
+def plan_reload(db: Session, data_dir: str, settle_seconds: float = 0.0) -> Dict:
+    """
+    Compare the data directory against the manifest.
+    Files whose size and mtime are unchanged are not read at all, others are
+    hashed so that a touched but identical file is not re-ingested. Files
+    modified less than settle_seconds ago may still be being written and
+    are left pending for a later reload.
+    """
+    on_disk = scan_data_dir(data_dir)
+    manifest = {entry.path: entry for entry in db.query(IngestedFile).all()}
+    plan = {'new': [], 'changed': [], 'touched': [], 'deleted': [], 'unchanged': [], 'pending': [],
+            'manifest': manifest, 'hashes': {}, 'stats': on_disk}
+    now = time.time()
+
+    for path in manifest:
+        if path not in on_disk:
+            plan['deleted'].append(path)
+
+    for path, stat in on_disk.items():
+        entry = manifest.get(path)
+        if entry is not None and entry.size == stat.st_size and entry.mtime == stat.st_mtime:
+            plan['unchanged'].append(path)
+            continue
+        if now - stat.st_mtime < settle_seconds:
+            plan['pending'].append(path)
+            continue
+
+        plan['hashes'][path] = file_hash(os.path.join(data_dir, path))
+        if entry is None:
+            plan['new'].append(path)
+        elif entry.content_hash == plan['hashes'][path]:
+            plan['touched'].append(path)
+        else:
+            plan['changed'].append(path)
+
+    return plan
+
+
+def delete_matches(db: Session, match_ids: List[int]) -> None:
+    """Delete matches with their events, then teams and referees left without matches"""
+    if not match_ids:
+        return
+
+    apply_match_statistics(db, match_ids, sign=-1)
+    for model in (Goal, Card, Substitution, MatchReferee, MatchPlayer):
+        db.execute(delete(model).where(model.match_id.in_(match_ids)))
+    db.execute(delete(Match).where(Match.id.in_(match_ids)))
+
+    orphan_teams = select(Team.id).where(
+        ~select(Match.id).where(or_(Match.home_team_id == Team.id, Match.away_team_id == Team.id)).exists()
+    )
+    orphan_team_ids = db.execute(orphan_teams).scalars().all()
+    if orphan_team_ids:
+        db.execute(delete(Player).where(Player.team_id.in_(orphan_team_ids)))
+        db.execute(delete(Team).where(Team.id.in_(orphan_team_ids)))
+
+    db.execute(delete(Referee).where(
+        ~select(MatchReferee.id).where(MatchReferee.referee_id == Referee.id).exists()
+    ))
+
+
+class _ManifestRecorder(IngestProgress):
+    """Passes progress on and records files in the manifest once their matches are committed"""
+
+    def __init__(self, db: Session, plan: Dict, paths: Dict[str, str], progress: IngestProgress):
+        self.db = db
+        self.plan = plan
+        self.paths = paths  # Full file path to manifest path
+        self.progress = progress
+
+    def started(self, total_files: int) -> None:
+        self.progress.started(total_files)
+
+    def file_done(self, file_path: str, failed: bool = False) -> None:
+        self.progress.file_done(file_path, failed)
+
+    def files_stored(self, file_paths: List[str]) -> None:
+        _record_files(self.plan, [self.paths[file_path] for file_path in file_paths])
+        self.db.commit()
+        self.progress.files_stored(file_paths)
+
+
+def _record_files(plan: Dict, paths: List[str]) -> None:
+    """Write the state the files had when the reload was planned to their manifest entries"""
+    now = datetime.now()
+    for path in paths:
+        stat = plan['stats'][path]
+        entry = plan['manifest'][path]
+        entry.size = stat.st_size
+        entry.mtime = stat.st_mtime
+        entry.content_hash = plan['hashes'][path]
+        entry.ingested_at = now
+
+
+def _drop_unrecorded(db: Session, file_ids: List[int]) -> None:
+    """Remove manifest entries still without a recorded state, with any matches they have"""
+    unrecorded_ids = db.execute(select(IngestedFile.id).where(
+        IngestedFile.id.in_(file_ids), IngestedFile.content_hash.is_(None)
+    )).scalars().all()
+    if not unrecorded_ids:
+        return
+    delete_matches(db, db.execute(
+        select(Match.id).where(Match.source_file_id.in_(unrecorded_ids))
+    ).scalars().all())
+    db.execute(delete(IngestedFile).where(IngestedFile.id.in_(unrecorded_ids)))
+    db.commit()
+
+
+@timed
+def reload_data_dir(db: Session, data_dir: str, workers: Optional[int] = None,
+                    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+                    progress: Optional[IngestProgress] = None, settle_seconds: float = 0.0) -> Dict:
+    """
+    Bring the database in line with the data directory.
+    Only new and changed files are parsed, matches of changed and deleted
+    files are removed first. progress follows the files being parsed and
+    may cancel the load between two of them.
+
+    A file's size, mtime and hash are written to the manifest only after its
+    matches are committed. A load that stops early leaves the files it did
+    not store without that state, so the next reload ingests them again.
+    """
+    progress = progress or IngestProgress()
+    plan = plan_reload(db, data_dir, settle_seconds)
+    manifest = plan['manifest']
+
+    stale_ids = [manifest[path].id for path in plan['deleted'] + plan['changed']]
+    if stale_ids:
+        delete_matches(db, db.execute(
+            select(Match.id).where(Match.source_file_id.in_(stale_ids))
+        ).scalars().all())
+    deleted_ids = [manifest[path].id for path in plan['deleted']]
+    if deleted_ids:
+        db.execute(delete(IngestedFile).where(IngestedFile.id.in_(deleted_ids)))
+
+    # Entries for the files about to be ingested, without a state until they are stored
+    for path in plan['changed']:
+        entry = manifest[path]
+        entry.size = entry.mtime = entry.content_hash = entry.ingested_at = None
+    for path in plan['new']:
+        manifest[path] = IngestedFile(path=path)
+        db.add(manifest[path])
+    _record_files(plan, plan['touched'])
+    db.commit()
+
+    to_ingest = sorted(plan['changed'] + plan['new'])
+    paths = {os.path.join(data_dir, path): path for path in to_ingest}
+    file_paths = list(paths)
+    source_file_ids = {file_path: manifest[path].id for file_path, path in paths.items()}
+    recorder = _ManifestRecorder(db, plan, paths, progress)
+
+    # Season dumps are streamed match by match, single-match files go through the pipeline
+    # One set of player and referee maps for every file of the reload
+    try:
+        recorder.started(len(file_paths))
+        identities = IdentityResolver(db)
+        stream_paths = [file_path for file_path in file_paths if is_stream_file(file_path)]
+        summary = load_match_files(db, [file_path for file_path in file_paths if file_path not in stream_paths],
+                                   workers=workers, queue_depth=queue_depth, source_file_ids=source_file_ids,
+                                   progress=recorder, identities=identities)
+        summary['files'] = len(file_paths)
+        for file_path in stream_paths:
+            stream_summary = load_match_stream(db, file_path, source_file_id=source_file_ids[file_path],
+                                               identities=identities)
+            for key in ('stored', 'duplicates', 'errors', 'failed_files', 'failures', 'duplicate_matches',
+                        'unresolved_players', 'identity_conflicts'):
+                summary[key] += stream_summary[key]
+            if not stream_summary['failed_files']:
+                recorder.files_stored([file_path])
+            recorder.file_done(file_path, failed=bool(stream_summary['failed_files']))
+    finally:
+        # Failed files, and files a cancelled or broken load never stored, are dropped
+        # from the manifest so the next reload retries them, together with any
+        # matches a partly read season dump already stored
+        db.rollback()
+        _drop_unrecorded(db, list(source_file_ids.values()))
+
+    summary.update({
+        'new': len(plan['new']),
+        'changed': len(plan['changed']),
+        'deleted': len(plan['deleted']),
+        'unchanged': len(plan['unchanged']) + len(plan['touched']),
+        'touched': len(plan['touched']),
+        'pending': len(plan['pending'])
+    })
+    return summary
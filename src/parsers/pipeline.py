@@ -0,0 +1,170 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from src.parsers.bulk_parser import BulkMatchParser
+from src.parsers.identity import IdentityResolver
+from src.parsers.json_parser import read_match_file, duplicate_entry, failure_entry
+from src.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Files decoded ahead of the writer
+DEFAULT_QUEUE_DEPTH = 32
+# Files persisted per transaction
+DEFAULT_BATCH_SIZE = 100
+
+
+class IngestCancelled(Exception):
+    """Raised by a progress observer to stop a load between two files"""
+
+
+class IngestProgress:
+    """
+    Observer of a load, notified once the files to ingest are known, after
+    every file and once the matches of finished files are committed.
+    file_done may raise IngestCancelled to stop the load.
+    """
+
+    def started(self, total_files: int) -> None:
+        pass
+
+    def file_done(self, file_path: str, failed: bool = False) -> None:
+        pass
+
+    def files_stored(self, file_paths: List[str]) -> None:
+        pass
+
+
+def _decode(file_path: str) -> Tuple[Optional[Dict], Optional[Exception]]:
+    """Worker entry point, errors are returned so they stay attached to their file"""
+    try:
+        return read_match_file(file_path), None
+    except Exception as e:
+        return None, e
+
+
+def decode_files(file_paths: List[str], workers: int = 1,
+                 queue_depth: int = DEFAULT_QUEUE_DEPTH) -> Iterator[Tuple[str, Optional[Dict], Optional[Exception]]]:
+    """
+    Decode and normalize match files, yielding (path, record, error) in input order.
+    With more than one worker, files are decoded in a process pool while the
+    consumer is busy, with at most queue_depth files in flight.
+    """
+    if workers <= 1:
+        for file_path in file_paths:
+            yield (file_path, *_decode(file_path))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for file_path in file_paths:
+            in_flight.append((file_path, pool.submit(_decode, file_path)))
+            if len(in_flight) >= queue_depth:
+                path, future = in_flight.popleft()
+                yield (path, *future.result())
+
+        while in_flight:
+            path, future = in_flight.popleft()
+            yield (path, *future.result())
+
+
+@timed
+def load_match_files(db: Session, file_paths: List[str], workers: Optional[int] = None,
+                     queue_depth: int = DEFAULT_QUEUE_DEPTH,
+                     batch_size: int = DEFAULT_BATCH_SIZE,
+                     source_file_ids: Optional[Dict[str, int]] = None,
+                     progress: Optional[IngestProgress] = None,
+                     identities: Optional[IdentityResolver] = None) -> Dict:
+    """
+    Pipelined loader: decoding runs in worker processes, a single writer
+    persists the records in file order. A file that fails to decode or store
+    is reported and skipped without affecting the other files.
+    source_file_ids maps file paths to their ingestion manifest entries,
+    progress is told about every file as the writer gets to it, identities
+    may be shared with the other loaders of the same ingest. When progress
+    cancels the load, the files read so far are stored before it stops.
+    """
+    summary = {'files': len(file_paths), 'stored': 0, 'duplicates': 0, 'errors': 0, 'failed_files': [],
+               'failures': [], 'duplicate_matches': [], 'unresolved_players': [], 'identity_conflicts': []}
+    if not file_paths:
+        return summary
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(file_paths)))
+    queue_depth = max(1, queue_depth)
+
+    parser = BulkMatchParser(db, batch_size, identities)
+    parser.load_lookups()
+    source_file_ids = source_file_ids or {}
+    progress = progress or IngestProgress()
+    batch = []
+    done = []  # Files finished since the last flush, stored or duplicates
+
+    try:
+        for file_path, record, error in decode_files(file_paths, workers, queue_depth):
+            filename = os.path.basename(file_path)
+            if error is None:
+                try:
+                    if parser.add_match(record, source_file_ids.get(file_path), filename):
+                        batch.append((file_path, record))
+                    else:
+                        summary['duplicates'] += 1
+                        summary['duplicate_matches'].append(record_duplicate(file_path, record))
+                except Exception as e:
+                    error = e
+
+            if error is not None:
+                _file_failed(summary, file_path, error)
+                progress.file_done(file_path, failed=True)
+                continue
+
+            done.append(file_path)
+            if len(batch) >= batch_size:
+                _write_batch(parser, batch, done, summary, source_file_ids, progress)
+            progress.file_done(file_path)
+    except IngestCancelled:
+        # Files read before the cancel are kept, the rest is left for the next load
+        _write_batch(parser, batch, done, summary, source_file_ids, progress)
+        raise
+
+    _write_batch(parser, batch, done, summary, source_file_ids, progress)
+    summary.update(parser.identities.take_report())
+    return summary
+
+
+def _file_failed(summary: Dict, file_path: str, error: Exception) -> None:
+    logger.warning("Could not ingest %s: %s", os.path.basename(file_path), error)
+    summary['errors'] += 1
+    summary['failed_files'].append(file_path)
+    summary['failures'].append(failure_entry(file_path, error))
+
+
+def record_duplicate(file_path: str, record: Dict) -> Dict:
+    """Ingest summary entry for a normalized record that is already stored"""
+    return duplicate_entry(file_path, record['date'], record['venue'], record['teams'][0]['name'],
+                           record['teams'][1]['name'])
+
+
+def _write_batch(parser: BulkMatchParser, batch: List[Tuple[str, Dict]], done: List[str], summary: Dict,
+                 source_file_ids: Dict[str, int], progress: IngestProgress) -> None:
+    """
+    Flush a batch, falling back to one transaction per file if it fails,
+    and tell progress which of the finished files are now committed
+    """
+    try:
+        summary['stored'] += parser.flush()
+    except Exception:
+        for file_path, record in batch:
+            try:
+                parser.add_match(record, source_file_ids.get(file_path), os.path.basename(file_path))
+                summary['stored'] += parser.flush()
+            except Exception as e:
+                _file_failed(summary, file_path, e)
+    batch.clear()
+    failed = set(summary['failed_files'])
+    progress.files_stored([file_path for file_path in done if file_path not in failed])
+    done.clear()
@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy.orm import sessionmaker
+from src.database.database import create_db_engine
+from src.database.instrumentation import track_queries
+from src.database.snapshots import publish_snapshot
+from src.parsers.manifest import reload_data_dir
+from src.parsers.pipeline import IngestCancelled, IngestProgress, DEFAULT_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+PUBLISHING = 'publishing'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Jobs remembered for the status endpoint, oldest are forgotten first
+JOB_HISTORY = 20
+
+
+class ReloadJob(IngestProgress):
+    """One background reload, with the progress reported to clients"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.state = QUEUED
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.files_total = 0
+        self.files_done = 0
+        self.errors = 0
+        self.summary = None
+        self.message = None
+        self._load_started = None
+        self._load_seconds = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    def started(self, total_files: int) -> None:
+        self.files_total = total_files
+        self._load_started = time.perf_counter()
+
+    def file_done(self, file_path: str, failed: bool = False) -> None:
+        self.files_done += 1
+        if failed:
+            self.errors += 1
+        if self._cancel.is_set():
+            raise IngestCancelled(f"Reload {self.id} cancelled")
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def request_cancel(self) -> None:
+        self._cancel.set()
+
+    def finish(self, state: str, message: str, summary: Optional[Dict] = None) -> None:
+        if self._load_started is not None:
+            self._load_seconds = time.perf_counter() - self._load_started
+        self.summary = summary
+        self.message = message
+        self.finished_at = datetime.now()
+        self.state = state
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished, False on timeout"""
+        return self._done.wait(timeout)
+
+    def files_per_second(self) -> float:
+        if self._load_started is None:
+            return 0.0
+        seconds = self._load_seconds
+        if seconds is None:
+            seconds = time.perf_counter() - self._load_started
+        return self.files_done / seconds if seconds > 0 else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'state': self.state,
+            'created_at': self.created_at.isoformat(timespec='seconds'),
+            'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None,
+            'files_total': self.files_total,
+            'files_done': self.files_done,
+            'errors': self.errors,
+            'files_per_second': round(self.files_per_second(), 2),
+            'message': self.message,
+            'summary': self.summary
+        }
+
+
+class ReloadJobManager:
+    """
+    Runs reloads one at a time on a background thread.
+    Each job loads only the changed files straight into the database and then
+    publishes a read snapshot, so readers only ever see the old or the new
+    data. A cancelled job keeps the files it stored and publishes nothing.
+
+    Without a snapshot directory, as with a server database (database_path
+    None, database_url given), readers may see a reload in progress.
+    """
+
+    def __init__(self, database_path: Optional[str], data_dir: str, workers: Optional[int] = None,
+                 queue_depth: int = DEFAULT_QUEUE_DEPTH, settle_seconds: float = 0.0,
+                 database_url: Optional[str] = None, snapshot_dir: Optional[str] = None):
+        self.database_path = database_path
+        self.database_url = database_url
+        # Published jobs also publish a read snapshot here, see src/database/snapshots.py
+        self.snapshot_dir = snapshot_dir
+        self.data_dir = data_dir
+        self.workers = workers
+        self.queue_depth = queue_depth
+        # Files modified more recently than this are left for the next reload
+        self.settle_seconds = settle_seconds
+        # Held while a job writes; other writers such as a flush must not run meanwhile
+        self.write_lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def submit(self) -> ReloadJob:
+        """Queue a reload; a reload still waiting to start already covers this request"""
+        with self._condition:
+            for job in self._queue:
+                if job.state == QUEUED:
+                    return job
+            job = ReloadJob()
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+            self._queue.append(job)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._work, name='reload-jobs', daemon=True)
+                self._worker.start()
+            self._condition.notify()
+            return job
+
+    def get(self, job_id: str) -> Optional[ReloadJob]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[ReloadJob]:
+        """Known jobs, newest first"""
+        with self._condition:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> Optional[ReloadJob]:
+        """
+        Cancel a queued job at once or ask a running one to stop after its
+        current file. None for an unknown job.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.request_cancel()
+            if job.state == QUEUED:
+                job.finish(CANCELLED, "Cancelled before it started")
+            return job
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - JOB_HISTORY)]:
+            del self._jobs[job_id]
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                job = self._queue.popleft()
+                if job.state != QUEUED:
+                    continue  # Cancelled while waiting
+                job.state = RUNNING
+                job.started_at = datetime.now()
+            self.run(job)
+
+    def run(self, job: ReloadJob) -> None:
+        """Load, then publish; the outcome is recorded on the job"""
+        with self.write_lock:
+            try:
+                with track_queries('reload'):
+                    summary = self._load(job)
+                outcome = (SUCCEEDED, f"Stored {summary['stored']} matches from {summary['files']} files, "
+                                      f"{summary['errors']} errors", summary)
+            except IngestCancelled as e:
+                outcome = (CANCELLED, str(e))
+            except Exception as e:
+                logger.exception("Reload %s failed", job.id)
+                outcome = (FAILED, str(e))
+            job.finish(*outcome)
+
+    def _load(self, job: ReloadJob) -> Dict:
+        engine = create_db_engine(self.database_url or f"sqlite:///{self.database_path}")
+        try:
+            db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+            try:
+                summary = reload_data_dir(db, self.data_dir, workers=self.workers, queue_depth=self.queue_depth,
+                                          progress=job, settle_seconds=self.settle_seconds)
+            except IngestCancelled:
+                raise IngestCancelled(f"Reload {job.id} cancelled, files loaded so far are kept")
+            finally:
+                db.close()
+        finally:
+            engine.dispose()
+
+        summary['failed_files'] = [os.path.basename(file_path) for file_path in summary['failed_files']]
+        summary['published'] = any(summary[key] for key in ('new', 'changed', 'deleted', 'touched'))
+        if summary['published'] and self.snapshot_dir and self.database_path:
+            job.state = PUBLISHING
+            publish_snapshot(self.database_path, self.snapshot_dir)
+        return summary
@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from src.parsers.bulk_parser import BulkMatchParser
+from src.parsers.identity import IdentityResolver
+from src.parsers.json_parser import normalize_match, failure_entry
+from src.parsers.pipeline import DEFAULT_BATCH_SIZE, record_duplicate
+
+logger = logging.getLogger(__name__)
+
+# Characters read from the file at a time
+DEFAULT_CHUNK_SIZE = 1 << 20
+# A single match larger than this is treated as a broken file, not buffered further
+MAX_DOCUMENT_SIZE = 64 << 20
+# Files with these extensions hold one match per line
+STREAM_EXTENSIONS = ('.ndjson', '.jsonl')
+
+_WHITESPACE = ' \t\r\n'
+
+
+def is_stream_file(file_path: str) -> bool:
+    """True for season dumps: NDJSON files and JSON files holding a top-level array"""
+    if file_path.endswith(STREAM_EXTENSIONS):
+        return True
+    try:
+        with open(file_path, 'r', encoding='utf-8-sig') as f:
+            while True:
+                char = f.read(1)
+                if not char or char not in _WHITESPACE:
+                    return char == '['
+    except (OSError, UnicodeDecodeError):
+        # Left to the regular loader, which reports the file as failed
+        return False
+
+
+def iter_match_documents(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Yield the match objects of a season dump one at a time.
+    The file may be a JSON array of matches, newline-delimited JSON or a
+    single match; only the current chunk and the match being decoded are
+    held in memory. Each match may be wrapped in {'Spele': ...} or bare.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        buffer = f.read(chunk_size)
+        position = 0
+        at_eof = not buffer
+        in_array = None
+
+        while True:
+            # Skip whitespace and, inside an array, the separating commas
+            while True:
+                while position < len(buffer) and (buffer[position] in _WHITESPACE
+                                                  or (in_array and buffer[position] == ',')):
+                    position += 1
+                if position < len(buffer) or at_eof:
+                    break
+                buffer = f.read(chunk_size)
+                position = 0
+                at_eof = not buffer
+
+            if position >= len(buffer):
+                if in_array:
+                    raise ValueError(f"{file_path}: unterminated JSON array")
+                return
+
+            if in_array is None:
+                in_array = buffer[position] == '['
+                if in_array:
+                    position += 1
+                    continue
+            elif in_array and buffer[position] == ']':
+                return
+
+            try:
+                document, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if at_eof:
+                    raise
+                if len(buffer) - position > MAX_DOCUMENT_SIZE:
+                    raise ValueError(f"{file_path}: match at offset {position} is not valid JSON")
+                # The match continues in the next chunk
+                chunk = f.read(chunk_size)
+                at_eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+
+            yield document.get('Spele', document) if isinstance(document, dict) else document
+
+            # Drop consumed text so the buffer stays about one chunk long
+            if position >= chunk_size:
+                buffer = buffer[position:]
+                position = 0
+
+
+def load_match_stream(db: Session, file_path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                      source_file_id: Optional[int] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      identities: Optional[IdentityResolver] = None) -> Dict:
+    """
+    Store every match of a season dump through the bulk parser.
+    Matches are decoded, normalized and written in batches as the file is
+    read. A match that cannot be stored is reported by its position in the
+    file and skipped; a file that stops being valid JSON is reported in
+    failed_files, with the matches before the damage already stored.
+    """
+    summary = {'files': 1, 'matches': 0, 'stored': 0, 'duplicates': 0, 'errors': 0,
+               'failed_files': [], 'failed_matches': [], 'failures': [], 'duplicate_matches': []}
+    filename = os.path.basename(file_path)
+    parser = BulkMatchParser(db, batch_size, identities)
+    parser.load_lookups()
+    batch = []
+
+    try:
+        for index, match_data in enumerate(iter_match_documents(file_path, chunk_size)):
+            summary['matches'] += 1
+            try:
+                record = normalize_match(match_data)
+                if parser.add_match(record, source_file_id, _source(filename, index)):
+                    batch.append((index, record))
+                else:
+                    summary['duplicates'] += 1
+                    summary['duplicate_matches'].append(dict(record_duplicate(file_path, record), index=index))
+            except Exception as e:
+                _match_failed(summary, filename, index, e)
+                continue
+
+            if len(batch) >= batch_size:
+                _write_batch(parser, batch, summary, filename, source_file_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        logger.warning("Could not ingest %s: %s", filename, e)
+        summary['errors'] += 1
+        summary['failed_files'].append(file_path)
+        summary['failures'].append(failure_entry(file_path, e))
+
+    _write_batch(parser, batch, summary, filename, source_file_id)
+    summary.update(parser.identities.take_report())
+    return summary
+
+
+def _source(filename: str, index: int) -> str:
+    """Match position in a season dump, as named in the identity report"""
+    return f"{filename}#{index}"
+
+
+def _match_failed(summary: Dict, filename: str, index: int, error: Exception) -> None:
+    logger.warning("Could not ingest match %d of %s: %s", index, filename, error)
+    summary['errors'] += 1
+    summary['failed_matches'].append(index)
+    summary['failures'].append(failure_entry(filename, error, index))
+
+
+def _write_batch(parser: BulkMatchParser, batch: List[Tuple[int, Dict]], summary: Dict, filename: str,
+                 source_file_id: Optional[int]) -> None:
+    """Flush a batch, falling back to one transaction per match if it fails"""
+    try:
+        summary['stored'] += parser.flush()
+    except Exception:
+        for index, record in batch:
+            try:
+                parser.add_match(record, source_file_id, _source(filename, index))
+                summary['stored'] += parser.flush()
+            except Exception as e:
+                _match_failed(summary, filename, index, e)
+    batch.clear()
@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+from src.parsers.manifest import scan_data_dir
+from src.parsers.reload_job import ReloadJob, ReloadJobManager, SUCCEEDED
+from src.profiling import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two scans of the data directory
+POLL_INTERVAL = 1.0
+# A burst of files is ingested once the directory has been quiet this long
+DEBOUNCE_SECONDS = 2.0
+# ... or once its first file has waited this long, even if files keep arriving
+MAX_DELAY_SECONDS = 10.0
+# Files modified more recently may still be being written and are not ingested yet
+SETTLE_SECONDS = 1.0
+# Batches whose lag is kept for the metrics
+LAG_HISTORY = 1000
+# Upper bounds in seconds of the ingest lag histogram buckets, +Inf is implied
+LAG_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class DataDirWatcher:
+    """
+    Ingests new and changed match files shortly after they land in the data
+    directory. The directory is polled by size and mtime; when watchdog is
+    installed, file system events trigger the poll without waiting for the
+    interval. Bursts are debounced into one reload job, which goes through
+    the same queue as /api/reload and bumps the data version, so cached
+    statistics are recomputed on the next request.
+    """
+
+    def __init__(self, jobs: ReloadJobManager, data_dir: str, poll_interval: float = POLL_INTERVAL,
+                 debounce: float = DEBOUNCE_SECONDS, max_delay: float = MAX_DELAY_SECONDS):
+        self.jobs = jobs
+        self.data_dir = data_dir
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.mode = None
+        # Directory state the last submitted reload covered, None forces a reload
+        self._covered = None
+        self._last_scan = None
+        self._last_change_at = None
+        self._dirty_since = None
+        self._job = None
+        self._job_landed_at = None
+        self._job_files = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.files_ingested = 0
+        self.lags = deque(maxlen=LAG_HISTORY)
+        self._lag_histogram = Histogram(LAG_BUCKETS)
+        self.last_batch_at = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._observer = self._start_observer()
+        self.mode = 'events' if self._observer is not None else 'polling'
+        logger.info("Watching %s for match files (%s)", self.data_dir, self.mode)
+        self._thread = threading.Thread(target=self._run, name='data-dir-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _start_observer(self):
+        """Wake the poll loop on file system events if watchdog is available"""
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+
+        wake = self._wake
+
+        class WakeHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                wake.set()
+
+        observer = Observer()
+        observer.schedule(WakeHandler(), self.data_dir)
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception:
+                logger.exception("Watcher poll failed")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def poll_once(self) -> Optional[ReloadJob]:
+        """Scan the directory once; returns the reload job if one was submitted"""
+        with self._lock:
+            now = time.monotonic()
+            self._collect_finished_job()
+            scan = self._scan()
+            if scan != self._last_scan:
+                self._last_scan = scan
+                self._last_change_at = now
+
+            if scan == self._covered:
+                self._dirty_since = None
+                return None
+            if self._dirty_since is None:
+                self._dirty_since = now
+            if self._job is not None:
+                return None  # The next batch waits for the running one
+
+            quiet = now - self._last_change_at >= self.debounce
+            overdue = now - self._dirty_since >= self.max_delay
+            if not (quiet or overdue):
+                return None
+
+            changed = [stat for path, stat in scan.items() if (self._covered or {}).get(path) != stat]
+            self._job_landed_at = min((mtime for _, mtime in changed), default=time.time())
+            self._job_files = len(changed)
+            self._covered = scan
+            self._dirty_since = None
+            self._job = self.jobs.submit()
+            return self._job
+
+    def _scan(self) -> Dict[str, Tuple[int, float]]:
+        if not os.path.isdir(self.data_dir):
+            return {}
+        return {path: (stat.st_size, stat.st_mtime) for path, stat in scan_data_dir(self.data_dir).items()}
+
+    def _collect_finished_job(self) -> None:
+        job = self._job
+        if job is None or not job.finished:
+            return
+        self._job = None
+        if job.state != SUCCEEDED:
+            # Failed or cancelled, the next poll tries the same files again
+            self._covered = None
+            return
+        if job.summary['pending']:
+            # Files still being written were skipped; try again once they settle
+            self._covered = None
+        self.batches += 1
+        self.files_ingested += job.summary['new'] + job.summary['changed']
+        self.last_batch_at = job.finished_at
+        if self._job_files:
+            lag = max(0.0, job.finished_at.timestamp() - self._job_landed_at)
+            self.lags.append(lag)
+            self._lag_histogram.observe(lag)
+
+    def lag_histogram(self) -> Dict:
+        """Histogram.stats() of the ingest lag of every batch so far, bucketed by LAG_BUCKETS"""
+        with self._lock:
+            self._collect_finished_job()
+            return self._lag_histogram.stats()
+
+    def stats(self) -> Dict:
+        """Ingest lag is the time from a file landing to its matches being served"""
+        with self._lock:
+            self._collect_finished_job()
+            return {
+                'running': self._thread is not None,
+                'mode': self.mode,
+                'data_dir': self.data_dir,
+                'batches': self.batches,
+                'files_ingested': self.files_ingested,
+                'pending_changes': self._covered != self._last_scan or self._job is not None,
+                'last_batch_at': self.last_batch_at.isoformat(timespec='seconds') if self.last_batch_at else None,
+                'last_lag_seconds': round(self.lags[-1], 3) if self.lags else None,
+                'mean_lag_seconds': round(sum(self.lags) / len(self.lags), 3) if self.lags else None,
+                'max_lag_seconds': round(max(self.lags), 3) if self.lags else None
+            }
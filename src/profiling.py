@@ -0,0 +1,158 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Upper bounds in seconds of the histogram buckets, +Inf is implied
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = 'football_stats'
+# Lines of cProfile output returned for a profiled request
+PROFILE_LINES = 40
+
+# Timing is off unless enabled, a disabled timer costs one flag check
+_enabled = os.environ.get('FOOTBALL_STATS_METRICS') == '1'
+_lock = threading.Lock()
+_histograms = {}
+
+
+class Histogram:
+    """Cumulative-on-export bucket counts of one operation's durations"""
+
+    def __init__(self, bounds: Tuple[float, ...] = BUCKETS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def stats(self) -> Dict:
+        return {'count': self.count, 'sum': self.sum, 'buckets': list(self.buckets)}
+
+
+def enable_metrics() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable_metrics() -> None:
+    global _enabled
+    _enabled = False
+
+
+def metrics_enabled() -> bool:
+    return _enabled
+
+
+def observe(operation: str, seconds: float) -> None:
+    with _lock:
+        histogram = _histograms.get(operation)
+        if histogram is None:
+            histogram = _histograms[operation] = Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def timer(operation: str):
+    """Time the block into the operation's histogram when metrics are enabled"""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(operation, time.perf_counter() - start)
+
+
+def timed(function):
+    """Decorator form of timer, named after the function's qualified name"""
+    operation = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            observe(operation, time.perf_counter() - start)
+
+    return wrapper
+
+
+def timing_stats() -> Dict[str, Dict]:
+    """Call count, total and per-bucket counts per operation"""
+    with _lock:
+        return {operation: histogram.stats() for operation, histogram in _histograms.items()}
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _histograms.clear()
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(name: str, bounds: Tuple[float, ...], stats: Dict, label: str = '') -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(bounds + ('+Inf',), stats['buckets']):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{label}{"," if label else ""}le="{bound}"}} {cumulative}')
+    labels = f"{{{label}}}" if label else ''
+    lines.append(f"{name}_sum{labels} {stats['sum']}")
+    lines.append(f"{name}_count{labels} {stats['count']}")
+    return lines
+
+
+def render_histograms() -> str:
+    """Operation timings in the Prometheus text exposition format"""
+    name = f"{METRIC_PREFIX}_operation_seconds"
+    lines = [f"# HELP {name} Time spent in instrumented operations",
+             f"# TYPE {name} histogram"]
+    for operation, stats in sorted(timing_stats().items()):
+        lines.extend(_histogram_lines(name, BUCKETS, stats, f'operation="{_label(operation)}"'))
+    return '\n'.join(lines) + '\n'
+
+
+def render_histogram(name: str, description: str, bounds: Tuple[float, ...], stats: Dict) -> str:
+    """One unlabelled Prometheus histogram from Histogram.stats()"""
+    metric = f"{METRIC_PREFIX}_{name}"
+    lines = [f"# HELP {metric} {description}", f"# TYPE {metric} histogram"]
+    lines.extend(_histogram_lines(metric, bounds, stats))
+    return '\n'.join(lines) + '\n'
+
+
+def render_counters(name: str, description: str, values: Dict[str, float], label: str = 'operation') -> str:
+    """One labelled Prometheus counter family"""
+    metric = f"{METRIC_PREFIX}_{name}"
+    lines = [f"# HELP {metric} {description}", f"# TYPE {metric} counter"]
+    lines.extend(f'{metric}{{{label}="{_label(key)}"}} {value}' for key, value in sorted(values.items()))
+    return '\n'.join(lines) + '\n'
+
+
+def start_profile() -> cProfile.Profile:
+    profile = cProfile.Profile()
+    profile.enable()
+    return profile
+
+
+def profile_report(profile: cProfile.Profile, lines: int = PROFILE_LINES, sort: str = 'cumulative') -> str:
+    """Stop a profile and format its most expensive calls"""
+    profile.disable()
+    output = io.StringIO()
+    pstats.Stats(profile, stream=output).sort_stats(sort).print_stats(lines)
+    return output.getvalue()
@@ -0,0 +1,87 @@
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+from src.database.data_version import get_data_version
+
+_MISSING = object()
+
+
+class StatisticsCache:
+    """
+    Size-bounded LRU cache for statistics results.
+    Keys include the data version, so results computed before an ingest or
+    flush are never served afterwards; they simply age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        # Computed outside the lock so slow queries do not block cache hits
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+def cached(method):
+    """
+    Cache a calculator method by calculator, season scope, arguments and data version.
+    Only active when the calculator was created with a cache.
+    Rows are copied on the way out so callers cannot alter cached results.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.cache is None:
+            return method(self, *args, **kwargs)
+        # Bind defaults so f() and f(limit=10) share an entry
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        key = (
+            type(self).__name__,
+            method.__name__,
+            self.materialized,
+            self.seasons,
+            tuple(arguments.arguments.items())[1:],
+            get_data_version(self.db)
+        )
+        rows = self.cache.get_or_compute(key, lambda: method(self, *args, **kwargs))
+        return [dict(row) for row in rows]
+
+    return wrapper
@@ -0,0 +1,138 @@
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, aliased
+from typing import Iterable, List, Dict, Optional
+from src.database.models import Team, Player, Match, Goal, Card, PlayerStat
+from src.statistics.cache import StatisticsCache
+from src.statistics.seasons import season_scope, scoped_counters, in_seasons
+from src.statistics.standings_calculator import StandingsCalculator
+from src.statistics.substitutions_calculator import SubstitutionCalculator
+from src.profiling import timed
+
+
+class DetailsCalculator:
+    """Per-team and per-player drill-down built on the materialized statistics"""
+
+    # Counters shown for every player
+    PLAYER_COUNTERS = ('goals', 'assists', 'times_subbed_out')
+
+    def __init__(self, db: Session, cache: Optional[StatisticsCache] = None,
+                 seasons: Optional[Iterable[int]] = None):
+        self.db = db
+        self.cache = cache
+        # Season ids the details cover, None rolls up every season
+        self.seasons = season_scope(seasons)
+
+    @timed
+    def team_details(self, team_id: int) -> Optional[Dict]:
+        """Standing and roster with player counters, None for an unknown team"""
+        team = self.db.get(Team, team_id)
+        if team is None:
+            return None
+
+        standings = StandingsCalculator(self.db, materialized=True, cache=self.cache,
+                                        seasons=self.seasons).calculate_standings()
+        position, standing = next(
+            ((position, row) for position, row in enumerate(standings, 1) if row['team_name'] == team.name),
+            (None, None)
+        )
+
+        counters = self._player_counters()
+        roster = (
+            self.db.query(Player, *[counters.c[name] for name in self.PLAYER_COUNTERS])
+            .outerjoin(counters, counters.c.player_id == Player.id)
+            .filter(Player.team_id == team_id)
+            .order_by(Player.number, Player.id)
+            .all()
+        )
+
+        return {
+            'id': team.id,
+            'name': team.name,
+            'position': position,
+            'standing': standing,
+            'players': [self._player_summary(player, *totals) for player, *totals in roster]
+        }
+
+    @timed
+    def player_details(self, player_id: int, limit: int = 10, offset: int = 0) -> Optional[Dict]:
+        """Counters, cards and a page of goals of one player, None for an unknown player"""
+        counters = self._player_counters(player_id)
+        row = (
+            self.db.query(Player, Team.name, *[counters.c[name] for name in self.PLAYER_COUNTERS])
+            .outerjoin(counters, counters.c.player_id == Player.id)
+            .outerjoin(Team, Team.id == Player.team_id)
+            .filter(Player.id == player_id)
+            .first()
+        )
+        if row is None:
+            return None
+        player, team_name, *totals = row
+
+        cards = self.db.query(
+            func.coalesce(func.sum(case((Card.is_red, 0), else_=1)), 0),
+            func.coalesce(func.sum(case((Card.is_red, 1), else_=0)), 0)
+        ).filter(Card.player_id == player_id)
+        if self.seasons is not None:
+            cards = cards.filter(in_seasons(Card.match_id, self.seasons))
+        yellow_cards, red_cards = cards.one()
+
+        details = self._player_summary(player, *totals)
+        details.update({
+            'team': {'id': player.team_id, 'name': team_name},
+            'yellow_cards': yellow_cards,
+            'red_cards': red_cards,
+            'goal_list': self._goal_list(player, limit, offset)
+        })
+        return details
+
+    def _goal_list(self, player: Player, limit: int, offset: int) -> List[Dict]:
+        """Goals of the player in match order, with the opposing team"""
+        home_team = aliased(Team)
+        away_team = aliased(Team)
+        query = (
+            self.db.query(Goal, Match.date, Match.venue, Match.home_team_id, home_team.name, away_team.name)
+            .join(Match, Goal.match_id == Match.id)
+            .join(home_team, Match.home_team_id == home_team.id)
+            .join(away_team, Match.away_team_id == away_team.id)
+            .filter(Goal.scorer_id == player.id)
+        )
+        if self.seasons is not None:
+            query = query.filter(Match.season_id.in_(self.seasons))
+        rows = (
+            query
+            .order_by(Match.date, Goal.match_id, Goal.seconds, Goal.id)
+            .limit(limit)
+            .offset(offset)
+            .all()
+        )
+        return [
+            {
+                'match_id': goal.match_id,
+                'date': date.strftime('%Y-%m-%d'),
+                'venue': venue,
+                'opponent': away_name if home_team_id == player.team_id else home_name,
+                'seconds': goal.seconds,
+                'is_penalty': goal.is_penalty
+            }
+            for goal, date, venue, home_team_id, home_name, away_name in rows
+        ]
+
+    def _player_counters(self, player_id: Optional[int] = None):
+        """Materialized player counters over the season scope, optionally for one player"""
+        query = scoped_counters(PlayerStat, PlayerStat.player_id, self.PLAYER_COUNTERS, self.seasons)
+        if player_id is not None:
+            query = query.where(query.selected_columns.player_id == player_id)
+        return query.subquery()
+
+    @staticmethod
+    def _player_summary(player: Player, goals: Optional[int], assists: Optional[int],
+                        times_subbed_out: Optional[int]) -> Dict:
+        return {
+            'id': player.id,
+            'number': player.number,
+            'name': player.full_name(),
+            'role': SubstitutionCalculator.ROLE_NAMES.get(player.role, player.role),
+            'goals': goals or 0,
+            'assists': assists or 0,
+            'times_subbed_out': times_subbed_out or 0
+        }
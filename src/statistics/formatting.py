@@ -0,0 +1,8 @@
+from typing import Optional
+
+
+def format_event_time(seconds: Optional[int]) -> str:
+    """Render seconds from kick-off as "mm:ss", the way match reports write it"""
+    if seconds is None:
+        return ''
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
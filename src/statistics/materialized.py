@@ -0,0 +1,154 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, insert, select, union_all
+from sqlalchemy.orm import Session
+from src.database.data_version import bump_data_version
+from src.database.models import (Match, Goal, Substitution, TeamStanding, TeamTotal, PlayerStat, PlayerTotal,
+                                 PopularGoal, MatchTimeline)
+from src.profiling import timed
+from src.statistics.standings_calculator import StandingsCalculator
+from src.statistics.timeline import build_timelines, delete_timelines
+
+PLAYER_COUNTERS = ('goals', 'assists', 'times_subbed_out')
+
+# Keeps IN (...) lists well below SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+
+@timed
+def apply_match_statistics(db: Session, match_ids: Optional[List[int]], sign: int = 1) -> None:
+    """
+    Add (sign=1) or subtract (sign=-1) the given matches to the materialized
+    statistics. Runs inside the caller's transaction, so it must be called
+    after the match rows are flushed and before they are deleted.
+    match_ids=None applies every match in the database.
+    """
+    db.flush()
+    if match_ids is None:
+        _apply_chunk(db, None, sign)
+    else:
+        match_ids = list(match_ids)
+        for start in range(0, len(match_ids), CHUNK_SIZE):
+            _apply_chunk(db, match_ids[start:start + CHUNK_SIZE], sign)
+
+    # Invalidates every cached statistics result
+    bump_data_version(db)
+
+
+def rebuild_statistics(db: Session) -> None:
+    """Regenerate the materialized statistics from scratch"""
+    for model in (TeamStanding, TeamTotal, PlayerStat, PlayerTotal, PopularGoal, MatchTimeline):
+        db.execute(delete(model))
+    apply_match_statistics(db, None)
+    db.commit()
+
+
+def _apply_chunk(db: Session, match_ids: Optional[List[int]], sign: int) -> None:
+    if match_ids is not None and not match_ids:
+        return
+
+    # Team standings per season
+    team_deltas = {
+        (row.season_id, row.team_id): {name: getattr(row, name) for name in StandingsCalculator.COUNTERS}
+        for row in db.execute(StandingsCalculator(db).team_totals_query(match_ids, by_season=True))
+    }
+    _add_counters(db, TeamStanding, (TeamStanding.season_id, TeamStanding.team_id), team_deltas,
+                  StandingsCalculator.COUNTERS, sign)
+    _add_counters(db, TeamTotal, (TeamTotal.team_id,), _roll_up(team_deltas, StandingsCalculator.COUNTERS),
+                  StandingsCalculator.COUNTERS, sign)
+
+    # Player goal, assist and substitution counters per season
+    player_deltas = defaultdict(lambda: dict.fromkeys(PLAYER_COUNTERS, 0))
+    goals = (_limit(select(Match.season_id, Goal.scorer_id, func.count())
+                    .join(Match, Goal.match_id == Match.id)
+                    .where(Goal.scorer_id.isnot(None)), Goal.match_id, match_ids)
+             .group_by(Match.season_id, Goal.scorer_id))
+    for season_id, player_id, count in db.execute(goals):
+        player_deltas[season_id, player_id]['goals'] = count
+
+    assist_ids = union_all(
+        _limit(select(Goal.match_id, Goal.assist1_id.label('player_id')), Goal.match_id, match_ids),
+        _limit(select(Goal.match_id, Goal.assist2_id.label('player_id')), Goal.match_id, match_ids)
+    ).subquery()
+    assists = (select(Match.season_id, assist_ids.c.player_id, func.count())
+               .join(Match, assist_ids.c.match_id == Match.id)
+               .where(assist_ids.c.player_id.isnot(None))
+               .group_by(Match.season_id, assist_ids.c.player_id))
+    for season_id, player_id, count in db.execute(assists):
+        player_deltas[season_id, player_id]['assists'] = count
+
+    subs = (_limit(select(Match.season_id, Substitution.player_out_id, func.count())
+                   .join(Match, Substitution.match_id == Match.id)
+                   .where(Substitution.player_out_id.isnot(None)), Substitution.match_id, match_ids)
+            .group_by(Match.season_id, Substitution.player_out_id))
+    for season_id, player_id, count in db.execute(subs):
+        player_deltas[season_id, player_id]['times_subbed_out'] = count
+
+    _add_counters(db, PlayerStat, (PlayerStat.season_id, PlayerStat.player_id), player_deltas,
+                  PLAYER_COUNTERS, sign)
+    _add_counters(db, PlayerTotal, (PlayerTotal.player_id,), _roll_up(player_deltas, PLAYER_COUNTERS),
+                  PLAYER_COUNTERS, sign)
+
+    # Goals ranked by attendance
+    if sign > 0:
+        db.execute(insert(PopularGoal).from_select(
+            ['goal_id', 'match_id', 'season_id', 'spectators'],
+            _limit(select(Goal.id, Goal.match_id, Match.season_id, Match.spectators)
+                   .join(Match, Goal.match_id == Match.id),
+                   Goal.match_id, match_ids)
+        ))
+    else:
+        db.execute(_limit(delete(PopularGoal), PopularGoal.match_id, match_ids))
+
+    # Per-match event streams with the game state after every event
+    if sign > 0:
+        build_timelines(db, match_ids)
+    else:
+        delete_timelines(db, match_ids)
+
+    db.flush()
+
+
+def _limit(statement, column, match_ids: Optional[List[int]]):
+    return statement if match_ids is None else statement.where(column.in_(match_ids))
+
+
+def _roll_up(deltas: Dict, counters) -> Dict:
+    """Deltas keyed by (season_id, entity id) summed per entity, for the all-seasons rollup"""
+    totals = defaultdict(lambda: dict.fromkeys(counters, 0))
+    for (_, entity_id), delta in deltas.items():
+        for name in counters:
+            totals[(entity_id,)][name] += delta[name] or 0
+    return totals
+
+
+def _add_counters(db: Session, model, key_columns: Tuple, deltas: Dict, counters, sign: int) -> None:
+    """
+    Add deltas keyed by (season_id, entity id), or by (entity id,) for a
+    rollup, to existing counter rows, creating and dropping rows as needed
+    """
+    if not deltas:
+        return
+    entity_column = key_columns[-1]
+    key_names = tuple(column.key for column in key_columns)
+    entity_ids = list({key[-1] for key in deltas})
+    season_ids = list({key[0] for key in deltas}) if len(key_columns) > 1 else None
+    existing = {}
+    for start in range(0, len(entity_ids), CHUNK_SIZE):
+        rows = db.query(model).filter(entity_column.in_(entity_ids[start:start + CHUNK_SIZE]))
+        if season_ids is not None:
+            rows = rows.filter(key_columns[0].in_(season_ids))
+        for row in rows:
+            existing[tuple(getattr(row, name) for name in key_names)] = row
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            row = model(**dict(zip(key_names, key)), **dict.fromkeys(counters, 0))
+            db.add(row)
+        for name in counters:
+            setattr(row, name, getattr(row, name) + sign * (delta[name] or 0))
+        if not any(getattr(row, name) for name in counters):
+            if row in db.new:
+                db.expunge(row)
+            else:
+                db.delete(row)
@@ -1,17 +1,34 @@
-from sqlalchemy.orm import Session
-from typing import List, Dict
-from src.database.models import Match, Goal, Player
+from sqlalchemy.orm import Session, joinedload
+from typing import Iterable, List, Dict, Optional
+from src.database.models import Match, Goal, Player, Team, PopularGoal
+from src.statistics.cache import StatisticsCache, cached
+from src.statistics.seasons import season_scope
+from src.statistics.formatting import format_event_time
+from src.profiling import timed
 
 
 class PopularGoalsCalculator:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, materialized: bool = False, cache: Optional[StatisticsCache] = None,
+                 seasons: Optional[Iterable[int]] = None):
         self.db = db
+        self.materialized = materialized
+        self.cache = cache
+        # Season ids the ranking covers, None rolls up every season
+        self.seasons = season_scope(seasons)
 
-    def calculate_popular_goals(self, limit: int = 10) -> List[Dict]:
-        """Calculate most-watched goals with venue and scorer information"""
+    @timed
+    @cached
+    def calculate_popular_goals(self, limit: int = 10, after_seconds: Optional[int] = None,
+                                offset: int = 0) -> List[Dict]:
+        """
+        Calculate most-watched goals with venue and scorer information.
+        after_seconds keeps only goals scored later than that many seconds into the match.
+        """
+        if self.materialized:
+            return self._calculate_popular_goals_materialized(limit, after_seconds, offset)
 
         # Query to get goals with match attendance and venue info
-        popular_goals = (
+        query = (
             self.db.query(
                 Goal,
                 Match.spectators,
@@ -20,10 +37,13 @@ class PopularGoalsCalculator:
             )
             .join(Match, Goal.match_id == Match.id)
             .join(Player, Goal.scorer_id == Player.id)
-            .order_by(Match.spectators.desc())
-            .limit(limit)
-            .all()
+            .options(joinedload(Player.team))  # Team names without a query per row
         )
+        if after_seconds is not None:
+            query = query.filter(Goal.seconds > after_seconds)
+        if self.seasons is not None:
+            query = query.filter(Match.season_id.in_(self.seasons))
+        popular_goals = query.order_by(Match.spectators.desc(), Goal.id).limit(limit).offset(offset).all()
 
         goals = []
         for goal, spectators, venue, scorer in popular_goals:
@@ -32,12 +52,42 @@ class PopularGoalsCalculator:
                 'team_name': scorer.team.name,
                 'spectators': spectators,
                 'venue': venue,
-                'time': goal.time,
+                'seconds': goal.seconds,
                 'is_penalty': goal.is_penalty
             })
 
         return goals
 
+    def _calculate_popular_goals_materialized(self, limit: int, after_seconds: Optional[int],
+                                              offset: int) -> List[Dict]:
+        """Walk the popular_goals ranking and fetch details for the shown rows only"""
+        query = (
+            self.db.query(Goal, Match.spectators, Match.venue, Player, Team.name)
+            .join(PopularGoal, PopularGoal.goal_id == Goal.id)
+            .join(Match, Goal.match_id == Match.id)
+            .join(Player, Goal.scorer_id == Player.id)
+            .join(Team, Player.team_id == Team.id)
+        )
+        if after_seconds is not None:
+            query = query.filter(Goal.seconds > after_seconds)
+        if self.seasons is not None:
+            # Walks the (season_id, spectators) index of the partition
+            query = query.filter(PopularGoal.season_id.in_(self.seasons))
+        rows = (query.order_by(PopularGoal.spectators.desc(), PopularGoal.goal_id)
+                .limit(limit).offset(offset).all())
+
+        return [
+            {
+                'scorer_name': scorer.full_name(),
+                'team_name': team_name,
+                'spectators': spectators,
+                'venue': venue,
+                'seconds': goal.seconds,
+                'is_penalty': goal.is_penalty
+            }
+            for goal, spectators, venue, scorer, team_name in rows
+        ]
+
     def format_popular_goals_table(self, limit: int = 10) -> str:
         """Format popular goals as a pretty table string"""
         goals = self.calculate_popular_goals(limit)
@@ -54,7 +104,7 @@ class PopularGoalsCalculator:
                    f"{goal['scorer_name']:<25} "
                    f"{goal['team_name']:<20} "
                    f"{goal['venue']:<25} "
-                   f"{goal['time']:>5} "
+                   f"{format_event_time(goal['seconds']):>5} "
                    f"{goal_type:<8} "
                    f"{goal['spectators']:>10,}")
             rows.append(row)
@@ -1,94 +1,86 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict
-from src.database.models import Player, Team, Goal
+from sqlalchemy import Select, func, literal, or_, select, union_all
+from typing import Iterable, List, Dict, Optional
+from src.database.models import Player, Team, Goal, PlayerStat
+from src.statistics.cache import StatisticsCache, cached
+from src.statistics.seasons import season_scope, scoped_counters, limit_to_seasons
+from src.profiling import timed
 
 
 class TopScorersCalculator:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, materialized: bool = False, cache: Optional[StatisticsCache] = None,
+                 seasons: Optional[Iterable[int]] = None):
         self.db = db
+        self.materialized = materialized
+        self.cache = cache
+        # Season ids the ranking covers, None rolls up every season
+        self.seasons = season_scope(seasons)
 
-    def calculate_top_scorers(self, limit: int = 10) -> List[Dict]:
+    @timed
+    @cached
+    def calculate_top_scorers(self, limit: int = 10, offset: int = 0) -> List[Dict]:
         """
         Calculate top scorers including both goals and assists.
         Returns them sorted by goals (primary) and assists (secondary).
+        Goals and assists are counted, ranked, joined with team names and
+        paginated in one statement. Rank follows RANK() semantics, so players
+        with equal goals and assists share a position.
         """
-        # Calculate goals and assists separately to avoid incorrect counting
-        scorers = {}
+        if self.materialized:
+            counters = scoped_counters(PlayerStat, PlayerStat.player_id, ('goals', 'assists'), self.seasons).subquery()
+            totals = select(counters).where(or_(counters.c.goals > 0, counters.c.assists > 0)).subquery()
+        else:
+            totals = self._totals_query().subquery()
 
-        # Count goals
-        goals_query = (
-            self.db.query(
-                Player,
-                func.count(Goal.id).label('goals')
+        rank = func.rank().over(order_by=(totals.c.goals.desc(), totals.c.assists.desc()))
+        rows = self.db.execute(
+            select(
+                Player.first_name,
+                Player.last_name,
+                Team.name.label('team_name'),
+                totals.c.goals,
+                totals.c.assists,
+                rank.label('rank')
             )
-            .outerjoin(Goal, Goal.scorer_id == Player.id)
-            .group_by(Player.id)
-        )
+            .select_from(totals)
+            .join(Player, Player.id == totals.c.player_id)
+            .outerjoin(Team, Team.id == Player.team_id)
+            .order_by(totals.c.goals.desc(), totals.c.assists.desc(), totals.c.player_id)
+            .limit(limit)
+            .offset(offset)
+        ).all()
 
-        # Initialize scorers dict with goals
-        for player, goals in goals_query:
-            if goals > 0:  # Only include players who scored or assisted
-                scorers[player.id] = {
-                    'player_name': player.full_name(),
-                    'team_name': player.team.name,
-                    'goals': goals,
-                    'assists': 0
-                }
+        return [
+            {
+                'rank': row.rank,
+                'player_name': f"{row.first_name} {row.last_name}",
+                'team_name': row.team_name,
+                'goals': row.goals,
+                'assists': row.assists
+            }
+            for row in rows
+        ]
 
-        # Count first assists
-        first_assists_query = (
-            self.db.query(
-                Player,
-                func.count(Goal.id).label('assists')
+    def _totals_query(self) -> Select:
+        """Goals and assists per player from a single pass over the goals table"""
+        contributions = union_all(*[
+            limit_to_seasons(query, Goal.match_id, self.seasons) for query in (
+                select(Goal.scorer_id.label('player_id'), literal(1).label('goals'), literal(0).label('assists'))
+                .where(Goal.scorer_id.isnot(None)),
+                select(Goal.assist1_id, literal(0), literal(1)).where(Goal.assist1_id.isnot(None)),
+                select(Goal.assist2_id, literal(0), literal(1)).where(Goal.assist2_id.isnot(None))
             )
-            .outerjoin(Goal, Goal.assist1_id == Player.id)
-            .group_by(Player.id)
-        )
+        ]).subquery()
 
-        # Add first assists to total
-        for player, assists in first_assists_query:
-            if assists > 0:
-                if player.id not in scorers:
-                    scorers[player.id] = {
-                        'player_name': player.full_name(),
-                        'team_name': player.team.name,
-                        'goals': 0,
-                        'assists': 0
-                    }
-                scorers[player.id]['assists'] += assists
-
-        # Count second assists
-        second_assists_query = (
-            self.db.query(
-                Player,
-                func.count(Goal.id).label('assists')
+        return (
+            select(
+                contributions.c.player_id,
+                func.sum(contributions.c.goals).label('goals'),
+                func.sum(contributions.c.assists).label('assists')
             )
-            .outerjoin(Goal, Goal.assist2_id == Player.id)
-            .group_by(Player.id)
+            .group_by(contributions.c.player_id)
         )
 
-        # Add second assists to total
-        for player, assists in second_assists_query:
-            if assists > 0:
-                if player.id not in scorers:
-                    scorers[player.id] = {
-                        'player_name': player.full_name(),
-                        'team_name': player.team.name,
-                        'goals': 0,
-                        'assists': 0
-                    }
-                scorers[player.id]['assists'] += assists
-
-        # Convert to list and sort
-        sorted_scorers = sorted(
-            scorers.values(),
-            key=lambda x: (x['goals'], x['assists']),
-            reverse=True
-        )
-
-        return sorted_scorers[:limit]
-
     def format_top_scorers_table(self, limit: int = 10) -> str:
         """Format top scorers as a pretty table string"""
         scorers = self.calculate_top_scorers(limit)
@@ -99,8 +91,8 @@ class TopScorersCalculator:
 
         # Format each row
         rows = []
-        for i, scorer in enumerate(scorers, 1):
-            row = (f"{i:>3} "
+        for scorer in scorers:
+            row = (f"{scorer['rank']:>3} "
                    f"{scorer['player_name']:<25} "
                    f"{scorer['team_name']:<20} "
                    f"{scorer['goals']:>5} "
@@ -0,0 +1,93 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session
+from src.database.models import Competition, Season, Match, TeamStanding, TeamTotal, PlayerStat, PlayerTotal
+
+# Materialized counters summed over every season, read when a calculator is not scoped
+ROLLUPS = {TeamStanding: TeamTotal, PlayerStat: PlayerTotal}
+
+
+def season_scope(seasons: Optional[Iterable[int]]) -> Optional[Tuple[int, ...]]:
+    """Normalized, hashable season scope of a calculator; None covers every season"""
+    return tuple(sorted(set(seasons))) if seasons is not None else None
+
+
+def resolve_seasons(db: Session, season_id: Optional[int] = None,
+                    competition_id: Optional[int] = None) -> Optional[Tuple[int, ...]]:
+    """
+    Season ids selected by a season and/or a competition.
+    None when neither is given, an empty tuple when nothing matches.
+    """
+    if season_id is None and competition_id is None:
+        return None
+    query = select(Season.id)
+    if season_id is not None:
+        query = query.where(Season.id == season_id)
+    if competition_id is not None:
+        query = query.where(Season.competition_id == competition_id)
+    return season_scope(db.execute(query).scalars())
+
+
+def in_seasons(match_id_column, seasons: Optional[Sequence[int]]):
+    """Condition keeping rows of matches in the given seasons, None when unscoped"""
+    if seasons is None:
+        return None
+    return match_id_column.in_(select(Match.id).where(Match.season_id.in_(seasons)))
+
+
+def limit_to_seasons(statement, match_id_column, seasons: Optional[Sequence[int]]):
+    condition = in_seasons(match_id_column, seasons)
+    return statement if condition is None else statement.where(condition)
+
+
+def scoped_counters(model, entity_column, counters: Sequence[str], seasons: Optional[Sequence[int]]) -> Select:
+    """
+    Per-entity counters of a materialized statistics table over the given seasons.
+    A single season is read straight from its partition and seasons=None
+    (every season) from the table's rollup; several seasons are summed per
+    entity. Filter the result through its selected_columns.
+    """
+    if seasons is None:
+        rollup = ROLLUPS[model]
+        return select(getattr(rollup, entity_column.key), *[getattr(rollup, name) for name in counters])
+    if len(seasons) == 1:
+        return (select(entity_column, *[getattr(model, name) for name in counters])
+                .where(model.season_id == seasons[0]))
+    return (select(entity_column, *[func.sum(getattr(model, name)).label(name) for name in counters])
+            .where(model.season_id.in_(seasons))
+            .group_by(entity_column))
+
+
+class SeasonCalculator:
+    """Competitions and their seasons with the extent of each partition"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list_seasons(self) -> List[Dict]:
+        rows = self.db.execute(
+            select(
+                Season.id,
+                Season.name,
+                Competition.id.label('competition_id'),
+                Competition.name.label('competition'),
+                func.count(Match.id).label('matches'),
+                func.min(Match.date).label('first_match'),
+                func.max(Match.date).label('last_match')
+            )
+            .join(Competition, Competition.id == Season.competition_id)
+            .outerjoin(Match, Match.season_id == Season.id)
+            .group_by(Season.id)
+            .order_by(Competition.name, Season.name)
+        ).all()
+        return [
+            {
+                'id': row.id,
+                'name': row.name,
+                'competition': {'id': row.competition_id, 'name': row.competition},
+                'matches': row.matches,
+                'first_match': row.first_match.strftime('%Y-%m-%d') if row.first_match else None,
+                'last_match': row.last_match.strftime('%Y-%m-%d') if row.last_match else None
+            }
+            for row in rows
+        ]
@@ -1,95 +1,171 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Dict, Tuple
-from src.database.models import Team, Match, Goal
+from sqlalchemy import Select, CompoundSelect, and_, case, func, select, union_all
+from typing import Iterable, List, Dict, Optional
+from src.database.models import Team, Match, Goal, TeamStanding
+from src.statistics.cache import StatisticsCache, cached
+from src.statistics.seasons import season_scope, scoped_counters
+from src.profiling import timed
 
 
 class StandingsCalculator:
-    def __init__(self, db: Session):
-        self.db = db
-
-    def calculate_standings(self) -> List[Dict]:
-        """Calculate tournament standings for all teams"""
-        teams = self.db.query(Team).all()
-        standings = []
-
-        for team in teams:
-            # Get all matches for this team
-            home_matches = self.db.query(Match).filter(Match.home_team_id == team.id).all()
-            away_matches = self.db.query(Match).filter(Match.away_team_id == team.id).all()
-
-            stats = {
-                'team_name': team.name,
-                'points': 0,
-                'matches_played': len(home_matches) + len(away_matches),
-                'wins_regular': 0,
-                'wins_overtime': 0,
-                'losses_regular': 0,
-                'losses_overtime': 0,
-                'goals_for': 0,
-                'goals_against': 0
-            }
-
-            # Process home matches
-            for match in home_matches:
-                home_goals = len([g for g in match.goals if g.team_id == team.id])
-                away_goals = len([g for g in match.goals if g.team_id != team.id])
-
-                stats['goals_for'] += home_goals
-                stats['goals_against'] += away_goals
-
-                self._update_match_stats(stats, home_goals, away_goals, match)
-
-            # Process away matches
-            for match in away_matches:
-                home_goals = len([g for g in match.goals if g.team_id != team.id])
-                away_goals = len([g for g in match.goals if g.team_id == team.id])
+    # Points awarded per result type
+    POINTS_WIN_REGULAR = 5
+    POINTS_WIN_OVERTIME = 3
+    POINTS_LOSS_OVERTIME = 2
+    POINTS_LOSS_REGULAR = 1
 
-                stats['goals_for'] += away_goals
-                stats['goals_against'] += home_goals
+    # Any goal after 60:00 means the game went to overtime
+    REGULAR_TIME_SECONDS = 3600
 
-                self._update_match_stats(stats, away_goals, home_goals, match)
+    # Counters kept per team, in the order they are stored
+    COUNTERS = ('matches_played', 'wins_regular', 'wins_overtime', 'losses_regular',
+                'losses_overtime', 'goals_for', 'goals_against')
 
-            # Calculate goal difference
-            stats['goal_difference'] = stats['goals_for'] - stats['goals_against']
-
-            standings.append(stats)
-
-        # Sort standings by points (descending), then goal difference
-        return sorted(standings,
-                      key=lambda x: (x['points'], x['goal_difference']),
-                      reverse=True)
-
-    def _update_match_stats(self, stats: Dict, team_goals: int, opponent_goals: int, match: Match):
-        """Update match statistics based on goals scored"""
-        is_overtime = self._is_overtime_game(match)
+    def __init__(self, db: Session, materialized: bool = False, cache: Optional[StatisticsCache] = None,
+                 seasons: Optional[Iterable[int]] = None):
+        self.db = db
+        self.materialized = materialized
+        self.cache = cache
+        # Season ids the table covers, None rolls up every season
+        self.seasons = season_scope(seasons)
 
-        if is_overtime:
-            if team_goals > opponent_goals:
-                stats['wins_overtime'] += 1
-                stats['points'] += 3
-            else:
-                stats['losses_overtime'] += 1
-                stats['points'] += 2
-        else:
-            if team_goals > opponent_goals:
-                stats['wins_regular'] += 1
-                stats['points'] += 5
-            else:
-                stats['losses_regular'] += 1
-                stats['points'] += 1
-
-    def _is_overtime_game(self, match: Match) -> bool:
+    @timed
+    @cached
+    def calculate_standings(self) -> List[Dict]:
         """
-        Determine if a game went to overtime by checking if any goals
-        were scored after 60:00 (regular time)
+        Calculate tournament standings for all teams.
+        The whole table is aggregated in a single grouped query, so the
+        number of statements does not grow with the number of teams.
+        With materialized=True the counters are read from team_standings.
+        A season-scoped table only lists the teams that played in it.
         """
-        for goal in match.goals:
-            minutes, seconds = map(int, goal.time.split(':'))
-            total_seconds = minutes * 60 + seconds
-            if total_seconds > 3600:  # 60:00 in seconds
-                return True
-        return False
+        if self.materialized:
+            aggregated = scoped_counters(TeamStanding, TeamStanding.team_id, self.COUNTERS, self.seasons).subquery()
+        else:
+            aggregated = self.team_totals_query().subquery()
+
+        matches_played = func.coalesce(aggregated.c.matches_played, 0)
+        wins_regular = func.coalesce(aggregated.c.wins_regular, 0)
+        wins_overtime = func.coalesce(aggregated.c.wins_overtime, 0)
+        losses_regular = func.coalesce(aggregated.c.losses_regular, 0)
+        losses_overtime = func.coalesce(aggregated.c.losses_overtime, 0)
+        goals_for = func.coalesce(aggregated.c.goals_for, 0)
+        goals_against = func.coalesce(aggregated.c.goals_against, 0)
+        points = (wins_regular * self.POINTS_WIN_REGULAR
+                  + wins_overtime * self.POINTS_WIN_OVERTIME
+                  + losses_overtime * self.POINTS_LOSS_OVERTIME
+                  + losses_regular * self.POINTS_LOSS_REGULAR)
+        goal_difference = goals_for - goals_against
+
+        rows = self.db.execute(
+            select(
+                Team.name,
+                points.label('points'),
+                matches_played.label('matches_played'),
+                wins_regular.label('wins_regular'),
+                wins_overtime.label('wins_overtime'),
+                losses_regular.label('losses_regular'),
+                losses_overtime.label('losses_overtime'),
+                goals_for.label('goals_for'),
+                goals_against.label('goals_against'),
+                goal_difference.label('goal_difference')
+            )
+            .join(aggregated, aggregated.c.team_id == Team.id, isouter=self.seasons is None)
+            # Sort standings by points (descending), then goal difference
+            .order_by(points.desc(), goal_difference.desc(), Team.id)
+        ).all()
+
+        return [
+            {
+                'team_name': row.name,
+                'points': row.points,
+                'matches_played': row.matches_played,
+                'wins_regular': row.wins_regular,
+                'wins_overtime': row.wins_overtime,
+                'losses_regular': row.losses_regular,
+                'losses_overtime': row.losses_overtime,
+                'goals_for': row.goals_for,
+                'goals_against': row.goals_against,
+                'goal_difference': row.goal_difference
+            }
+            for row in rows
+        ]
+
+    def team_totals_query(self, match_ids: Optional[List[int]] = None, by_season: bool = False) -> Select:
+        """Per-team counters, optionally limited to the given matches and split by season"""
+        team_rows = self._team_results_query(match_ids).subquery()
+        keys = [team_rows.c.season_id, team_rows.c.team_id] if by_season else [team_rows.c.team_id]
+
+        win_regular = self._count_if(and_(team_rows.c.goals_for > team_rows.c.goals_against,
+                                          team_rows.c.is_overtime == 0))
+        win_overtime = self._count_if(and_(team_rows.c.goals_for > team_rows.c.goals_against,
+                                           team_rows.c.is_overtime == 1))
+        loss_overtime = self._count_if(and_(team_rows.c.goals_for <= team_rows.c.goals_against,
+                                            team_rows.c.is_overtime == 1))
+        loss_regular = self._count_if(and_(team_rows.c.goals_for <= team_rows.c.goals_against,
+                                           team_rows.c.is_overtime == 0))
+
+        return (
+            select(
+                *keys,
+                func.count().label('matches_played'),
+                win_regular.label('wins_regular'),
+                win_overtime.label('wins_overtime'),
+                loss_regular.label('losses_regular'),
+                loss_overtime.label('losses_overtime'),
+                func.sum(team_rows.c.goals_for).label('goals_for'),
+                func.sum(team_rows.c.goals_against).label('goals_against')
+            )
+            .group_by(*keys)
+        )
+
+    def _match_results_query(self, match_ids: Optional[List[int]] = None) -> Select:
+        """One row per match with goal counts for each side and an overtime flag"""
+        query = (
+            select(
+                Match.id.label('match_id'),
+                Match.season_id,
+                Match.home_team_id,
+                Match.away_team_id,
+                func.count(Goal.id).label('total_goals'),
+                self._count_if(Goal.team_id == Match.home_team_id).label('home_goals'),
+                self._count_if(Goal.team_id == Match.away_team_id).label('away_goals'),
+                case(
+                    (func.max(Goal.seconds) > self.REGULAR_TIME_SECONDS, 1),
+                    else_=0
+                ).label('is_overtime')
+            )
+            .outerjoin(Goal, Goal.match_id == Match.id)
+            .group_by(Match.id)
+        )
+        if match_ids is not None:
+            query = query.where(Match.id.in_(match_ids))
+        if self.seasons is not None:
+            query = query.where(Match.season_id.in_(self.seasons))
+        return query
+
+    def _team_results_query(self, match_ids: Optional[List[int]] = None) -> CompoundSelect:
+        """Each match seen from the home side and from the away side"""
+        matches = self._match_results_query(match_ids).subquery()
+        home = select(
+            matches.c.season_id,
+            matches.c.home_team_id.label('team_id'),
+            matches.c.home_goals.label('goals_for'),
+            (matches.c.total_goals - matches.c.home_goals).label('goals_against'),
+            matches.c.is_overtime
+        )
+        away = select(
+            matches.c.season_id,
+            matches.c.away_team_id.label('team_id'),
+            matches.c.away_goals.label('goals_for'),
+            (matches.c.total_goals - matches.c.away_goals).label('goals_against'),
+            matches.c.is_overtime
+        )
+        return union_all(home, away)
+
+    @staticmethod
+    def _count_if(condition):
+        return func.sum(case((condition, 1), else_=0))
 
     def format_standings_table(self) -> str:
         """Format standings as a pretty table string"""
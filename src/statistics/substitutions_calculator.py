@@ -1,49 +1,78 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List, Dict
-from src.database.models import Player, Team, Substitution
+from typing import Iterable, List, Dict, Optional
+from src.database.models import Player, Team, Substitution, PlayerStat
+from src.statistics.cache import StatisticsCache, cached
+from src.statistics.seasons import season_scope, scoped_counters, in_seasons
+from src.profiling import timed
 
 
 class SubstitutionCalculator:
-    def __init__(self, db: Session):
+    # Full names of the role codes used in rosters
+    ROLE_NAMES = {
+        'V': 'Goalkeeper',
+        'A': 'Defender',
+        'U': 'Forward'
+    }
+
+    def __init__(self, db: Session, materialized: bool = False, cache: Optional[StatisticsCache] = None,
+                 seasons: Optional[Iterable[int]] = None):
         self.db = db
+        self.materialized = materialized
+        self.cache = cache
+        # Season ids the statistics cover, None rolls up every season
+        self.seasons = season_scope(seasons)
 
-    def calculate_substitution_stats(self, limit: int = 10) -> List[Dict]:
+    @timed
+    @cached
+    def calculate_substitution_stats(self, limit: int = 10, offset: int = 0) -> List[Dict]:
         """Calculate statistics for players who get substituted out the most"""
+        if self.materialized:
+            return self._calculate_substitution_stats_materialized(limit, offset)
+
+        # Count per player first, then join names; the counts subquery keeps the
+        # GROUP BY free of player and team columns, as server databases require
+        query = (
+            self.db.query(Substitution.player_out_id.label('player_id'),
+                          func.count(Substitution.id).label('times_subbed_out'))
+            .filter(Substitution.player_out_id.isnot(None))
+            .group_by(Substitution.player_out_id)
+        )
+        if self.seasons is not None:
+            query = query.filter(in_seasons(Substitution.match_id, self.seasons))
+        return self._player_page(query.subquery(), limit, offset)
 
-        # Query to get players and their substitution counts
-        sub_stats = (
-            self.db.query(
-                Player,
-                func.count(Substitution.id).label('times_subbed_out')
-            )
-            .join(Substitution, Substitution.player_out_id == Player.id)
-            .group_by(Player.id)
-            .having(func.count(Substitution.id) > 0)  # Only include players who were substituted
-            .order_by(func.count(Substitution.id).desc())
+    def _calculate_substitution_stats_materialized(self, limit: int, offset: int) -> List[Dict]:
+        """Read the most substituted players from the player_stats counters"""
+        counters = scoped_counters(PlayerStat, PlayerStat.player_id, ('times_subbed_out',), self.seasons).subquery()
+        return self._player_page(counters, limit, offset)
+
+    def _player_page(self, counters, limit: int, offset: int) -> List[Dict]:
+        """Players with a positive times_subbed_out in `counters`, most substituted first"""
+        rows = (
+            self.db.query(Player, Team.name, counters.c.times_subbed_out)
+            .join(counters, counters.c.player_id == Player.id)
+            .join(Team, Player.team_id == Team.id)
+            .filter(counters.c.times_subbed_out > 0)
+            .order_by(counters.c.times_subbed_out.desc(), counters.c.player_id)
             .limit(limit)
+            .offset(offset)
             .all()
         )
 
-        stats = []
-        for player, sub_count in sub_stats:
-            stats.append({
+        return [
+            {
                 'player_name': player.full_name(),
-                'team_name': player.team.name,
+                'team_name': team_name,
                 'role': self._get_role_name(player.role),
                 'times_subbed_out': sub_count
-            })
-
-        return stats
+            }
+            for player, team_name, sub_count in rows
+        ]
 
     def _get_role_name(self, role_code: str) -> str:
         """Convert role code to full name"""
-        roles = {
-            'V': 'Goalkeeper',
-            'A': 'Defender',
-            'U': 'Forward'
-        }
-        return roles.get(role_code, role_code)
+        return self.ROLE_NAMES.get(role_code, role_code)
 
     def format_substitution_stats_table(self, limit: int = 10) -> str:
         """Format substitution statistics as a pretty table string"""
@@ -0,0 +1,267 @@
+import json
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, List, Optional
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from src.database.models import Team, Player, Match, Goal, Card, Substitution, MatchTimeline, MatchPlayer
+from src.statistics.formatting import format_event_time
+from src.profiling import timed
+
+# Keeps IN (...) lists well below SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+GOAL = 'goal'
+CARD = 'card'
+SUBSTITUTION = 'substitution'
+# Events in the same second are applied in this order
+EVENT_ORDER = {GOAL: 0, CARD: 1, SUBSTITUTION: 2}
+# Events between two stored copies of the full game state
+CHECKPOINT_INTERVAL = 16
+
+
+def build_timeline(home_team_id: int, away_team_id: int, rosters: Dict[int, List[int]],
+                   goals: List, cards: List, substitutions: List) -> Dict:
+    """
+    Order the events of one match into a timeline payload.
+
+    The feed has no line-ups, so a team's starters are its match roster minus the
+    players it brought on during the match. Events are stored as
+        [GOAL, side, scorer_id, [assist ids], is_penalty]
+        [CARD, side, player_id, is_red]
+        [SUBSTITUTION, side, player_out_id, player_in_id]
+    with side 0 for the home team. Each event is the change it makes to the
+    game state; the full state, [home goals, away goals, home on field, away
+    on field, sent off], is only stored after every CHECKPOINT_INTERVAL events.
+    """
+    sides = {home_team_id: 0, away_team_id: 1}
+    entering = {sub.player_in_id for sub in substitutions}
+    lineups = [sorted(player_id for player_id in rosters.get(team_id, ()) if player_id not in entering)
+               for team_id in (home_team_id, away_team_id)]
+
+    events = (
+        [(goal.seconds, GOAL, goal.id,
+          [GOAL, sides.get(goal.team_id), goal.scorer_id,
+           [player_id for player_id in (goal.assist1_id, goal.assist2_id) if player_id is not None],
+           bool(goal.is_penalty)])
+         for goal in goals]
+        + [(card.seconds, CARD, card.id, [CARD, sides.get(card.team_id), card.player_id, bool(card.is_red)])
+           for card in cards]
+        + [(sub.seconds, SUBSTITUTION, sub.id,
+            [SUBSTITUTION, sides.get(sub.team_id), sub.player_out_id, sub.player_in_id])
+           for sub in substitutions]
+    )
+    events.sort(key=lambda event: (event[0] or 0, EVENT_ORDER[event[1]], event[2]))
+
+    state = GameState(lineups)
+    checkpoints = []
+    for count, (_, _, _, event) in enumerate(events, 1):
+        state.apply(event)
+        if count % CHECKPOINT_INTERVAL == 0:
+            checkpoints.append(state.as_list())
+
+    return {
+        'teams': [home_team_id, away_team_id],
+        'lineups': lineups,
+        'seconds': [seconds or 0 for seconds, _, _, _ in events],
+        'events': [event for _, _, _, event in events],
+        'checkpoints': checkpoints
+    }
+
+
+class GameState:
+    """Score, players on the field and sent-off players, changed one event at a time"""
+
+    def __init__(self, lineups: List[List[int]], score: Optional[List[int]] = None,
+                 sent_off: Optional[List[int]] = None):
+        self.score = list(score or (0, 0))
+        self.on_field = [set(lineup) for lineup in lineups]
+        self.sent_off = list(sent_off or ())
+
+    @classmethod
+    def from_list(cls, stored: List) -> 'GameState':
+        home_goals, away_goals, home_on_field, away_on_field, sent_off = stored
+        return cls([home_on_field, away_on_field], [home_goals, away_goals], sent_off)
+
+    def apply(self, event: List) -> None:
+        kind, side = event[0], event[1]
+        if side is None:
+            return
+        if kind == GOAL:
+            self.score[side] += 1
+        elif kind == CARD and event[3]:
+            self.on_field[side].discard(event[2])
+            self.sent_off.append(event[2])
+        elif kind == SUBSTITUTION:
+            self.on_field[side].discard(event[2])
+            if event[3] is not None:
+                self.on_field[side].add(event[3])
+
+    def as_list(self) -> List:
+        return [self.score[0], self.score[1], sorted(self.on_field[0]), sorted(self.on_field[1]),
+                list(self.sent_off)]
+
+
+def state_after(payload: Dict, count: int) -> GameState:
+    """State once the first `count` events have happened, replayed from the nearest checkpoint"""
+    checkpoint = min(count // CHECKPOINT_INTERVAL, len(payload['checkpoints']))
+    if checkpoint:
+        state = GameState.from_list(payload['checkpoints'][checkpoint - 1])
+    else:
+        state = GameState(payload['lineups'])
+    for event in payload['events'][checkpoint * CHECKPOINT_INTERVAL:count]:
+        state.apply(event)
+    return state
+
+
+def build_timelines(db: Session, match_ids: Optional[List[int]]) -> None:
+    """Store the timeline of the given matches, match_ids=None builds every match"""
+    if match_ids is None:
+        match_ids = db.execute(select(Match.id)).scalars().all()
+    match_ids = list(match_ids)
+    for start in range(0, len(match_ids), CHUNK_SIZE):
+        _build_chunk(db, match_ids[start:start + CHUNK_SIZE])
+
+
+def delete_timelines(db: Session, match_ids: Optional[List[int]]) -> None:
+    statement = delete(MatchTimeline)
+    if match_ids is None:
+        db.execute(statement)
+        return
+    match_ids = list(match_ids)
+    for start in range(0, len(match_ids), CHUNK_SIZE):
+        db.execute(statement.where(MatchTimeline.match_id.in_(match_ids[start:start + CHUNK_SIZE])))
+
+
+def _build_chunk(db: Session, match_ids: List[int]) -> None:
+    if not match_ids:
+        return
+    matches = db.execute(
+        select(Match.id, Match.home_team_id, Match.away_team_id).where(Match.id.in_(match_ids))
+    ).all()
+    events = {}
+    for model in (Goal, Card, Substitution):
+        grouped = defaultdict(list)
+        # Plain rows, no ORM objects are created during ingest
+        for row in db.execute(select(*model.__table__.columns).where(model.match_id.in_(match_ids))):
+            grouped[row.match_id].append(row)
+        events[model] = grouped
+
+    # The roster of each match as it was ingested, not the team's current one
+    rosters = defaultdict(lambda: defaultdict(list))
+    for match_id, team_id, player_id in db.execute(
+            select(MatchPlayer.match_id, MatchPlayer.team_id, MatchPlayer.player_id)
+            .where(MatchPlayer.match_id.in_(match_ids))):
+        rosters[match_id][team_id].append(player_id)
+
+    rows = [
+        {
+            'match_id': match.id,
+            'payload': json.dumps(
+                build_timeline(match.home_team_id, match.away_team_id, rosters[match.id], events[Goal][match.id],
+                               events[Card][match.id], events[Substitution][match.id]),
+                separators=(',', ':')
+            )
+        }
+        for match in matches
+    ]
+    db.execute(insert(MatchTimeline), rows)
+
+
+class TimelineCalculator:
+    """Event stream and game state of one match, read from the stored timelines"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @timed
+    def timeline(self, match_id: int) -> Optional[Dict]:
+        """Every event with the score after it, None for an unknown match"""
+        payload = self._payload(match_id)
+        if payload is None:
+            return None
+        names = self._names(payload)
+        state = GameState(payload['lineups'])
+        events = []
+        for index, event in enumerate(payload['events']):
+            state.apply(event)
+            events.append(dict(self._event(payload, index, names),
+                               score={'home': state.score[0], 'away': state.score[1]}))
+        return {**self._teams(match_id, payload, names), 'events': events}
+
+    @timed
+    def state_at(self, match_id: int, seconds: int) -> Optional[Dict]:
+        """
+        Score, players on the field and sent-off players once every event up to
+        and including `seconds` has happened. A binary search over the stored
+        event times, then a replay from the checkpoint before it; None for an
+        unknown match.
+        """
+        payload = self._payload(match_id)
+        if payload is None:
+            return None
+        names = self._names(payload)
+        index = bisect_right(payload['seconds'], seconds)
+        home_goals, away_goals, home_on_field, away_on_field, sent_off = state_after(payload, index).as_list()
+        return {
+            **self._teams(match_id, payload, names),
+            'seconds': seconds,
+            'time': format_event_time(seconds),
+            'score': {'home': home_goals, 'away': away_goals},
+            'on_field': {'home': [names['players'].get(player_id) for player_id in home_on_field],
+                         'away': [names['players'].get(player_id) for player_id in away_on_field]},
+            'sent_off': [names['players'].get(player_id) for player_id in sent_off],
+            'last_event': self._event(payload, index - 1, names) if index else None
+        }
+
+    def _payload(self, match_id: int) -> Optional[Dict]:
+        payload = self.db.execute(
+            select(MatchTimeline.payload).where(MatchTimeline.match_id == match_id)
+        ).scalar()
+        return json.loads(payload) if payload is not None else None
+
+    def _names(self, payload: Dict) -> Dict[str, Dict[int, str]]:
+        """Team and player names for every id in the timeline, two queries"""
+        player_ids = set(payload['lineups'][0]) | set(payload['lineups'][1])
+        for event in payload['events']:
+            player_ids.add(event[2])
+            if event[0] == GOAL:
+                player_ids.update(event[3])
+            elif event[0] == SUBSTITUTION:
+                player_ids.add(event[3])
+        player_ids.discard(None)
+        players = {
+            player_id: f"{first_name} {last_name}"
+            for player_id, first_name, last_name in self.db.execute(
+                select(Player.id, Player.first_name, Player.last_name).where(Player.id.in_(player_ids)))
+        }
+        teams = dict(self.db.execute(select(Team.id, Team.name).where(Team.id.in_(payload['teams']))).all())
+        return {'players': players, 'teams': teams}
+
+    @staticmethod
+    def _teams(match_id: int, payload: Dict, names: Dict) -> Dict:
+        return {
+            'match_id': match_id,
+            'home_team': names['teams'].get(payload['teams'][0]),
+            'away_team': names['teams'].get(payload['teams'][1])
+        }
+
+    @staticmethod
+    def _event(payload: Dict, index: int, names: Dict) -> Dict:
+        event = payload['events'][index]
+        kind, side = event[0], event[1]
+        row = {
+            'seconds': payload['seconds'][index],
+            'time': format_event_time(payload['seconds'][index]),
+            'type': kind,
+            'team': names['teams'].get(payload['teams'][side]) if side is not None else None
+        }
+        players = names['players']
+        if kind == GOAL:
+            row.update(player=players.get(event[2]), assists=[players.get(player_id) for player_id in event[3]],
+                       is_penalty=event[4])
+        elif kind == CARD:
+            row.update(player=players.get(event[2]), is_red=event[3])
+        else:
+            row.update(player_out=players.get(event[2]), player_in=players.get(event[3]))
+        return row
@@ -0,0 +1,53 @@
+import json
+from src.parsers.json_parser import MatchParser
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def test_scorers_are_paginated_with_field_selection(client, loaded_db):
+    everyone = client.get('/api/scorers?limit=100').get_json()['data']
+    page = client.get('/api/scorers?limit=2&offset=1&fields=player_name,goals').get_json()
+
+    assert (page['limit'], page['offset']) == (2, 1)
+    assert page['data'] == [{'player_name': row['player_name'], 'goals': row['goals']} for row in everyone[1:3]]
+
+
+def test_invalid_parameters_are_rejected(client, loaded_db):
+    assert client.get('/api/standings?limit=0').status_code == 400
+    assert client.get('/api/standings?offset=x').status_code == 400
+    response = client.get('/api/standings?fields=team_name,nope')
+    assert response.status_code == 400
+    assert 'nope' in response.get_json()['message']
+    assert client.get('/api/teams/999').status_code == 404
+
+
+def test_unchanged_data_revalidates_with_304(client, loaded_db, tmp_path):
+    first = client.get('/api/standings')
+    etag = first.headers['ETag']
+    assert first.headers['Last-Modified']
+
+    assert client.get('/api/standings', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/standings',
+                      headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+
+    # New data changes the validator
+    extra = json.loads(json.dumps(SAMPLE_MATCHES['futbols0.json']))
+    extra['Spele']['Laiks'] = '2024/05/01'
+    (tmp_path / 'extra.json').write_text(json.dumps(extra), encoding='utf-8')
+    MatchParser(loaded_db).parse_file(str(tmp_path / 'extra.json'))
+
+    refreshed = client.get('/api/standings', headers={'If-None-Match': etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers['ETag'] != etag
+
+
+def test_team_and_player_drill_down(client, loaded_db):
+    standings = client.get('/api/standings').get_json()['data']
+    team_id = 1
+    team = client.get(f'/api/teams/{team_id}').get_json()['data']
+    assert team['standing'] == standings[team['position'] - 1]
+
+    scorer = max(team['players'], key=lambda player: player['goals'])
+    player = client.get(f"/api/players/{scorer['id']}?fields=name,goals,goal_list").get_json()['data']
+    assert player['name'] == scorer['name']
+    assert len(player['goal_list']) == player['goals'] > 0
+    assert all(goal['opponent'] != team['name'] for goal in player['goal_list'])
@@ -0,0 +1,105 @@
+import json
+import pytest
+from src.parsers.bulk_parser import BulkMatchParser
+from src.parsers.json_parser import MatchParser, read_match_file
+from src.statistics.scorers_calculator import TopScorersCalculator
+from src.statistics.standings_calculator import StandingsCalculator
+from src.tests.helpers import dump_tables
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 100])
+def test_bulk_ingestion_is_row_identical(db, other_db, data_dir, batch_size):
+    # A re-delivered match must be skipped by both modes
+    duplicate = data_dir / 'futbols9.json'
+    duplicate.write_text(json.dumps(SAMPLE_MATCHES['futbols1.json']), encoding='utf-8')
+    file_paths = [str(path) for path in sorted(data_dir.glob('*.json'))]
+
+    parser = MatchParser(db)
+    for file_path in file_paths:
+        parser.parse_file(file_path)
+    summary = BulkMatchParser(other_db, batch_size).parse_files(file_paths)
+
+    assert (summary['stored'], summary['duplicates']) == (len(SAMPLE_MATCHES), 1)
+    assert [entry['file'] for entry in summary['duplicate_matches']] == ['futbols9.json']
+    assert dump_tables(other_db) == dump_tables(db)
+
+
+def test_bulk_ingestion_skips_broken_file(db, data_dir):
+    broken = json.loads(json.dumps(SAMPLE_MATCHES['futbols0.json']))
+    broken['Spele']['Komanda'][0]['Nosaukums'] = 'Broken'
+    del broken['Spele']['VT']
+    (data_dir / 'futbols05.json').write_text(json.dumps(broken), encoding='utf-8')
+
+    summary = BulkMatchParser(db).parse_files(str(path) for path in sorted(data_dir.glob('*.json')))
+    tables = dump_tables(db)
+
+    assert (summary['stored'], summary['errors']) == (len(SAMPLE_MATCHES), 1)
+    assert summary['failed_files'] == [str(data_dir / 'futbols05.json')]
+    assert [failure['file'] for failure in summary['failures']] == ['futbols05.json']
+    assert 'Broken' not in [row.name for row in tables['teams']]
+    assert [row.id for row in tables['players']] == list(range(1, 19))
+
+
+def test_failed_match_leaves_nothing_behind(db, data_dir):
+    broken = json.loads(json.dumps(SAMPLE_MATCHES['futbols0.json']))
+    del broken['Spele']['VT']
+    (data_dir / 'futbols0.json').write_text(json.dumps(broken), encoding='utf-8')
+
+    with pytest.raises(KeyError):
+        MatchParser(db).parse_file(str(data_dir / 'futbols0.json'))
+
+    assert all(rows == [] for rows in dump_tables(db).values())
+
+
+def test_failed_match_is_stored_on_retry(db, data_dir):
+    file_path = str(data_dir / 'futbols0.json')
+    broken = json.loads(json.dumps(SAMPLE_MATCHES['futbols0.json']))
+    del broken['Spele']['VT']
+    (data_dir / 'futbols0.json').write_text(json.dumps(broken), encoding='utf-8')
+    assert MatchParser(db).parse_files([file_path])['failed_files'] == [file_path]
+
+    # The corrected file must not be taken for a duplicate of a half-stored match
+    (data_dir / 'futbols0.json').write_text(json.dumps(SAMPLE_MATCHES['futbols0.json']), encoding='utf-8')
+    summary = MatchParser(db).parse_files([file_path])
+
+    assert (summary['stored'], summary['duplicates']) == (1, 0)
+    assert len(dump_tables(db)['goals']) == 3
+
+
+def test_second_card_is_red(loaded_db):
+    cards = dump_tables(loaded_db)['cards']
+
+    assert [card.is_red for card in cards] == [False, True, False]
+
+
+def test_batch_precheck_skips_stored_matches_in_one_query(loaded_db, data_dir, statement_counter):
+    file_paths = [str(path) for path in sorted(data_dir.glob('*.json'))]
+
+    summary = MatchParser(loaded_db).parse_files(file_paths)
+
+    assert (summary['stored'], summary['duplicates']) == (0, len(SAMPLE_MATCHES))
+    assert [entry['file'] for entry in summary['duplicate_matches']] == sorted(SAMPLE_MATCHES)
+    # Only the fingerprint lookup ran, no team or event was touched
+    assert len(statement_counter) == 1 and 'fingerprint' in statement_counter[0]
+
+
+def test_flush_restages_batch_after_another_writer(db, other_db, data_dir):
+    file_paths = [str(path) for path in sorted(data_dir.glob('*.json'))]
+    parser = BulkMatchParser(db)
+    for file_path in file_paths:
+        parser.add_match(read_match_file(file_path))
+
+    # Another writer stores one of the staged matches after the lookups were loaded
+    MatchParser(db).parse_file(file_paths[-1])
+    assert parser.flush() == len(file_paths) - 1
+
+    MatchParser(other_db).parse_files(file_paths)
+    for session in (db, other_db):
+        session.expire_all()
+
+    def statistics(session):
+        return (sorted(StandingsCalculator(session).calculate_standings(), key=lambda row: row['team_name']),
+                sorted(map(sorted, (row.items() for row in TopScorersCalculator(session).calculate_top_scorers(100)))))
+
+    assert statistics(db) == statistics(other_db)
@@ -0,0 +1,47 @@
+import json
+from src.interface import app as app_module
+from src.parsers.json_parser import MatchParser
+from src.statistics.cache import StatisticsCache
+from src.statistics.scorers_calculator import TopScorersCalculator
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def test_lru_eviction_and_counters():
+    cache = StatisticsCache(max_entries=2)
+    cache.get_or_compute('a', lambda: 1)
+    cache.get_or_compute('b', lambda: 2)
+    assert cache.get_or_compute('a', lambda: None) == 1
+    cache.get_or_compute('c', lambda: 3)  # Evicts 'b', the least recently used
+
+    assert cache.get_or_compute('b', lambda: 'recomputed') == 'recomputed'
+    assert cache.stats() == {'entries': 2, 'max_entries': 2, 'hits': 1, 'misses': 4, 'evictions': 2}
+
+
+def test_cached_calculator_is_invalidated_by_ingest(loaded_db, statement_counter, tmp_path):
+    cache = StatisticsCache()
+    calculator = TopScorersCalculator(loaded_db, cache=cache)
+    first = calculator.calculate_top_scorers()
+
+    statement_counter.clear()
+    assert calculator.calculate_top_scorers(limit=10) == first
+    assert len(statement_counter) == 1  # Only the data version lookup
+    assert cache.hits == 1
+
+    extra = json.loads(json.dumps(SAMPLE_MATCHES['futbols0.json']))
+    extra['Spele']['Laiks'] = '2024/05/01'
+    (tmp_path / 'extra.json').write_text(json.dumps(extra), encoding='utf-8')
+    MatchParser(loaded_db).parse_file(str(tmp_path / 'extra.json'))
+
+    assert calculator.calculate_top_scorers()[0]['goals'] == 3
+    assert calculator.calculate_top_scorers() != first
+    assert cache.misses == 2
+
+
+def test_index_page_is_served_from_cache(client, loaded_db):
+    first = client.get('/')
+    second = client.get('/')
+
+    assert first.status_code == 200
+    assert second.data == first.data
+    assert b'Daugava' in first.data
+    assert app_module.statistics_cache.stats()['hits'] == 1
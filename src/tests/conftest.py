@@ -0,0 +1,82 @@
+import json
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.database.models import Base
+from src.parsers.json_parser import MatchParser
+from src.statistics.cache import StatisticsCache
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+@pytest.fixture
+def engine():
+    """Isolated in-memory database so tests never touch src/football_stats.db"""
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def other_db():
+    """A second isolated database for comparing ingestion paths"""
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Directory of sample match files in the federation JSON format"""
+    directory = tmp_path / 'data'
+    directory.mkdir()
+    for filename, payload in SAMPLE_MATCHES.items():
+        (directory / filename).write_text(json.dumps(payload, ensure_ascii=False), encoding='utf-8')
+    return directory
+
+
+@pytest.fixture
+def loaded_db(db, data_dir):
+    """Session over a database populated from the sample files"""
+    parser = MatchParser(db)
+    for file_path in sorted(data_dir.glob('*.json')):
+        parser.parse_file(str(file_path))
+    return db
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    """Flask test client whose requests use the isolated test database"""
+    from src.interface import app as app_module
+    monkeypatch.setattr(app_module, 'ReadSessionLocal',
+                        sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    monkeypatch.setattr(app_module, 'statistics_cache', StatisticsCache())
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def statement_counter(engine):
+    """Record every SQL statement sent through the test engine"""
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', _record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', _record)
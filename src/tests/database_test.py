@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.elements import TextClause
+from src.database.database import create_db_engine
+from src.parsers.bulk_parser import BulkMatchParser
+from src.parsers.json_parser import MatchParser
+from src.statistics.details_calculator import DetailsCalculator
+from src.statistics.popular_goals_calculator import PopularGoalsCalculator
+from src.statistics.scorers_calculator import TopScorersCalculator
+from src.statistics.seasons import SeasonCalculator
+from src.statistics.standings_calculator import StandingsCalculator
+from src.statistics.substitutions_calculator import SubstitutionCalculator
+from src.statistics.timeline import TimelineCalculator
+
+
+def test_read_only_engine_shares_wal_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'stats.db'}"
+    writer = create_db_engine(url)
+    reader = create_db_engine(url, read_only=True)
+
+    with writer.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT x FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+
+    writer.dispose()
+    reader.dispose()
+
+
+@pytest.mark.parametrize('profile, synchronous, cache_size, temp_store', [
+    ('durable', 2, -2000, 0),
+    ('wal', 1, -2000, 0),
+    ('tuned', 1, -65536, 2),
+])
+def test_profiles_set_pragmas(tmp_path, profile, synchronous, cache_size, temp_store):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'stats.db'}", profile=profile)
+    with engine.connect() as conn:
+        pragma = lambda name: conn.execute(text(f"PRAGMA {name}")).scalar()
+        assert pragma('journal_mode') == 'wal'
+        assert (pragma('synchronous'), pragma('cache_size'), pragma('temp_store')) == \
+            (synchronous, cache_size, temp_store)
+    engine.dispose()
+
+    with pytest.raises(ValueError):
+        create_db_engine(f"sqlite:///{tmp_path / 'stats.db'}", profile='fast')
+
+
+def test_ingest_and_statistics_sql_is_portable(engine, db, data_dir):
+    """Every statement is built from SQLAlchemy constructs that also compile for PostgreSQL"""
+    server_dialect = postgresql.dialect()
+    raw_sql = []
+
+    @event.listens_for(engine, 'before_execute')
+    def compile_for_server(conn, clauseelement, multiparams, params, execution_options):
+        if isinstance(clauseelement, TextClause):
+            raw_sql.append(clauseelement.text)
+        else:
+            clauseelement.compile(dialect=server_dialect)
+
+    file_paths = [str(path) for path in sorted(data_dir.glob('*.json'))]
+    BulkMatchParser(db).parse_files(file_paths[:3])
+    MatchParser(db).parse_files(file_paths[3:])
+    for materialized in (False, True):
+        for seasons in (None, [1]):
+            StandingsCalculator(db, materialized, seasons=seasons).calculate_standings()
+            TopScorersCalculator(db, materialized, seasons=seasons).calculate_top_scorers()
+            SubstitutionCalculator(db, materialized, seasons=seasons).calculate_substitution_stats()
+            PopularGoalsCalculator(db, materialized, seasons=seasons).calculate_popular_goals()
+    DetailsCalculator(db).team_details(1)
+    DetailsCalculator(db).player_details(1)
+    TimelineCalculator(db).state_at(1, 600)
+    SeasonCalculator(db).list_seasons()
+
+    assert raw_sql == []
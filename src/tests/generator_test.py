@@ -0,0 +1,31 @@
+from src.benchmarks.generator import generate_matches, write_match_files
+from src.benchmarks.suite import compare_results
+from src.database.models import Match, Goal, Card
+from src.parsers.json_parser import MatchParser
+from src.statistics.standings_calculator import StandingsCalculator
+
+
+def test_generated_files_load_through_match_parser(db, tmp_path):
+    file_paths = write_match_files(str(tmp_path), 40, teams=5, seed=3)
+    parser = MatchParser(db)
+    for file_path in file_paths:
+        parser.parse_file(file_path)
+
+    assert db.query(Match).count() == 40
+    assert db.query(Goal).filter(Goal.seconds > StandingsCalculator.REGULAR_TIME_SECONDS).count() > 0
+    assert db.query(Card).filter(Card.is_red).count() > 0
+    standings = StandingsCalculator(db).calculate_standings()
+    assert sum(team['wins_overtime'] for team in standings) > 0
+
+
+def test_generator_is_deterministic():
+    assert list(generate_matches(25, seed=7)) == list(generate_matches(25, seed=7))
+    assert list(generate_matches(25, seed=7)) != list(generate_matches(25, seed=8))
+
+
+def test_compare_results_reports_slower_timings():
+    baseline = {'timings': {'standings_live': {'seconds': 1.0}, 'index_route_warm': {'seconds': 1.0}}}
+    current = {'timings': {'standings_live': {'seconds': 1.5}, 'index_route_warm': {'seconds': 1.1},
+                           'ingest_bulk': {'seconds': 9.0}}}
+
+    assert [row['name'] for row in compare_results(baseline, current, tolerance=0.25)] == ['standings_live']
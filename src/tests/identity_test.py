@@ -0,0 +1,67 @@
+import json
+from src.database.models import Player, Goal
+from src.parsers.bulk_parser import BulkMatchParser
+from src.parsers.json_parser import MatchParser
+from src.parsers.manifest import reload_data_dir
+from src.tests.helpers import dump_tables
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def write_match(data_dir, name, date, edit):
+    payload = json.loads(json.dumps(SAMPLE_MATCHES['futbols0.json']))
+    payload['Spele']['Laiks'] = date
+    edit(payload['Spele']['Komanda'][0])
+    (data_dir / name).write_text(json.dumps(payload), encoding='utf-8')
+    return str(data_dir / name)
+
+
+def roster_changes(home):
+    players = home['Speletaji']['Speletajs']
+    # A newcomer, a new player in an existing shirt and an event nobody on the roster can have made
+    players.append({'Nr': 14, 'Vards': 'Jauns', 'Uzvards': 'Speletajs', 'Loma': 'U'})
+    players[4] = {'Nr': 9, 'Vards': 'Cits', 'Uzvards': 'Devitais', 'Loma': 'U'}
+    home['Varti'] = {'VG': [{'Nr': 14, 'Laiks': '05:17', 'Sitiens': 'N', 'P': {'Nr': 9}},
+                            {'Nr': 99, 'Laiks': '15:17', 'Sitiens': 'N'}]}
+
+
+def test_later_roster_changes_are_stored_and_reported(db, other_db, data_dir):
+    write_match(data_dir, 'futbols9.json', '2024/06/01', roster_changes)
+    file_paths = [str(path) for path in sorted(data_dir.glob('*.json'))]
+
+    summary = MatchParser(db).parse_files(file_paths)
+    BulkMatchParser(other_db).parse_files(file_paths)
+    assert dump_tables(other_db) == dump_tables(db)
+
+    newcomer = db.query(Player).filter_by(first_name='Jauns').one()
+    new_nine = db.query(Player).filter_by(first_name='Cits').one()
+    goal = db.query(Goal).filter_by(time='05:17').one()
+    assert (goal.scorer_id, goal.assist1_id) == (newcomer.id, new_nine.id)
+    assert db.query(Goal).filter_by(time='15:17').one().scorer_id is None
+
+    assert summary['unresolved_players'] == [
+        {'file': 'futbols9.json', 'team': 'Daugava', 'number': 99, 'event': 'goal', 'time': '15:17'}
+    ]
+    assert summary['identity_conflicts'] == [
+        {'file': 'futbols9.json', 'kind': 'number_reassigned', 'team': 'Daugava', 'number': 9,
+         'player': 'Cits Devitais', 'previous': 'DKarlis DEgle'}
+    ]
+
+
+def test_reload_reports_identities(db, data_dir):
+    write_match(data_dir, 'futbols9.json', '2024/06/01', roster_changes)
+
+    summary = reload_data_dir(db, str(data_dir), workers=1)
+
+    assert [entry['number'] for entry in summary['unresolved_players']] == [99]
+    assert [entry['kind'] for entry in summary['identity_conflicts']] == ['number_reassigned']
+
+
+def test_known_identities_are_resolved_in_memory(loaded_db, data_dir, statement_counter):
+    file_paths = [write_match(data_dir, f"futbols{day}.json", f"2024/07/{day}", lambda home: None)
+                  for day in (10, 11, 12)]
+
+    MatchParser(loaded_db).parse_files(file_paths)
+
+    # One load of each map, no lookup per match
+    assert sum('FROM referees' in statement for statement in statement_counter) == 1
+    assert sum('FROM players' in statement for statement in statement_counter) == 1
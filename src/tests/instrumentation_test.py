@@ -0,0 +1,37 @@
+import pytest
+from src.database.instrumentation import track_queries, operation_stats
+from src.statistics.popular_goals_calculator import PopularGoalsCalculator
+from src.statistics.scorers_calculator import TopScorersCalculator
+from src.statistics.standings_calculator import StandingsCalculator
+from src.statistics.substitutions_calculator import SubstitutionCalculator
+from src.tests.helpers import reference_standings
+
+CALCULATIONS = [
+    ('standings', lambda db, m: StandingsCalculator(db, m).calculate_standings()),
+    ('scorers', lambda db, m: TopScorersCalculator(db, m).calculate_top_scorers()),
+    ('substitutions', lambda db, m: SubstitutionCalculator(db, m).calculate_substitution_stats()),
+    ('goals', lambda db, m: PopularGoalsCalculator(db, m).calculate_popular_goals()),
+]
+
+
+@pytest.mark.parametrize('materialized', [False, True])
+@pytest.mark.parametrize('name, calculate', CALCULATIONS)
+def test_calculators_issue_one_statement(loaded_db, engine, name, calculate, materialized):
+    loaded_db.expunge_all()  # No help from already loaded objects
+
+    with track_queries(f"test_{name}", engine) as stats:
+        calculate(loaded_db, materialized)
+
+    assert stats.count <= 1
+    assert stats.repeated_statements() == []
+
+
+def test_repeated_statements_are_flagged(loaded_db, engine):
+    loaded_db.expunge_all()
+
+    with track_queries('test_reference_loop', engine, n_plus_one_threshold=3) as stats:
+        reference_standings(loaded_db)
+
+    assert stats.count > 10
+    assert any('FROM matches' in statement for statement in stats.repeated_statements())
+    assert operation_stats()['test_reference_loop']['n_plus_one'] >= 1
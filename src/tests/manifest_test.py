@@ -0,0 +1,156 @@
+import json
+import os
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from src.database.data_version import get_data_version
+from src.database.database import migrate_db
+from src.database.models import Base, Match, IngestedFile
+from src.parsers.json_parser import MatchParser
+from src.parsers.manifest import reload_data_dir
+from src.parsers.pipeline import IngestCancelled, IngestProgress
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def reload(db, data_dir):
+    return reload_data_dir(db, str(data_dir), workers=1)
+
+
+def test_reload_only_ingests_changes(db, data_dir):
+    first = reload(db, data_dir)
+    assert (first['new'], first['stored']) == (len(SAMPLE_MATCHES), len(SAMPLE_MATCHES))
+
+    second = reload(db, data_dir)
+    assert (second['new'], second['changed'], second['unchanged'], second['stored']) == \
+        (0, 0, len(SAMPLE_MATCHES), 0)
+
+    # Same content with a new mtime is not re-ingested
+    touched = data_dir / 'futbols2.json'
+    os.utime(touched, (1, 1))
+    assert reload(db, data_dir)['stored'] == 0
+
+    # An edited file replaces its match
+    edited = json.loads(json.dumps(SAMPLE_MATCHES['futbols0.json']))
+    edited['Spele']['Skatitaji'] = 12345
+    (data_dir / 'futbols0.json').write_text(json.dumps(edited), encoding='utf-8')
+    summary = reload(db, data_dir)
+    assert (summary['changed'], summary['stored']) == (1, 1)
+    assert sorted(m.spectators for m in db.query(Match).all()) == [800, 3100, 6400, 12345]
+
+    # A deleted file removes its match
+    (data_dir / 'futbols1.json').unlink()
+    summary = reload(db, data_dir)
+    assert summary['deleted'] == 1
+    assert db.query(Match).filter_by(venue='Liepaja').count() == 0
+    assert sorted(entry.path for entry in db.query(IngestedFile).all()) == \
+        ['futbols0.json', 'futbols2.json', 'futbols3.json']
+
+
+def test_failed_file_is_retried(db, data_dir):
+    (data_dir / 'futbols9.json').write_text('{', encoding='utf-8')
+    assert reload(db, data_dir)['errors'] == 1
+    assert db.query(IngestedFile).filter_by(path='futbols9.json').count() == 0
+
+    (data_dir / 'futbols9.json').write_text('{}', encoding='utf-8')
+    assert reload(db, data_dir)['new'] == 1
+
+
+class CancelAfterFirstFile(IngestProgress):
+    def file_done(self, file_path, failed=False):
+        raise IngestCancelled("cancelled")
+
+
+def test_interrupted_reload_is_retried(db, data_dir):
+    with pytest.raises(IngestCancelled):
+        reload_data_dir(db, str(data_dir), workers=1, progress=CancelAfterFirstFile())
+
+    # Only files whose matches were committed are in the manifest
+    recorded = {entry.path for entry in db.query(IngestedFile).all()}
+    assert recorded == {match.source_file.path for match in db.query(Match).all()}
+    summary = reload(db, data_dir)
+    assert summary['new'] == len(SAMPLE_MATCHES) - len(recorded)
+    assert db.query(Match).count() == len(SAMPLE_MATCHES)
+
+    # An entry a crashed reload left without its state is ingested again
+    db.query(IngestedFile).filter_by(path='futbols0.json').update({'size': None, 'content_hash': None})
+    db.commit()
+    assert (reload(db, data_dir)['changed'], db.query(Match).count()) == (1, len(SAMPLE_MATCHES))
+
+
+def test_migrate_adds_missing_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE matches (id INTEGER PRIMARY KEY, date DATETIME, venue VARCHAR)"))
+
+    migrate_db(engine)
+
+    columns = {column['name'] for column in inspect(engine).get_columns('matches')}
+    assert {'spectators', 'home_team_id', 'source_file_id'} <= columns
+    engine.dispose()
+
+
+def test_migrate_leaves_current_database_alone(loaded_db, engine):
+    version = get_data_version(loaded_db)
+    loaded_db.commit()
+
+    assert migrate_db(engine) == {'columns_added': [], 'indexes_created': [], 'indexes_skipped': [],
+                                  'indexes_dropped': [], 'statistics_rebuilt': False}
+    assert get_data_version(loaded_db) == version
+
+
+def test_migrate_adds_missing_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE goals (id INTEGER PRIMARY KEY, match_id INTEGER, scorer_id INTEGER)"))
+        conn.execute(text("CREATE TABLE referees (id INTEGER PRIMARY KEY, first_name VARCHAR, last_name VARCHAR)"))
+        # Duplicates keep the unique index from being built but must not stop the migration
+        conn.execute(text("INSERT INTO referees (first_name, last_name) VALUES ('A', 'B'), ('A', 'B')"))
+
+    changes = migrate_db(engine)
+
+    assert changes['indexes_skipped'] == ['ux_referees_name']
+    inspector = inspect(engine)
+    assert {'ix_goals_match_id', 'ix_goals_scorer_id', 'ix_goals_assist1_id'} <= \
+        {index['name'] for index in inspector.get_indexes('goals')}
+    assert 'ux_referees_name' not in {index['name'] for index in inspector.get_indexes('referees')}
+    engine.dispose()
+
+
+def test_migrate_drops_duplicate_match_key_index(loaded_db, engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE UNIQUE INDEX ux_matches_natural_key "
+                          "ON matches (date, venue, home_team_id, away_team_id)"))
+
+    assert migrate_db(engine)['indexes_dropped'] == ['ux_matches_natural_key']
+    assert 'ux_matches_natural_key' not in {index['name'] for index in inspect(engine).get_indexes('matches')}
+
+
+def test_migrate_backfills_event_seconds(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE goals (id INTEGER PRIMARY KEY, match_id INTEGER, time VARCHAR)"))
+        conn.execute(text("INSERT INTO goals (match_id, time) VALUES (1, '05:30'), (1, '61:15'), (1, NULL)"))
+
+    migrate_db(engine)
+
+    with engine.connect() as conn:
+        seconds = conn.execute(text("SELECT seconds FROM goals ORDER BY id")).scalars().all()
+    assert seconds == [330, 3675, None]
+    engine.dispose()
+
+
+def test_migrate_backfills_match_fingerprints(tmp_path, data_dir):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    MatchParser(db).parse_files(str(path) for path in sorted(data_dir.glob('*.json')))
+    expected = sorted(fingerprint for fingerprint, in db.query(Match.fingerprint))
+    db.execute(text("UPDATE matches SET fingerprint = NULL"))
+    db.commit()
+    db.close()
+
+    migrate_db(engine)
+
+    with engine.connect() as conn:
+        assert sorted(conn.execute(text("SELECT fingerprint FROM matches")).scalars()) == expected
+    engine.dispose()
@@ -0,0 +1,72 @@
+import json
+from sqlalchemy import delete, select
+from src.database.database import migrate_db
+from src.database.models import TeamStanding, TeamTotal, PlayerStat, PlayerTotal, PopularGoal
+from src.parsers.manifest import reload_data_dir
+from src.statistics.materialized import rebuild_statistics
+from src.statistics.popular_goals_calculator import PopularGoalsCalculator
+from src.statistics.scorers_calculator import TopScorersCalculator
+from src.statistics.standings_calculator import StandingsCalculator
+from src.statistics.substitutions_calculator import SubstitutionCalculator
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def all_statistics(db, materialized):
+    return {
+        'standings': StandingsCalculator(db, materialized).calculate_standings(),
+        'scorers': TopScorersCalculator(db, materialized).calculate_top_scorers(limit=100),
+        'substitutions': SubstitutionCalculator(db, materialized).calculate_substitution_stats(limit=100),
+        'goals': PopularGoalsCalculator(db, materialized).calculate_popular_goals(limit=100)
+    }
+
+
+def materialized_rows(db):
+    return [db.execute(select(model.__table__).order_by(*model.__table__.primary_key.columns)).all()
+            for model in (TeamStanding, TeamTotal, PlayerStat, PlayerTotal, PopularGoal)]
+
+
+def test_materialized_statistics_match_live_queries(loaded_db):
+    stats = all_statistics(loaded_db, materialized=True)
+
+    assert stats == all_statistics(loaded_db, materialized=False)
+    assert stats['scorers'][0]['goals'] == 2
+    assert len(stats['goals']) == 9
+
+
+def test_materialized_statistics_follow_reloads(db, data_dir):
+    reload_data_dir(db, str(data_dir), workers=1)
+    edited = json.loads(json.dumps(SAMPLE_MATCHES['futbols3.json']))
+    del edited['Spele']['Komanda'][1]['Varti']
+    (data_dir / 'futbols3.json').write_text(json.dumps(edited), encoding='utf-8')
+    (data_dir / 'futbols1.json').unlink()
+
+    reload_data_dir(db, str(data_dir), workers=1)
+
+    assert all_statistics(db, materialized=True) == all_statistics(db, materialized=False)
+    incremental = materialized_rows(db)
+    rebuild_statistics(db)
+    assert materialized_rows(db) == incremental
+
+
+def test_unscoped_rankings_read_the_rollup(loaded_db, statement_counter):
+    TopScorersCalculator(loaded_db, materialized=True).calculate_top_scorers()
+    SubstitutionCalculator(loaded_db, materialized=True).calculate_substitution_stats()
+
+    assert not any('player_stats' in statement for statement in statement_counter)
+    assert sum('player_totals' in statement for statement in statement_counter) == 2
+
+
+def test_migrate_fills_new_rollups(loaded_db, engine):
+    expected = materialized_rows(loaded_db)
+    for model in (TeamTotal, PlayerTotal):
+        loaded_db.execute(delete(model))
+    loaded_db.commit()
+
+    assert migrate_db(engine, new_tables=['team_totals', 'player_totals'])['statistics_rebuilt']
+    assert materialized_rows(loaded_db) == expected
+
+
+def test_late_goal_filter_uses_event_seconds(loaded_db):
+    for materialized in (False, True):
+        late = PopularGoalsCalculator(loaded_db, materialized).calculate_popular_goals(limit=100, after_seconds=3600)
+        assert sorted(goal['seconds'] for goal in late) == [3675, 3899]
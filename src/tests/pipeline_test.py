@@ -0,0 +1,35 @@
+from src.parsers.json_parser import MatchParser
+from src.parsers.pipeline import load_match_files
+from src.tests.helpers import dump_tables
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def test_parallel_pipeline_matches_serial_load(db, other_db, data_dir):
+    (data_dir / 'futbols15.json').write_text('{"Spele": {"Laiks": "not a date"', encoding='utf-8')
+    file_paths = [str(path) for path in sorted(data_dir.glob('*.json'))]
+
+    parser = MatchParser(db)
+    for file_path in file_paths:
+        try:
+            parser.parse_file(file_path)
+        except Exception:
+            db.rollback()
+    summary = load_match_files(other_db, file_paths, workers=2, queue_depth=1, batch_size=2)
+
+    failures = summary.pop('failures')
+    assert summary == {'files': len(SAMPLE_MATCHES) + 1, 'stored': len(SAMPLE_MATCHES),
+                       'duplicates': 0, 'errors': 1, 'failed_files': [file_paths[2]], 'duplicate_matches': [],
+                       'unresolved_players': [], 'identity_conflicts': []}
+    assert [failure['file'] for failure in failures] == ['futbols15.json'] and failures[0]['error']
+    assert dump_tables(other_db) == dump_tables(db)
+
+
+def test_pipeline_skips_already_stored_matches(loaded_db, data_dir):
+    file_paths = [str(path) for path in sorted(data_dir.glob('*.json'))]
+
+    summary = load_match_files(loaded_db, file_paths, workers=1)
+
+    assert summary['stored'] == 0
+    assert summary['duplicates'] == len(SAMPLE_MATCHES)
+    assert summary['duplicate_matches'][0] == {'file': 'futbols0.json', 'date': '2024-04-01', 'venue': 'Riga',
+                                               'home_team': 'Daugava', 'away_team': 'Venta'}
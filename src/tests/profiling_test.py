@@ -0,0 +1,55 @@
+import pytest
+from src import profiling
+from src.interface import app as app_module
+from src.parsers.json_parser import MatchParser
+from src.statistics.standings_calculator import StandingsCalculator
+
+
+@pytest.fixture
+def metrics():
+    profiling.reset_metrics()
+    profiling.enable_metrics()
+    yield
+    profiling.disable_metrics()
+    profiling.reset_metrics()
+
+
+def test_nothing_is_recorded_while_disabled(loaded_db):
+    profiling.reset_metrics()
+    StandingsCalculator(loaded_db).calculate_standings()
+    with profiling.timer('block'):
+        pass
+    assert profiling.timing_stats() == {}
+
+
+def test_parser_and_calculator_timings(metrics, db, data_dir):
+    parser = MatchParser(db)
+    files = sorted(data_dir.glob('*.json'))
+    for file_path in files:
+        parser.parse_file(str(file_path))
+    StandingsCalculator(db).calculate_standings()
+
+    stats = profiling.timing_stats()
+    assert stats['MatchParser.parse_file']['count'] == len(files)
+    assert stats['MatchParser._process_goals']['count'] > 0
+    assert stats['StandingsCalculator.calculate_standings']['count'] == 1
+    assert sum(stats['MatchParser.parse_file']['buckets']) == len(files)
+
+
+def test_metrics_endpoint_exposes_route_histograms(metrics, client, loaded_db):
+    assert client.get('/api/standings').status_code == 200
+
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert 'football_stats_operation_seconds_count{operation="route.api_standings"} 1' in body
+    assert 'football_stats_operation_seconds_bucket{operation="route.api_standings",le="+Inf"} 1' in body
+    assert 'football_stats_cache_requests_total{result="miss"}' in body
+    assert 'football_stats_ingest_lag_seconds_bucket{le="+Inf"} 0' in body
+
+
+def test_profile_mode_returns_cprofile_report(client, loaded_db, monkeypatch):
+    assert client.get('/api/standings?profile=1').is_json
+    monkeypatch.setitem(app_module.app.config, 'PROFILE_REQUESTS', True)
+    response = client.get('/api/standings?profile=1')
+    assert response.mimetype == 'text/plain' and 'function calls' in response.get_data(as_text=True)
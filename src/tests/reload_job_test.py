@@ -0,0 +1,123 @@
+import os
+import time
+import pytest
+from sqlalchemy.orm import sessionmaker
+from src.database.database import create_db_engine
+from src.database.models import Base, Match, IngestedFile
+from src.parsers import reload_job
+from src.parsers.reload_job import ReloadJobManager, SUCCEEDED, CANCELLED
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def live_database(tmp_path):
+    path = str(tmp_path / 'live.db')
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return path, engine
+
+
+def match_count(engine):
+    db = sessionmaker(bind=engine)()
+    try:
+        return db.query(Match).count()
+    finally:
+        db.close()
+
+
+def test_reload_job_loads_live_database(tmp_path, data_dir):
+    path, engine = live_database(tmp_path)
+    manager = ReloadJobManager(path, str(data_dir), workers=1)
+
+    job = manager.submit()
+    assert job.wait(timeout=30)
+
+    assert job.state == SUCCEEDED
+    assert (job.files_total, job.files_done, job.errors) == (len(SAMPLE_MATCHES), len(SAMPLE_MATCHES), 0)
+    assert job.summary['published']
+    assert match_count(engine) == len(SAMPLE_MATCHES)
+
+    again = manager.submit()
+    assert again.wait(timeout=30)
+    assert not again.summary['published']
+    engine.dispose()
+
+
+def test_reload_job_loads_server_database_in_place(tmp_path, data_dir):
+    # A database given only by URL stands in for a server database
+    path, engine = live_database(tmp_path)
+    manager = ReloadJobManager(None, str(data_dir), workers=1, database_url=f"sqlite:///{path}")
+
+    job = manager.submit()
+    assert job.wait(timeout=30)
+
+    assert job.state == SUCCEEDED
+    assert job.summary['published']
+    assert match_count(engine) == len(SAMPLE_MATCHES)
+    engine.dispose()
+
+
+@pytest.mark.parametrize('by_url', [False, True])
+def test_cancelled_reload_keeps_stored_files(tmp_path, data_dir, monkeypatch, by_url):
+    path, engine = live_database(tmp_path)
+    manager = ReloadJobManager(None, str(data_dir), workers=1, database_url=f"sqlite:///{path}") if by_url \
+        else ReloadJobManager(path, str(data_dir), workers=1)
+    original = reload_job.reload_data_dir
+
+    def cancel_while_loading(db, data_dir, progress, **kwargs):
+        manager.cancel(progress.id)
+        return original(db, data_dir, progress=progress, **kwargs)
+
+    monkeypatch.setattr(reload_job, 'reload_data_dir', cancel_while_loading)
+    job = manager.submit()
+    assert job.wait(timeout=30)
+
+    # The file read before the cancel is stored and only it is in the manifest
+    assert job.state == CANCELLED
+    assert job.files_done == 1
+    assert match_count(engine) == 1
+    db = sessionmaker(bind=engine)()
+    assert db.query(IngestedFile).count() == 1
+    db.close()
+
+    monkeypatch.setattr(reload_job, 'reload_data_dir', original)
+    again = manager.submit()
+    assert again.wait(timeout=30)
+    assert (again.summary['new'], again.summary['unchanged']) == (len(SAMPLE_MATCHES) - 1, 1)
+    assert match_count(engine) == len(SAMPLE_MATCHES)
+    engine.dispose()
+
+
+def test_queued_reload_is_cancelled_without_running(tmp_path, data_dir):
+    path, engine = live_database(tmp_path)
+    manager = ReloadJobManager(path, str(data_dir), workers=1)
+
+    with manager.write_lock:
+        first = manager.submit()
+        while first.state == 'queued':
+            time.sleep(0.01)  # Picked up, now waiting for the lock
+        queued = manager.submit()
+        assert manager.submit() is queued
+        assert manager.cancel(queued.id).state == CANCELLED
+
+    assert first.wait(timeout=30) and first.state == SUCCEEDED
+    assert queued.files_done == 0
+    engine.dispose()
+
+
+def test_reload_endpoint_returns_job(client, tmp_path, data_dir, monkeypatch):
+    from src.interface import app as app_module
+    path, engine = live_database(tmp_path)
+    manager = ReloadJobManager(path, str(data_dir), workers=1)
+    monkeypatch.setattr(app_module, 'reload_jobs', manager)
+
+    response = client.post('/api/reload')
+    assert response.status_code == 202
+    job_id = response.get_json()['job']['id']
+    assert response.headers['Location'] == f"/api/jobs/{job_id}"
+
+    manager.get(job_id).wait(timeout=30)
+    status = client.get(f"/api/jobs/{job_id}").get_json()
+    assert (status['state'], status['files_done']) == (SUCCEEDED, len(SAMPLE_MATCHES))
+    assert client.post(f"/api/jobs/{job_id}/cancel").status_code == 409
+    assert client.get('/api/jobs/unknown').status_code == 404
+    engine.dispose()
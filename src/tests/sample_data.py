@@ -0,0 +1,78 @@
+"""Small hand-written season in the federation JSON format"""
+
+
+def _player(nr, first_name, last_name, role='U'):
+    return {'Nr': nr, 'Vards': first_name, 'Uzvards': last_name, 'Loma': role}
+
+
+def _team(name, prefix, goals=None, cards=None, subs=None):
+    """Build a 'Komanda' block with a fixed six-player roster"""
+    return {
+        'Nosaukums': name,
+        'Speletaji': {'Speletajs': [
+            _player(1, f"{prefix}Janis", f"{prefix}Berzins", 'V'),
+            _player(2, f"{prefix}Peteris", f"{prefix}Ozols", 'A'),
+            _player(3, f"{prefix}Andris", f"{prefix}Kalnins", 'A'),
+            _player(7, f"{prefix}Martins", f"{prefix}Liepa", 'U'),
+            _player(9, f"{prefix}Karlis", f"{prefix}Egle", 'U'),
+            _player(11, f"{prefix}Juris", f"{prefix}Priede", 'U'),
+        ]},
+        'Varti': goals if goals is not None else '',
+        'Sodi': cards if cards is not None else '',
+        'Mainas': subs if subs is not None else '',
+    }
+
+
+def _match(date, venue, spectators, home, away):
+    return {'Spele': {
+        'Laiks': date,
+        'Vieta': venue,
+        'Skatitaji': spectators,
+        'Komanda': [home, away],
+        'VT': {'Vards': 'Ivars', 'Uzvards': 'Tiesnesis'},
+        'T': [
+            {'Vards': 'Ilze', 'Uzvards': 'Linija'},
+            {'Vards': 'Aigars', 'Uzvards': 'Malejs'},
+        ],
+    }}
+
+
+SAMPLE_MATCHES = {
+    # Regular-time win with list-shaped goals, assists, cards and substitutions
+    'futbols0.json': _match('2024/04/01', 'Riga', 5200,
+                            _team('Daugava', 'D', goals={'VG': [
+                                {'Nr': 9, 'Laiks': '12:30', 'Sitiens': 'N', 'P': [{'Nr': 7}, {'Nr': 11}]},
+                                {'Nr': 7, 'Laiks': '45:10', 'Sitiens': 'J'},
+                            ]}, cards={'Sods': [
+                                {'Nr': 2, 'Laiks': '20:00'},
+                                {'Nr': 2, 'Laiks': '50:00'},
+                            ]}, subs={'Maina': [
+                                {'Nr1': 9, 'Nr2': 11, 'Laiks': '70:00'},
+                            ]}),
+                            _team('Venta', 'V', goals={'VG': {'Nr': 9, 'Laiks': '30:00', 'Sitiens': 'N',
+                                                               'P': {'Nr': 3}}})),
+    # Overtime game decided after 60:00, single-dict event blocks
+    'futbols1.json': _match('2024/04/08', 'Liepaja', 3100,
+                            _team('Venta', 'V', goals={'VG': [
+                                {'Nr': 11, 'Laiks': '10:00', 'Sitiens': 'N'},
+                                {'Nr': 9, 'Laiks': '61:15', 'Sitiens': 'N', 'P': {'Nr': 7}},
+                            ]}, subs={'Maina': {'Nr1': 7, 'Nr2': 2, 'Laiks': '55:00'}}),
+                            _team('Gauja', 'G', goals={'VG': {'Nr': 9, 'Laiks': '40:00', 'Sitiens': 'J'}},
+                                  cards={'Sods': {'Nr': 3, 'Laiks': '33:00'}})),
+    # Goalless draw in regular time counts as a regular loss for both sides
+    'futbols2.json': _match('2024/04/15', 'Cesis', 800,
+                            _team('Gauja', 'G'),
+                            _team('Daugava', 'D', subs={'Maina': [
+                                {'Nr1': 9, 'Nr2': 11, 'Laiks': '60:00'},
+                                {'Nr1': 7, 'Nr2': 3, 'Laiks': '65:00'},
+                            ]})),
+    # Away overtime win
+    'futbols3.json': _match('2024/04/22', 'Riga', 6400,
+                            _team('Daugava', 'D', goals={'VG': [
+                                {'Nr': 9, 'Laiks': '05:00', 'Sitiens': 'N', 'P': [{'Nr': 7}]},
+                            ]}),
+                            _team('Gauja', 'G', goals={'VG': [
+                                {'Nr': 7, 'Laiks': '50:00', 'Sitiens': 'N', 'P': {'Nr': 9}},
+                                {'Nr': 9, 'Laiks': '64:59', 'Sitiens': 'N'},
+                            ]})),
+}
@@ -0,0 +1,24 @@
+from src.statistics.scorers_calculator import TopScorersCalculator
+
+
+def test_top_scorers_single_statement_with_ranks(loaded_db, statement_counter):
+    scorers = TopScorersCalculator(loaded_db).calculate_top_scorers(limit=100)
+
+    assert len(statement_counter) == 1
+    assert scorers[0] == {'rank': 1, 'player_name': 'GKarlis GEgle', 'team_name': 'Gauja',
+                          'goals': 2, 'assists': 1}
+    # Players with equal goals and assists share a rank, the next rank skips
+    ranks = [(s['goals'], s['assists'], s['rank']) for s in scorers]
+    for position, (goals, assists, rank) in enumerate(ranks, 1):
+        first_equal = next(i for i, r in enumerate(ranks, 1) if r[:2] == (goals, assists))
+        assert rank == first_equal
+
+
+def test_top_scorers_pagination(loaded_db):
+    calculator = TopScorersCalculator(loaded_db)
+    everything = calculator.calculate_top_scorers(limit=100)
+
+    pages = [calculator.calculate_top_scorers(limit=3, offset=offset) for offset in range(0, len(everything), 3)]
+
+    assert [scorer for page in pages for scorer in page] == everything
+    assert calculator.calculate_top_scorers(limit=3, offset=len(everything)) == []
@@ -0,0 +1,122 @@
+import json
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from src.database.database import migrate_db
+from src.database.models import Base, Match, Season, Competition, TeamStanding
+from src.parsers.bulk_parser import BulkMatchParser
+from src.parsers.json_parser import MatchParser
+from src.statistics.details_calculator import DetailsCalculator
+from src.statistics.popular_goals_calculator import PopularGoalsCalculator
+from src.statistics.scorers_calculator import TopScorersCalculator
+from src.statistics.seasons import resolve_seasons
+from src.statistics.standings_calculator import StandingsCalculator
+from src.statistics.substitutions_calculator import SubstitutionCalculator
+from src.tests.helpers import dump_tables
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def add_season(data_dir, year, competition=None, files=('futbols0.json', 'futbols1.json')):
+    """Replay some sample matches in another season, optionally in another competition"""
+    for name in files:
+        payload = json.loads(json.dumps(SAMPLE_MATCHES[name]))
+        payload['Spele']['Laiks'] = payload['Spele']['Laiks'].replace('2024', str(year))
+        if competition is not None:
+            payload['Spele']['Turnirs'] = competition
+        (data_dir / f"{year}_{competition or 'liga'}_{name}").write_text(json.dumps(payload), encoding='utf-8')
+
+
+def all_statistics(db, materialized, seasons):
+    return {
+        'standings': StandingsCalculator(db, materialized, seasons=seasons).calculate_standings(),
+        'scorers': TopScorersCalculator(db, materialized, seasons=seasons).calculate_top_scorers(limit=100),
+        'substitutions': SubstitutionCalculator(db, materialized, seasons=seasons)
+        .calculate_substitution_stats(limit=100),
+        'goals': PopularGoalsCalculator(db, materialized, seasons=seasons).calculate_popular_goals(limit=100)
+    }
+
+
+def season_id(db, name, competition='Virslīga'):
+    return (db.query(Season.id).join(Competition)
+            .filter(Season.name == name, Competition.name == competition).first()[0])
+
+
+def test_matches_are_partitioned_by_season_and_competition(db, other_db, data_dir):
+    add_season(data_dir, 2025)
+    add_season(data_dir, 2025, competition='Kauss', files=('futbols2.json',))
+    file_paths = [str(path) for path in sorted(data_dir.glob('*.json'))]
+    MatchParser(db).parse_files(file_paths)
+    BulkMatchParser(other_db).parse_files(file_paths)
+    assert dump_tables(other_db) == dump_tables(db)
+
+    season_2024, season_2025 = season_id(db, '2024'), season_id(db, '2025')
+    cup = season_id(db, '2025', 'Kauss')
+    assert db.query(Match).filter(Match.season_id == season_2024).count() == len(SAMPLE_MATCHES)
+    assert db.query(Match).filter(Match.season_id == cup).count() == 1
+
+    for seasons in (None, (season_2024,), (season_2025,), (season_2024, cup)):
+        assert all_statistics(db, True, seasons) == all_statistics(db, False, seasons)
+
+    # Each season is counted on its own, the rollup adds them up
+    standings_2025 = StandingsCalculator(db, True, seasons=[season_2025]).calculate_standings()
+    assert sum(row['matches_played'] for row in standings_2025) == 4
+    assert {row['team_name'] for row in standings_2025} == {'Daugava', 'Venta', 'Gauja'}
+    rollup = {row['team_name']: row['matches_played'] for row in StandingsCalculator(db, True).calculate_standings()}
+    per_season = [{row['team_name']: row['matches_played']
+                   for row in StandingsCalculator(db, True, seasons=[season]).calculate_standings()}
+                  for season in (season_2024, season_2025, cup)]
+    assert rollup == {team: sum(season.get(team, 0) for season in per_season) for team in rollup}
+    assert resolve_seasons(db, competition_id=db.query(Competition.id).filter_by(name='Kauss').scalar()) == (cup,)
+
+    team_id = db.query(Match.home_team_id).filter(Match.season_id == cup).scalar()
+    assert DetailsCalculator(db, seasons=[cup]).team_details(team_id)['standing']['matches_played'] == 1
+
+
+def test_season_scoped_routes(client, loaded_db):
+    seasons = client.get('/api/seasons').get_json()['data']
+    assert [(season['name'], season['competition']['name'], season['matches']) for season in seasons] == \
+        [('2024', 'Virslīga', len(SAMPLE_MATCHES))]
+
+    scoped = client.get(f"/api/standings?season={seasons[0]['id']}").get_json()['data']
+    assert scoped == client.get('/api/standings').get_json()['data']
+    assert client.get('/api/scorers?season=999').status_code == 404
+    assert client.get(f"/api/scorers?competition={seasons[0]['competition']['id']}").status_code == 200
+
+
+def test_index_page_is_season_scoped(client, loaded_db, data_dir):
+    add_season(data_dir, 2025, files=('futbols1.json',))
+    MatchParser(loaded_db).parse_files([str(data_dir / '2025_liga_futbols1.json')])
+
+    assert b'Daugava' in client.get('/').data
+    scoped = client.get(f"/?season={season_id(loaded_db, '2025')}")
+    assert scoped.status_code == 200
+    assert b'Venta' in scoped.data and b'Daugava' not in scoped.data
+    assert client.get('/?season=999').status_code == 404
+
+
+def test_migrate_assigns_seasons_and_rebuilds_statistics(tmp_path, data_dir):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    MatchParser(db).parse_files(str(path) for path in sorted(data_dir.glob('*.json')))
+    expected = StandingsCalculator(db, materialized=True).calculate_standings()
+    db.close()
+    # Layout before seasons: one counter row per team and no season on matches
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE matches SET season_id = NULL"))
+        conn.execute(text("DELETE FROM seasons"))
+        conn.execute(text("DELETE FROM competitions"))
+        conn.execute(text("DROP TABLE team_standings"))
+        conn.execute(text("CREATE TABLE team_standings (team_id INTEGER PRIMARY KEY, matches_played INTEGER, "
+                          "wins_regular INTEGER, wins_overtime INTEGER, losses_regular INTEGER, "
+                          "losses_overtime INTEGER, goals_for INTEGER, goals_against INTEGER)"))
+
+    migrate_db(engine)
+
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    assert [name for name, in db.query(Season.name)] == ['2024']
+    assert db.query(Match).filter(Match.season_id.is_(None)).count() == 0
+    assert inspect(engine).get_pk_constraint('team_standings')['constrained_columns'] == ['season_id', 'team_id']
+    assert db.query(TeamStanding).count() > 0
+    assert StandingsCalculator(db, materialized=True).calculate_standings() == expected
+    db.close()
+    engine.dispose()
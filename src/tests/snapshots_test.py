@@ -0,0 +1,82 @@
+import os
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from src.database.database import create_db_engine
+from src.database.models import Base, Match
+from src.database.snapshots import SnapshotReader, publish_snapshot, current_snapshot, KEEP_SNAPSHOTS
+from src.parsers.json_parser import MatchParser
+from src.parsers.reload_job import ReloadJobManager, SUCCEEDED
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+@pytest.fixture
+def live(tmp_path):
+    path = str(tmp_path / 'live.db')
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    yield path, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def match_count(session_factory):
+    db = session_factory()
+    try:
+        return db.query(Match).count()
+    finally:
+        db.close()
+
+
+def test_readers_switch_to_new_snapshots(live, tmp_path, data_dir):
+    path, Live = live
+    snapshot_dir = str(tmp_path / 'snapshots')
+    reader = SnapshotReader(snapshot_dir, fallback=Live)
+    file_paths = [str(file_path) for file_path in sorted(data_dir.glob('*.json'))]
+
+    # Nothing published yet, reads go to the live database
+    assert current_snapshot(snapshot_dir) is None
+    assert match_count(reader) == 0
+
+    db = Live()
+    MatchParser(db).parse_files(file_paths[:2])
+    first = publish_snapshot(path, snapshot_dir)
+    open_session = reader()
+    assert open_session.query(Match).count() == 2
+
+    MatchParser(db).parse_files(file_paths[2:])
+    db.close()
+    assert match_count(reader) == 2  # Unpublished changes are not seen
+    publish_snapshot(path, snapshot_dir)
+    assert match_count(reader) == len(SAMPLE_MATCHES)
+    # A session opened before the switch keeps reading its own snapshot
+    assert open_session.query(Match).count() == 2
+    open_session.close()
+    assert reader.stats()['switches'] == 2
+
+    snapshot = reader()
+    assert snapshot.execute(text("PRAGMA mmap_size")).scalar() > 0
+    with pytest.raises(OperationalError):
+        snapshot.execute(text("DELETE FROM matches"))
+    snapshot.close()
+
+    for _ in range(KEEP_SNAPSHOTS):
+        publish_snapshot(path, snapshot_dir)
+    snapshots = [name for name in os.listdir(snapshot_dir) if name.endswith('.snapshot.db')]
+    assert len(snapshots) == KEEP_SNAPSHOTS and os.path.basename(first) not in snapshots
+    reader.close()
+
+
+def test_reload_job_publishes_a_snapshot(live, tmp_path, data_dir):
+    path, Live = live
+    snapshot_dir = str(tmp_path / 'snapshots')
+    manager = ReloadJobManager(path, str(data_dir), workers=1, snapshot_dir=snapshot_dir)
+
+    job = manager.submit()
+    assert job.wait(timeout=30)
+
+    assert job.state == SUCCEEDED
+    reader = SnapshotReader(snapshot_dir, fallback=Live)
+    assert match_count(reader) == len(SAMPLE_MATCHES)
+    assert reader.stats()['snapshot'] == os.path.basename(current_snapshot(snapshot_dir))
+    reader.close()
@@ -0,0 +1,34 @@
+from src.parsers.json_parser import MatchParser
+from src.statistics.standings_calculator import StandingsCalculator
+from src.tests.helpers import reference_standings
+
+
+def test_standings_match_reference_loop(loaded_db):
+    standings = StandingsCalculator(loaded_db).calculate_standings()
+
+    assert standings == reference_standings(loaded_db)
+    by_team = {row['team_name']: row for row in standings}
+    assert by_team['Gauja']['wins_overtime'] == 1
+    assert by_team['Venta']['losses_overtime'] == 0
+    assert by_team['Daugava']['losses_regular'] == 1
+    assert by_team['Daugava']['losses_overtime'] == 1
+
+
+def test_standings_query_count_is_constant(loaded_db, statement_counter, data_dir, tmp_path):
+    StandingsCalculator(loaded_db).calculate_standings()
+    small = len(statement_counter)
+
+    # Add more teams and matches, the statement count must not change
+    parser = MatchParser(loaded_db)
+    for path in sorted(data_dir.glob('*.json')):
+        text = path.read_text(encoding='utf-8')
+        for suffix in ('II', 'III'):
+            copy = tmp_path / f"{suffix}_{path.name}"
+            copy.write_text(text.replace('"Nosaukums": "', f'"Nosaukums": "{suffix} '), encoding='utf-8')
+            parser.parse_file(str(copy))
+
+    statement_counter.clear()
+    standings = StandingsCalculator(loaded_db).calculate_standings()
+
+    assert len(standings) == 9
+    assert len(statement_counter) == small == 1
@@ -0,0 +1,56 @@
+import json
+from src.database.models import Match
+from src.parsers.manifest import reload_data_dir
+from src.parsers.stream_parser import iter_match_documents, load_match_stream
+from src.tests.helpers import dump_tables
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def write_dump(path, ndjson):
+    matches = [SAMPLE_MATCHES[name] for name in sorted(SAMPLE_MATCHES)]
+    if ndjson:
+        path.write_text(''.join(json.dumps(match) + '\n' for match in matches), encoding='utf-8')
+    else:
+        path.write_text(json.dumps(matches, indent=2), encoding='utf-8')
+    return [match['Spele'] for match in matches]
+
+
+def test_documents_are_split_across_small_chunks(tmp_path):
+    for ndjson in (True, False):
+        path = tmp_path / ('season.ndjson' if ndjson else 'season.json')
+        expected = write_dump(path, ndjson)
+        assert list(iter_match_documents(str(path), chunk_size=7)) == expected
+
+
+def test_stream_matches_per_file_ingestion(loaded_db, other_db, tmp_path):
+    path = tmp_path / 'season.json'
+    write_dump(path, ndjson=False)
+
+    summary = load_match_stream(other_db, str(path), batch_size=3, chunk_size=64)
+
+    assert (summary['matches'], summary['stored'], summary['errors']) == (len(SAMPLE_MATCHES),) * 2 + (0,)
+    assert dump_tables(other_db) == dump_tables(loaded_db)
+
+
+def test_truncated_dump_keeps_earlier_matches(db, tmp_path):
+    path = tmp_path / 'season.json'
+    write_dump(path, ndjson=False)
+    text = path.read_text(encoding='utf-8')
+    path.write_text(text[:int(len(text) * 0.6)], encoding='utf-8')
+
+    summary = load_match_stream(db, str(path), chunk_size=64)
+
+    assert summary['failed_files'] == [str(path)]
+    assert [failure['file'] for failure in summary['failures']] == ['season.json']
+    assert summary['stored'] == db.query(Match).count() > 0
+
+
+def test_reload_picks_up_season_dumps(db, tmp_path):
+    write_dump(tmp_path / 'season.ndjson', ndjson=True)
+
+    summary = reload_data_dir(db, str(tmp_path), workers=1)
+    assert (summary['files'], summary['stored']) == (1, len(SAMPLE_MATCHES))
+
+    (tmp_path / 'season.ndjson').unlink()
+    reload_data_dir(db, str(tmp_path), workers=1)
+    assert db.query(Match).count() == 0
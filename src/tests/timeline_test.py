@@ -0,0 +1,86 @@
+import json
+from src.benchmarks.generator import write_match_files
+from src.database.database import migrate_db
+from src.database.models import Match, MatchTimeline
+from src.parsers.manifest import delete_matches
+from src.parsers.pipeline import load_match_files
+from src.statistics import timeline
+from src.statistics.timeline import TimelineCalculator
+
+
+def first_match_id(db):
+    return db.query(Match.id).filter(Match.venue == 'Riga').order_by(Match.date).first()[0]
+
+
+def test_state_at_replays_goals_cards_and_substitutions(loaded_db):
+    calculator = TimelineCalculator(loaded_db)
+    match_id = first_match_id(loaded_db)
+
+    kick_off = calculator.state_at(match_id, 0)
+    assert kick_off['score'] == {'home': 0, 'away': 0} and kick_off['last_event'] is None
+    # Player 11 comes on later, so he does not start
+    assert 'DJuris DPriede' not in kick_off['on_field']['home']
+    assert len(kick_off['on_field']['home']) == 5
+
+    minute_47 = calculator.state_at(match_id, 47 * 60)
+    assert minute_47['score'] == {'home': 2, 'away': 1}
+    assert minute_47['last_event']['type'] == 'goal' and minute_47['last_event']['is_penalty']
+
+    # Second yellow card at 50:00, substitution at 70:00
+    assert calculator.state_at(match_id, 50 * 60)['sent_off'] == ['DPeteris DOzols']
+    final = calculator.state_at(match_id, 90 * 60)
+    assert 'DKarlis DEgle' not in final['on_field']['home']
+    assert 'DJuris DPriede' in final['on_field']['home']
+    assert len(final['on_field']['home']) == 4
+
+    events = calculator.timeline(match_id)['events']
+    assert [event['seconds'] for event in events] == sorted(event['seconds'] for event in events)
+    assert events[-1]['score'] == {'home': 2, 'away': 1}
+
+
+def test_checkpoints_give_the_same_states(db, other_db, tmp_path, monkeypatch):
+    file_paths = write_match_files(str(tmp_path), 20, teams=4, seed=7)
+    monkeypatch.setattr(timeline, 'CHECKPOINT_INTERVAL', 3)
+    load_match_files(db, file_paths, workers=1)
+    monkeypatch.setattr(timeline, 'CHECKPOINT_INTERVAL', 1000)
+    load_match_files(other_db, file_paths, workers=1)
+    monkeypatch.setattr(timeline, 'CHECKPOINT_INTERVAL', 3)
+
+    for stored in db.query(MatchTimeline).all():
+        payload = json.loads(stored.payload)
+        # One full state per three events, not one per event
+        assert len(payload['checkpoints']) == len(payload['events']) // 3
+        for seconds in [0] + payload['seconds']:
+            assert TimelineCalculator(db).state_at(stored.match_id, seconds) == \
+                TimelineCalculator(other_db).state_at(stored.match_id, seconds)
+
+
+def test_migrate_rebuilds_legacy_timelines(loaded_db, engine):
+    match_id = first_match_id(loaded_db)
+    loaded_db.get(MatchTimeline, match_id).payload = '{"states":[]}'
+    loaded_db.commit()
+
+    assert migrate_db(engine)['statistics_rebuilt']
+    loaded_db.expire_all()
+    assert 'checkpoints' in json.loads(loaded_db.get(MatchTimeline, match_id).payload)
+
+
+def test_timelines_follow_deleted_matches(loaded_db):
+    match_id = first_match_id(loaded_db)
+    assert loaded_db.query(MatchTimeline).count() == loaded_db.query(Match).count()
+
+    delete_matches(loaded_db, [match_id])
+    loaded_db.commit()
+
+    assert loaded_db.get(MatchTimeline, match_id) is None
+    assert TimelineCalculator(loaded_db).state_at(match_id, 0) is None
+
+
+def test_timeline_endpoint(client, loaded_db):
+    match_id = first_match_id(loaded_db)
+
+    state = client.get(f"/api/matches/{match_id}/timeline?at_seconds=2820").get_json()['data']
+    assert (state['home_team'], state['score'], state['time']) == ('Daugava', {'home': 2, 'away': 1}, '47:00')
+    assert len(client.get(f"/api/matches/{match_id}/timeline").get_json()['data']['events']) == 6
+    assert client.get('/api/matches/999/timeline').status_code == 404
+    assert client.get(f"/api/matches/{match_id}/timeline?at_seconds=-1").status_code == 400
@@ -0,0 +1,90 @@
+import json
+import os
+import time
+from sqlalchemy.orm import sessionmaker
+from src.database.database import create_db_engine
+from src.database.models import Base, Match
+from src.parsers import reload_job
+from src.parsers.reload_job import FAILED, ReloadJobManager
+from src.parsers.watcher import DataDirWatcher
+from src.tests.sample_data import SAMPLE_MATCHES
+
+
+def make_watcher(tmp_path, data_dir, settle_seconds=0.0, **options):
+    path = str(tmp_path / 'live.db')
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    jobs = ReloadJobManager(path, str(data_dir), workers=1, settle_seconds=settle_seconds)
+    return DataDirWatcher(jobs, str(data_dir), **options), engine
+
+
+def match_count(engine):
+    db = sessionmaker(bind=engine)()
+    try:
+        return db.query(Match).count()
+    finally:
+        db.close()
+
+
+def add_match_file(data_dir, name, spectators):
+    payload = json.loads(json.dumps(SAMPLE_MATCHES['futbols0.json']))
+    payload['Spele']['Laiks'] = '2024/06/01'
+    payload['Spele']['Skatitaji'] = spectators
+    (data_dir / name).write_text(json.dumps(payload), encoding='utf-8')
+
+
+def test_burst_is_ingested_once_quiet(tmp_path, data_dir):
+    watcher, engine = make_watcher(tmp_path, data_dir, debounce=60, max_delay=60)
+    # Files just changed, the burst may not be over yet
+    assert watcher.poll_once() is None
+
+    watcher.debounce = 0
+    job = watcher.poll_once()
+    assert job.wait(timeout=30) and match_count(engine) == len(SAMPLE_MATCHES)
+    assert watcher.poll_once() is None  # Nothing new
+
+    add_match_file(data_dir, 'futbols9.json', 999)
+    assert watcher.poll_once().wait(timeout=30)
+    assert match_count(engine) == len(SAMPLE_MATCHES) + 1
+
+    stats = watcher.stats()
+    assert (stats['batches'], stats['files_ingested']) == (2, len(SAMPLE_MATCHES) + 1)
+    assert stats['last_lag_seconds'] is not None and not stats['pending_changes']
+    assert watcher.lag_histogram()['count'] == 2
+    engine.dispose()
+
+
+def test_failed_batch_is_retried(tmp_path, data_dir, monkeypatch):
+    watcher, engine = make_watcher(tmp_path, data_dir, debounce=0)
+
+    def locked(*args, **kwargs):
+        raise RuntimeError("database is locked")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(reload_job, 'reload_data_dir', locked)
+        job = watcher.poll_once()
+        assert job.wait(timeout=30) and job.state == FAILED
+
+    # Nothing changed in the directory, the same files are submitted again
+    assert watcher.poll_once().wait(timeout=30)
+    assert match_count(engine) == len(SAMPLE_MATCHES)
+    engine.dispose()
+
+
+def test_files_still_being_written_wait_to_settle(tmp_path, data_dir):
+    watcher, engine = make_watcher(tmp_path, data_dir, settle_seconds=60, debounce=0)
+    old = time.time() - 120
+    for file_path in data_dir.iterdir():
+        os.utime(file_path, (old, old))
+    (data_dir / 'futbols9.json').write_text('{"Spele": {', encoding='utf-8')
+
+    job = watcher.poll_once()
+    assert job.wait(timeout=30)
+    assert (job.summary['stored'], job.summary['pending'], job.summary['errors']) == (len(SAMPLE_MATCHES), 1, 0)
+
+    # The writer finishes; the skipped file is picked up by the next batch
+    add_match_file(data_dir, 'futbols9.json', 999)
+    os.utime(data_dir / 'futbols9.json', (old, old))
+    assert watcher.poll_once().wait(timeout=30)
+    assert match_count(engine) == len(SAMPLE_MATCHES) + 1
+    engine.dispose()